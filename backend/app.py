@@ -1,50 +1,226 @@
-﻿from flask import Flask, render_template, jsonify, request
+﻿from flask import Flask, render_template, jsonify, request, g
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 from mongoengine import connect
 from config import Config
 import os
+import threading
 
-app = Flask(__name__)
-app.config.from_object(Config)
-
-app.url_map.strict_slashes = False
+def create_app(config=Config):
+    """
+    Build the Flask application.
+    
+    Nothing here talks to MongoDB: the connection is registered with
+    connect=False, so the driver only connects on the first query, and
+    /api/health answers as soon as the app is built. Seeding is a separate
+    job (`python seed.py`), not part of startup.
+    """
+    app = Flask(__name__)
+    app.config.from_object(config)
+    
+    app.url_map.strict_slashes = False
+    
+    # Initialize extensions
+    CORS(app, 
+         origins=config.CORS_ORIGINS,
+         supports_credentials=True,
+         allow_headers=["Content-Type", "Authorization", "Idempotency-Key"],
+         methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"])
+    
+    jwt = JWTManager(app)
+    
+    # Logged-out tokens; answered from memory, see services.revocation
+    @jwt.token_in_blocklist_loader
+    def token_revoked(jwt_header, jwt_payload):
+        from services import revocation
+        return revocation.is_revoked(jwt_payload['jti'])
+    
+    # Register the MongoDB connection; it is opened on first use
+    connect(host=config.MONGODB_URI, connect=False)
+    
+    # Worker threads start with the first request a process serves: every
+    # worker of a forking server (gunicorn) gets them, and importing the
+    # app (scripts, tests, WSGI loaders before forking) starts none
+    @app.before_request
+    def ensure_background_tasks():
+        start_background_tasks(config)
+    
+    # Rate limits are checked first, so refused requests never queue for admission
+    if config.RATE_LIMIT_ENABLED:
+        _init_rate_limits(app)
+    
+    if config.ADMISSION_CAPACITY > 0:
+        _init_admission(app)
+    
+    # Opt-in request profiling; no hooks are installed unless it is configured
+    if config.PROFILE_SAMPLE_RATE > 0 or config.PROFILE_TOKEN:
+        _init_profiling(app)
+    
+    # Register blueprints
+    from routes.auth import auth_bp
+    from routes.products import products_bp
+    from routes.orders import orders_bp
+    from routes.cart import cart_bp
+    from routes.bootstrap import bootstrap_bp
+    from routes.analytics import analytics_bp
+    from routes.promotions import promotions_bp
+    from routes.images import images_bp
+    
+    app.register_blueprint(auth_bp, url_prefix='/api/auth')
+    app.register_blueprint(products_bp, url_prefix='/api/products')
+    app.register_blueprint(orders_bp, url_prefix='/api/orders')
+    app.register_blueprint(cart_bp, url_prefix='/api/cart')
+    app.register_blueprint(bootstrap_bp, url_prefix='/api/bootstrap')
+    app.register_blueprint(analytics_bp, url_prefix='/api/analytics')
+    app.register_blueprint(promotions_bp, url_prefix='/api/promotions')
+    app.register_blueprint(images_bp, url_prefix='/api/images')
+    
+    app.add_url_rule('/docs', view_func=docs_page)
+    app.add_url_rule('/api/health', view_func=health)
+    app.add_url_rule('/api/health/catalog', view_func=catalog_health)
+    app.add_url_rule('/api/seed', view_func=seed_endpoint, methods=['GET', 'POST'])
+    
+    return app
 
-# Initialize extensions
-CORS(app, 
-     origins=Config.CORS_ORIGINS,
-     supports_credentials=True,
-     allow_headers=["Content-Type", "Authorization"],
-     methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"])
+# Process that started the worker threads; a forked child has another pid
+_background_lock = threading.Lock()
+_background_pid = None
 
-jwt = JWTManager(app)
+def start_background_tasks(config=Config):
+    """
+    Start the worker threads a serving process needs, once per process.
+    Called on every request by create_app's hook; after the first call in
+    a process it is one pid comparison.
+    """
+    global _background_pid
+    if _background_pid == os.getpid():
+        return
+    with _background_lock:
+        if _background_pid == os.getpid():
+            return
+        _background_pid = os.getpid()
+        
+        # Background rebalancer for sharded (hot SKU) stock counters
+        if config.STOCK_REBALANCE_INTERVAL > 0:
+            from services.stock import start_rebalancer
+            start_rebalancer(config.STOCK_REBALANCE_INTERVAL)
+        
+        # Picks up tokens revoked on other workers
+        if config.REVOCATION_REFRESH_INTERVAL > 0:
+            from services.revocation import start_refresher
+            start_refresher(config.REVOCATION_REFRESH_INTERVAL)
 
-# Connect to MongoDB
-connect(host=Config.MONGODB_URI)
+def _init_rate_limits(app):
+    """Per-client token buckets with X-RateLimit-* headers on every limited response"""
+    from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
+    from services import ratelimit
+    
+    @app.before_request
+    def limit_rate():
+        # A product grid loads dozens of images at once, mostly cache hits
+        # served from disk; they would drain the default bucket
+        if request.method == 'OPTIONS' or request.path.startswith(('/api/health', '/api/images')):
+            return None
+        
+        name, policy = ratelimit.match(request.method, request.path, request.args)
+        if policy is None:
+            return None
+        
+        user_id = None
+        if policy['per'] == 'user':
+            try:
+                verify_jwt_in_request(optional=True)
+                user_id = get_jwt_identity()
+            except Exception:
+                # Bad tokens are rejected by the route itself; limit by IP
+                pass
+        
+        key = ratelimit.client_key(policy, request.remote_addr, request.headers.get('X-Forwarded-For'), user_id)
+        allowed, g.rate_limit_headers = ratelimit.check(name, policy, key)
+        
+        if not allowed:
+            return jsonify({'error': 'Too many requests, please slow down'}), 429
+    
+    @app.after_request
+    def rate_limit_headers(response):
+        response.headers.extend(g.pop('rate_limit_headers', {}))
+        return response
 
-# Register blueprints
-from routes.auth import auth_bp
-from routes.products import products_bp
-from routes.orders import orders_bp
-from routes.cart import cart_bp
+def _init_admission(app):
+    """Admission control: bounded concurrency per route class, checkout first"""
+    from services.admission import controller, classify, Shed
+    
+    @app.before_request
+    def admit():
+        route_class = classify(request.method, request.path)
+        if route_class is None:
+            return None
+        try:
+            controller.acquire(route_class)
+        except Shed as e:
+            response = jsonify({'error': 'Server busy, please retry', 'reason': e.reason})
+            response.headers['Retry-After'] = str(Config.ADMISSION_RETRY_AFTER)
+            return response, 503
+        g.admission_class = route_class
+    
+    @app.teardown_request
+    def release_admission(exc):
+        route_class = g.pop('admission_class', None)
+        if route_class:
+            controller.release(route_class)
+    
+    @app.route('/api/health/admission')
+    def admission_metrics():
+        return jsonify(controller.metrics()), 200
 
-app.register_blueprint(auth_bp, url_prefix='/api/auth')
-app.register_blueprint(products_bp, url_prefix='/api/products')
-app.register_blueprint(orders_bp, url_prefix='/api/orders')
-app.register_blueprint(cart_bp, url_prefix='/api/cart')
+def _init_profiling(app):
+    """
+    Sample requests that ask for it (X-Profile-Token) or win the sampling
+    draw. Unsampled requests only pay for one environ lookup and one
+    counter check (see profile_overhead_check.py).
+    """
+    from flask import after_this_request
+    from services import profiling
+    
+    @app.before_request
+    def start_profile():
+        if not profiling.should_profile(request.environ.get('HTTP_X_PROFILE_TOKEN')):
+            return
+        g.profiler = profiling.start()
+        
+        @after_this_request
+        def write_profile(response):
+            profiler = g.pop('profiler', None)
+            if profiler:
+                profiler.stop()
+                if not response.is_streamed:
+                    profile_id = profiler.write(Config.PROFILE_DIR, request.method, request.path, response.status_code)
+                    response.headers['X-Profile-Id'] = profile_id
+            return response
+    
+    # after_request callbacks are skipped if another one raises; the sampler
+    # must still stop so the switch interval is restored
+    @app.teardown_request
+    def stop_profile(exc):
+        if profiling.active():
+            profiler = g.pop('profiler', None)
+            if profiler:
+                profiler.stop()
 
 # Docs route with Jinja2
-@app.route('/docs')
 def docs_page():
     return render_template('docs.html')
 
 # Health check
-@app.route('/api/health')
 def health():
     return jsonify({'status': 'healthy', 'message': 'API is running'}), 200
 
+# Catalog cache and Mongo circuit breaker state
+def catalog_health():
+    from services import catalog_cache
+    return jsonify(catalog_cache.metrics()), 200
+
 # Seed endpoint with token-based security
-@app.route('/api/seed', methods=['GET', 'POST'])
 def seed_endpoint():
     """
     Seeds the database with initial data.
@@ -159,5 +335,7 @@ def seed_endpoint():
             'message': str(e)
         }), 500
 
+app = create_app()
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,25 @@
+import argparse
+from mongoengine import connect
+from config import Config
+from services import archive
+
+if __name__ == "__main__":
+    """
+    Moves old orders from `orders` into monthly orders_archive_YYYY_MM
+    collections so the hot collection and its indexes stay small.
+    
+    Usage:
+        python archive_orders.py               -> older than ORDER_ARCHIVE_AFTER_DAYS
+        python archive_orders.py --days 180
+    
+    Safe to interrupt and re-run; schedule it daily.
+    """
+    parser = argparse.ArgumentParser(description='Archive old orders')
+    parser.add_argument('--days', type=int, default=Config.ORDER_ARCHIVE_AFTER_DAYS)
+    args = parser.parse_args()
+    
+    connect(host=Config.MONGODB_URI)
+    
+    print(f'Archiving orders older than {args.days} days...')
+    moved = archive.run(args.days)
+    print(f'✓ Archived {moved} orders')
@@ -0,0 +1,50 @@
+"""
+ASGI app serving the read-heavy routes with the motor driver.
+
+Runs side by side with the Flask app - same URLs, tokens and response
+shapes - so a proxy can send GETs for these paths here:
+
+    uvicorn async_api:app --host 0.0.0.0 --port 5001
+"""
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.routing import Route
+from starlette.concurrency import run_in_threadpool
+from mongoengine import connect
+from services import revocation
+from models.product import Product
+from config import Config
+from . import db, routes
+
+async def load_denylist():
+    """
+    The revoked-token denylist is shared with the Flask app and uses its
+    synchronous MongoEngine connection; load it off the event loop so the
+    per-request check never does I/O.
+    """
+    connect(host=Config.MONGODB_URI, connect=False)
+    await run_in_threadpool(revocation.denylist.refresh)
+    # Listing indexes, and in_stock on products saved before it existed
+    await run_in_threadpool(Product._get_collection)
+    if Config.REVOCATION_REFRESH_INTERVAL > 0:
+        revocation.start_refresher(Config.REVOCATION_REFRESH_INTERVAL)
+
+app = Starlette(
+    routes=[
+        Route('/api/products', routes.get_products),
+        Route('/api/products/categories', routes.get_categories),
+        Route('/api/products/{product_id}', routes.get_product),
+        Route('/api/cart', routes.get_cart),
+        Route('/api/orders', routes.get_orders),
+    ],
+    middleware=[
+        Middleware(CORSMiddleware,
+                   allow_origins=Config.CORS_ORIGINS,
+                   allow_credentials=True,
+                   allow_headers=['Content-Type', 'Authorization'],
+                   allow_methods=['GET', 'OPTIONS'])
+    ],
+    on_startup=[load_denylist],
+    on_shutdown=[db.close]
+)
@@ -0,0 +1,37 @@
+from functools import wraps
+from starlette.responses import JSONResponse
+from services import revocation, tokens
+from config import Config
+
+def get_identity(request):
+    """
+    Validate the request's access token the same way Flask-JWT-Extended does.
+    
+    Lookup and decoding come from services.tokens, which reads the same
+    JWT_* settings as the Flask app. Returns the identity claim. Raises
+    ValueError with the message Flask-JWT-Extended would answer with when
+    the token is missing, malformed, expired, revoked or not an access
+    token.
+    """
+    token = tokens.find(request.headers, request.query_params, request.cookies, request.method)
+    claims = tokens.decode(token)
+    
+    if claims.get('type') != 'access':
+        raise ValueError('Only non-refresh tokens are allowed')
+    
+    # In-memory check; the denylist is loaded at startup (see app.py)
+    if revocation.is_revoked(claims['jti']):
+        raise ValueError('Token has been revoked')
+    
+    return claims[Config.JWT_IDENTITY_CLAIM]
+
+def jwt_required(handler):
+    """Async counterpart of @jwt_required() - passes the identity to the handler"""
+    @wraps(handler)
+    async def wrapper(request):
+        try:
+            user_id = get_identity(request)
+        except ValueError as e:
+            return JSONResponse({'msg': str(e)}, status_code=401)
+        return await handler(request, user_id)
+    return wrapper
@@ -0,0 +1,17 @@
+from motor.motor_asyncio import AsyncIOMotorClient
+from config import Config
+
+_client = None
+
+def get_db():
+    """Motor database for the configured MONGODB_URI, created on first use"""
+    global _client
+    if _client is None:
+        _client = AsyncIOMotorClient(Config.MONGODB_URI, maxPoolSize=Config.ASYNC_MONGO_POOL_SIZE)
+    return _client.get_default_database()
+
+def close():
+    global _client
+    if _client is not None:
+        _client.close()
+        _client = None
@@ -0,0 +1,336 @@
+from datetime import datetime
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse
+from services import pricing, counts, archive
+from config import Config
+from models.product import Product, LISTING_SORTS
+from models.order_archive_index import OrderArchiveIndex
+from .auth import jwt_required
+from .db import get_db
+from .serializers import product_to_dict, order_to_dict
+
+def _object_id(value):
+    return ObjectId(value) if ObjectId.is_valid(value) else None
+
+def _int_arg(params, name, default=None):
+    """Flask's request.args.get(name, default, type=int): unparseable values give the default"""
+    try:
+        return int(params[name])
+    except (KeyError, ValueError):
+        return default
+
+async def _stock_for(db, docs):
+    """Stock per product id, summing shards of hot SKUs in one aggregation"""
+    stock = {doc['_id']: doc.get('stock', 0) for doc in docs}
+    hot = [str(doc['_id']) for doc in docs if doc.get('hot_sku')]
+    
+    if hot:
+        async for row in db.stock_shards.aggregate([
+            {'$match': {'product_id': {'$in': hot}}},
+            {'$group': {'_id': '$product_id', 'stock': {'$sum': '$stock'}}}
+        ]):
+            stock[ObjectId(row['_id'])] = row['stock']
+    
+    return stock
+
+async def _resolve_snapshots(db, items):
+    """Async counterpart of Cart.resolve_snapshots"""
+    refs = [{'product_id': item['product_id'], 'version': item['product_snapshot']['v']}
+            for item in items if 'v' in (item.get('product_snapshot') or {})]
+    versions = {}
+    if refs:
+        async for v in db.product_versions.find({'$or': refs}):
+            versions[(v['product_id'], v['version'])] = v
+    
+    snapshots = []
+    for item in items:
+        snapshot = item.get('product_snapshot') or {}
+        if 'v' in snapshot:
+            v = versions.get((item['product_id'], snapshot['v']), {})
+            snapshot = {k: v[k] for k in ('name', 'price', 'image_url', 'category') if k in v}
+        snapshots.append(snapshot)
+    return snapshots
+
+async def _count(db, query, strategy, hint):
+    """services.counts.count with the driver call awaited; same rules and cache"""
+    pending = counts.Count(query, strategy)
+    if pending.known:
+        return pending.total
+    return pending.finish(await pending.fetch(db.products, hint))
+
+async def get_products(request):
+    try:
+        # Get query parameters
+        category = request.query_params.get('category')
+        search = request.query_params.get('search')
+        page = int(request.query_params.get('page', 1))
+        per_page = int(request.query_params.get('per_page', 20))
+        in_stock = request.query_params.get('in_stock', '').lower() in ('1', 'true', 'yes')
+        sort = request.query_params.get('sort') or None
+        count = request.query_params.get('count') or Config.PRODUCT_COUNT_DEFAULT
+        
+        if sort not in LISTING_SORTS:
+            return JSONResponse({'error': 'sort must be one of price, -price, name'}, status_code=400)
+        if count not in counts.STRATEGIES:
+            return JSONResponse({'error': 'count must be one of exact, estimate, none'}, status_code=400)
+        try:
+            min_price = float(request.query_params['min_price']) if request.query_params.get('min_price') else None
+            max_price = float(request.query_params['max_price']) if request.query_params.get('max_price') else None
+        except ValueError:
+            return JSONResponse({'error': 'min_price and max_price must be numbers'}, status_code=400)
+        
+        # Same filter, order and index as the Flask listing
+        query, keys, hint = Product.listing(category, search, min_price, max_price, in_stock, sort)
+        
+        db = get_db()
+        total = await _count(db, query, count, hint)
+        docs = await db.products.find(query).sort(keys).hint(hint) \
+            .skip((page - 1) * per_page).limit(per_page + (total is None)).to_list(None)
+        has_next = page * per_page < total if total is not None else len(docs) > per_page
+        docs = docs[:per_page]
+        stock = await _stock_for(db, docs)
+        
+        return JSONResponse({
+            'products': [product_to_dict(d, stock[d['_id']]) for d in docs],
+            'total': total,
+            'page': page,
+            'per_page': per_page,
+            'total_pages': (total + per_page - 1) // per_page if total is not None else None,
+            'has_next': has_next
+        })
+    
+    except Exception as e:
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+async def get_product(request):
+    try:
+        product_id = _object_id(request.path_params['product_id'])
+        
+        db = get_db()
+        doc = await db.products.find_one({'_id': product_id}) if product_id else None
+        
+        if not doc:
+            return JSONResponse({'error': 'Product not found'}, status_code=404)
+        
+        stock = await _stock_for(db, [doc])
+        return JSONResponse(product_to_dict(doc, stock[doc['_id']]))
+    
+    except Exception as e:
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+async def get_categories(request):
+    try:
+        categories = await get_db().products.distinct('category')
+        return JSONResponse({'categories': categories})
+    except Exception as e:
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+@jwt_required
+async def get_cart(request, user_id):
+    try:
+        db = get_db()
+        user = await db.users.find_one({'_id': _object_id(user_id)}, {'_id': 1})
+        
+        if not user:
+            return JSONResponse({'error': 'User not found'}, status_code=404)
+        
+        # Get or create cart
+        cart = await db.carts.find_one({'user': user['_id']})
+        if not cart:
+            cart = {'user': user['_id'], 'items': []}
+            await db.carts.update_one(
+                {'user': user['_id']},
+                {'$setOnInsert': {'items': [], 'updated_at': datetime.utcnow()}},
+                upsert=True
+            )
+        
+        # One query for every product in the cart
+        ids = [_object_id(item['product_id']) for item in cart['items']]
+        docs = await db.products.find({'_id': {'$in': [i for i in ids if i]}}).to_list(None)
+        products = {str(d['_id']): d for d in docs}
+        stock = await _stock_for(db, docs)
+        resolved = await _resolve_snapshots(db, cart['items'])
+        
+        # Build cart items with product details and sync check
+        items_with_details = []
+        priced_items = []
+        sync_messages = []
+        snapshots = {}
+        versions = []
+        
+        for index, item in enumerate(cart['items']):
+            product = products.get(item['product_id'])
+            snapshot = resolved[index]
+            
+            if product:
+                # Product exists - check for changes
+                price_changed = False
+                name_changed = False
+                
+                if snapshot:
+                    if snapshot.get('price') != product['price']:
+                        price_changed = True
+                        sync_messages.append({
+                            'type': 'price_changed',
+                            'product_name': product['name'],
+                            'old_price': snapshot.get('price'),
+                            'new_price': product['price']
+                        })
+                    
+                    if snapshot.get('name') != product['name']:
+                        name_changed = True
+                        sync_messages.append({
+                            'type': 'name_changed',
+                            'old_name': snapshot.get('name'),
+                            'new_name': product['name']
+                        })
+                
+                # Point the snapshot at the current version (see CartItem)
+                current = {'v': product.get('version', 1)}
+                if item.get('product_snapshot') != current:
+                    snapshots[f'items.{index}.product_snapshot'] = current
+                    versions.append(product)
+                
+                product_stock = stock[product['_id']]
+                
+                items_with_details.append({
+                    'product_id': str(product['_id']),
+                    'product_name': product['name'],
+                    'price': product['price'],
+                    'quantity': item['quantity'],
+                    'stock': product_stock,
+                    'image_url': product.get('image_url'),
+                    'category': product['category'],
+                    'is_available': True,
+                    'has_stock_issue': item['quantity'] > product_stock,
+                    'price_changed': price_changed,
+                    'name_changed': name_changed
+                })
+                priced_items.append(items_with_details[-1])
+            else:
+                # Product deleted - use snapshot if available
+                product_name = snapshot.get('name', 'Unknown Product')
+                
+                sync_messages.append({
+                    'type': 'product_deleted',
+                    'product_name': product_name,
+                    'product_id': item['product_id']
+                })
+                
+                items_with_details.append({
+                    'product_id': item['product_id'],
+                    'product_name': product_name,
+                    'price': snapshot.get('price', 0),
+                    'quantity': item['quantity'],
+                    'stock': 0,
+                    'image_url': snapshot.get('image_url', ''),
+                    'category': snapshot.get('category', ''),
+                    'is_available': False,
+                    'has_stock_issue': False,
+                    'price_changed': False,
+                    'name_changed': False,
+                    'line_total': 0,
+                    'discount': 0,
+                    'promotion': None
+                })
+        
+        # Same engine as the Flask cart and checkout; rule refreshes query MongoDB
+        priced = await run_in_threadpool(pricing.price, priced_items)
+        for details, line in zip(priced_items, priced['lines']):
+            details['line_total'] = line['total']
+            details['discount'] = line['discount']
+            details['promotion'] = line['promotion_name']
+        
+        # Only write back snapshots that actually changed, in one bulk write,
+        # and only if the cart was not changed since it was read
+        if snapshots:
+            try:
+                await db.product_versions.bulk_write([UpdateOne(
+                    {'product_id': str(product['_id']), 'version': product.get('version', 1)},
+                    {'$setOnInsert': {
+                        'name': product['name'],
+                        'price': product['price'],
+                        'image_url': product.get('image_url'),
+                        'category': product['category']
+                    }},
+                    upsert=True
+                ) for product in versions], ordered=False)
+            except BulkWriteError as e:
+                # A concurrent upsert inserted the same version first
+                if any(err['code'] != 11000 for err in e.details['writeErrors']):
+                    raise
+            await db.carts.update_one(
+                {'_id': cart['_id'], 'updated_at': cart.get('updated_at')},
+                {'$set': {**snapshots, 'updated_at': datetime.utcnow()}}
+            )
+        
+        return JSONResponse({
+            'items': items_with_details,
+            'subtotal': priced['subtotal'],
+            'discount': priced['discount'],
+            'total': priced['total'],
+            'sync_messages': sync_messages
+        })
+    
+    except Exception as e:
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+async def _user_orders(db, user_id, page=None, per_page=None):
+    """Async counterpart of services.archive.user_orders: hot orders, then archive months, newest first"""
+    skip = (page - 1) * per_page if page else 0
+    limit = per_page if page else 0
+    
+    sources = [db.orders]
+    index = await db[OrderArchiveIndex._get_collection_name()].find_one({'user': user_id}, {'months': 1})
+    if index:
+        sources += [db[archive.ARCHIVE_PREFIX + month] for month in sorted(index.get('months', []), reverse=True)]
+    
+    result = []
+    for collection in sources:
+        query = {'user': user_id}
+        if skip:
+            available = await collection.count_documents(query)
+            if skip >= available:
+                skip -= available
+                continue
+        
+        cursor = collection.find(query).sort('created_at', -1).skip(skip)
+        if limit:
+            cursor = cursor.limit(limit - len(result))
+        result += [doc async for doc in cursor]
+        skip = 0
+        
+        if limit and len(result) >= limit:
+            break
+    
+    return result
+
+@jwt_required
+async def get_orders(request, user_id):
+    try:
+        # Optional pagination, as in the Flask route - without it every order is returned
+        page = _int_arg(request.query_params, 'page')
+        per_page = _int_arg(request.query_params, 'per_page', 20)
+        if (page is not None and page < 1) or per_page < 1:
+            return JSONResponse({'error': 'page and per_page must be at least 1'}, status_code=400)
+        
+        db = get_db()
+        user = await db.users.find_one({'_id': _object_id(user_id)}, {'_id': 1})
+        
+        if not user:
+            return JSONResponse({'error': 'User not found'}, status_code=404)
+        
+        # Older orders live in monthly archive collections
+        orders = await _user_orders(db, user['_id'], page, per_page)
+        
+        response = {'orders': [order_to_dict(o) for o in orders]}
+        if page:
+            response.update(page=page, per_page=per_page)
+        
+        return JSONResponse(response)
+    
+    except Exception as e:
+        return JSONResponse({'error': str(e)}, status_code=500)
@@ -0,0 +1,35 @@
+"""
+Raw-document versions of the models' to_dict() methods.
+
+Motor returns plain dicts, so these mirror Product.to_dict and
+Order.to_dict field for field to keep both serving paths identical.
+"""
+
+def product_to_dict(doc, stock=None):
+    return {
+        'id': str(doc['_id']),
+        'name': doc.get('name'),
+        'description': doc.get('description'),
+        'price': doc.get('price'),
+        'category': doc.get('category'),
+        'image_url': doc.get('image_url'),
+        'stock': doc.get('stock', 0) if stock is None else stock
+    }
+
+def order_to_dict(doc):
+    return {
+        'id': str(doc['_id']),
+        'user_id': str(doc['user']),
+        'items': [{
+            'product_id': item['product_id'],
+            'product_name': item['product_name'],
+            'quantity': item['quantity'],
+            'price': item['price'],
+            'discount': item.get('discount', 0)
+        } for item in doc.get('items', [])],
+        'subtotal': doc.get('subtotal', doc['total']),
+        'discount': doc.get('discount', 0),
+        'total': doc['total'],
+        'status': doc.get('status', 'completed'),
+        'created_at': doc['created_at'].isoformat()
+    }
@@ -0,0 +1,125 @@
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from pymongo import MongoClient
+from config import Config
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+SERVERS = {
+    'flask': lambda port: [sys.executable, '-c',
+                           f'from app import app; app.run(port={port}, threaded=True, use_reloader=False)'],
+    'async': lambda port: [sys.executable, '-m', 'uvicorn', 'async_api:app', '--port', str(port),
+                           '--log-level', 'warning']
+}
+
+
+async def fetch(port, path, headers):
+    """One GET on a fresh connection; True on a 200"""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        lines = [f'GET {path} HTTP/1.1', 'Host: 127.0.0.1', 'Connection: close']
+        lines += [f'{name}: {value}' for name, value in headers.items()]
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode())
+        await writer.drain()
+        status = await reader.readline()
+        await reader.read()
+        return status.split()[1:2] == [b'200']
+    finally:
+        writer.close()
+
+
+async def load(port, path, headers, clients, duration):
+    """(ok, failed) requests from `clients` concurrent clients looping for `duration` seconds"""
+    deadline = time.perf_counter() + duration
+    results = [0, 0]
+    
+    async def client():
+        while time.perf_counter() < deadline:
+            try:
+                results[0 if await fetch(port, path, headers) else 1] += 1
+            except OSError:
+                results[1] += 1
+    
+    await asyncio.gather(*(client() for _ in range(clients)))
+    return results
+
+
+def mongo_connections(uri):
+    """Connections currently open on the MongoDB server, or None if serverStatus is not allowed"""
+    try:
+        with MongoClient(uri, serverSelectionTimeoutMS=2000) as client:
+            return client.admin.command('serverStatus')['connections']['current']
+    except Exception:
+        return None
+
+
+def run(server, port, path, headers, clients, duration, uri):
+    """req/s, error count and peak MongoDB connections opened by one server"""
+    process = subprocess.Popen(SERVERS[server](port), cwd=BACKEND_DIR,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        for _ in range(200):
+            try:
+                urllib.request.urlopen(f'http://127.0.0.1:{port}{path}', timeout=1)
+                break
+            except OSError:
+                time.sleep(0.05)
+        
+        baseline = mongo_connections(uri)
+        peak = [baseline]
+        done = threading.Event()
+        
+        def sample():
+            while not done.wait(0.25):
+                current = mongo_connections(uri)
+                if current is not None and peak[0] is not None:
+                    peak[0] = max(peak[0], current)
+        
+        sampler = threading.Thread(target=sample, daemon=True)
+        sampler.start()
+        ok, failed = asyncio.run(load(port, path, headers, clients, duration))
+        done.set()
+        sampler.join()
+        
+        opened = peak[0] - baseline if baseline is not None else None
+        return ok / duration, failed, opened
+    finally:
+        process.terminate()
+        process.wait()
+
+
+if __name__ == "__main__":
+    """
+    Async vs threaded Flask benchmark.
+    
+    Starts the Flask app (threaded dev server) and the ASGI app (uvicorn)
+    in turn and drives `--clients` concurrent clients against the same
+    read route for `--duration` seconds each. Reports successful requests
+    per second, failures, and the MongoDB connections the server opened
+    (peak of serverStatus, less the count before the run). Needs a MongoDB
+    server with data; pass --token for /api/cart or /api/orders.
+    
+    Usage:
+        python async_benchmark.py
+        python async_benchmark.py --clients 1000 --duration 20 --path /api/orders --token <JWT>
+    """
+    parser = argparse.ArgumentParser(description='Async vs threaded Flask benchmark')
+    parser.add_argument('--uri', default=Config.MONGODB_URI)
+    parser.add_argument('--path', default='/api/products?per_page=20')
+    parser.add_argument('--token')
+    parser.add_argument('--clients', type=int, default=1000)
+    parser.add_argument('--duration', type=float, default=15)
+    args = parser.parse_args()
+    
+    headers = {'Authorization': f'Bearer {args.token}'} if args.token else {}
+    print(f'{args.clients} concurrent clients, GET {args.path}, {args.duration:g}s each')
+    for port, server in ((5100, 'flask'), (5101, 'async')):
+        rate, failed, opened = run(server, port, args.path, headers, args.clients, args.duration, args.uri)
+        connections = 'n/a' if opened is None else opened
+        print(f'  {server}: {rate:.0f} req/s, {failed} failed, {connections} MongoDB connections')
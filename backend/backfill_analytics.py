@@ -0,0 +1,17 @@
+from mongoengine import connect
+from config import Config
+from services.analytics import backfill
+
+if __name__ == "__main__":
+    """
+    Rebuilds the sales rollups (sales_daily, sales_products,
+    sales_categories) from the whole order history.
+    
+    New orders keep the rollups current on their own; run this once after
+    deploying analytics, or whenever the rollups need to be rebuilt.
+    """
+    connect(host=Config.MONGODB_URI)
+    
+    print('Rebuilding sales rollups...')
+    backfill()
+    print('✓ Sales rollups rebuilt')
@@ -0,0 +1,29 @@
+import argparse
+from mongoengine import connect
+from config import Config
+from services import recommendations
+
+if __name__ == "__main__":
+    """
+    Builds the "customers also bought" lists from order history.
+    
+    Usage:
+        python build_recommendations.py          -> fold in orders since last run
+        python build_recommendations.py --full   -> rebuild from all orders
+    
+    Schedule the incremental run (e.g. every few minutes with cron) and
+    run --full occasionally to drop drift from the incremental updates.
+    """
+    parser = argparse.ArgumentParser(description='Build related products')
+    parser.add_argument('--full', action='store_true', help='Rebuild from all orders')
+    args = parser.parse_args()
+    
+    connect(host=Config.MONGODB_URI)
+    
+    if args.full:
+        print('Rebuilding related products from all orders...')
+        recommendations.build()
+    else:
+        print('Updating related products from new orders...')
+        recommendations.update()
+    print('✓ Related products updated')
@@ -0,0 +1,90 @@
+import argparse
+from datetime import datetime
+import bson
+from mongoengine import connect
+from mongoengine.connection import get_db
+from models.product import Product
+from models.cart import Cart
+from config import Config
+
+
+def legacy_item(product, quantity=1):
+    """A cart item in the pre-versioning format, with the full snapshot copied in"""
+    return {'product_id': str(product.id), 'quantity': quantity, 'product_snapshot': {
+        'name': product.name,
+        'price': product.price,
+        'image_url': product.image_url,
+        'category': product.category
+    }}
+
+
+def compact_item(product, quantity=1):
+    """A cart item as CartItem.snapshot_of stores it (no ProductVersion is written here)"""
+    return {'product_id': str(product.id), 'quantity': quantity, 'product_snapshot': {'v': product.version}}
+
+
+def sizes(products, item_counts):
+    """
+    BSON bytes per cart for each cart size, in both formats.
+    
+    `read` is the whole document, as a cart read loads it. `write` is the
+    update an item change sends: MongoEngine replaces the items array.
+    """
+    rows = []
+    for count in item_counts:
+        chosen = [products[i % len(products)] for i in range(count)]
+        row = {'items': count}
+        for name, item in (('legacy', legacy_item), ('compact', compact_item)):
+            items = [item(p) for p in chosen]
+            document = {'_id': bson.ObjectId(), 'user': bson.ObjectId(), 'items': items,
+                        'updated_at': datetime.utcnow()}
+            row[name] = {'read': len(bson.encode(document)),
+                         'write': len(bson.encode({'$set': {'items': items, 'updated_at': document['updated_at']}}))}
+        rows.append(row)
+    return rows
+
+
+def collection_stats():
+    """Stored size of the carts collection and how many carts still hold legacy snapshots"""
+    collection = Cart._get_collection()
+    stats = get_db().command('collStats', Cart._get_collection_name())
+    legacy = collection.count_documents({'items.product_snapshot.name': {'$exists': True}})
+    return {'carts': stats.get('count', 0), 'legacy': legacy,
+            'size': stats.get('size', 0), 'avg': stats.get('avgObjSize', 0)}
+
+
+if __name__ == "__main__":
+    """
+    Cart document size check.
+    
+    Builds carts of several sizes from the catalog's products and prints
+    the BSON bytes read and written per cart in the legacy (full snapshot)
+    and compact ({'v': version}) formats, then the stored size of the
+    carts collection. Run it before and after carts have been migrated
+    (they are on their next read) to compare collection sizes. Needs a
+    MongoDB server with products; nothing is written.
+    
+    Usage:
+        python cart_size_check.py
+        python cart_size_check.py --uri mongodb://localhost:27017/supermarket_db --items 1 5 20
+    """
+    parser = argparse.ArgumentParser(description='Cart document size check')
+    parser.add_argument('--uri', default=Config.MONGODB_URI)
+    parser.add_argument('--items', type=int, nargs='+', default=[1, 5, 20, 50])
+    args = parser.parse_args()
+    
+    connect(host=args.uri)
+    products = list(Product.objects.only('name', 'price', 'image_url', 'category', 'version'))
+    if not products:
+        raise SystemExit('No products - run seed.py first')
+    
+    print('items   legacy read/write   compact read/write   saved')
+    for row in sizes(products, args.items):
+        legacy, compact = row['legacy'], row['compact']
+        saved = 1 - compact['read'] / legacy['read']
+        print(f"{row['items']:>5}   {legacy['read']:>7} / {legacy['write']:<7}   "
+              f"{compact['read']:>7} / {compact['write']:<7}   {saved:.0%}")
+    
+    stats = collection_stats()
+    print(f"carts collection: {stats['carts']} carts ({stats['legacy']} not migrated yet), "
+          f"{stats['size']} bytes, {stats['avg']} bytes per cart")
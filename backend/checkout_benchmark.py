@@ -0,0 +1,163 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from mongoengine import connect, disconnect
+from mongoengine.connection import get_db
+from models.product import Product
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+SCRATCH_URI = 'mongodb://localhost:27017/supermarket_checkout_benchmark'
+
+
+def call(port, method, path, token=None, body=None):
+    """(status, JSON body) of one request to the app on `port`"""
+    request = urllib.request.Request(f'http://127.0.0.1:{port}{path}', method=method,
+                                     data=json.dumps(body).encode() if body is not None else None,
+                                     headers={'Content-Type': 'application/json'})
+    if token:
+        request.add_header('Authorization', f'Bearer {token}')
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            return response.status, json.loads(response.read() or b'null')
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read() or b'null')
+
+
+def seed(uri, products):
+    """Empty the scratch database and add `products` products with unlimited stock; returns their ids"""
+    connect(host=uri)
+    db = get_db()
+    db.client.drop_database(db.name)
+    ids = []
+    for i in range(products):
+        product = Product(name=f'Checkout benchmark {i}', description='Temporary', price=1.0 + i % 10,
+                          category='Benchmark', image_url='https://example.com/benchmark.png', stock=10 ** 9)
+        product.save()
+        ids.append(str(product.id))
+    disconnect()
+    return ids
+
+
+def start(command, env):
+    return subprocess.Popen(command, cwd=BACKEND_DIR, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def shop(port, token, product_ids, index, deadline):
+    """
+    One client: place orders back to back until `deadline`.
+    
+    Queued orders are polled until placed or failed, so latency is always
+    request to order placed. The acceptance latency (the 202) is recorded
+    separately.
+    """
+    results = {'latency': [], 'accepted': [], 'failed': 0}
+    n = 0
+    while time.perf_counter() < deadline:
+        items = [{'product_id': product_ids[(index + n + k) % len(product_ids)], 'quantity': 1} for k in range(3)]
+        n += 1
+        began = time.perf_counter()
+        status, body = call(port, 'POST', '/api/orders/', token, {'items': items})
+        accepted = time.perf_counter() - began
+        
+        order_id = body.get('order_id') if status == 202 else None
+        while status == 202:
+            time.sleep(0.01)
+            status, body = call(port, 'GET', f'/api/orders/{order_id}', token)
+        
+        if status in (200, 201):
+            results['latency'].append(time.perf_counter() - began)
+            results['accepted'].append(accepted)
+        else:
+            results['failed'] += 1
+    return results
+
+
+def run(mode, port, uri, clients, duration, products, processes):
+    """orders/s, latency lists and failures for one CHECKOUT_MODE"""
+    product_ids = seed(uri, products)
+    env = dict(os.environ, MONGODB_URI=uri, CHECKOUT_MODE=mode, RATE_LIMIT_ENABLED='false')
+    server = start([sys.executable, '-c', f'from app import app; app.run(port={port}, threaded=True, use_reloader=False)'], env)
+    workers = start([sys.executable, 'checkout_worker.py', '--processes', str(processes)], env) if mode == 'queued' else None
+    try:
+        for _ in range(200):
+            try:
+                urllib.request.urlopen(f'http://127.0.0.1:{port}/api/health', timeout=1)
+                break
+            except OSError:
+                time.sleep(0.05)
+        
+        tokens = [call(port, 'POST', '/api/auth/register', body={
+            'username': f'checkout_benchmark_{i}', 'email': f'checkout_benchmark_{i}@example.com', 'password': 'password'
+        })[1]['access_token'] for i in range(clients)]
+        
+        began = time.perf_counter()
+        deadline = began + duration
+        with ThreadPoolExecutor(clients) as pool:
+            per_client = list(pool.map(lambda i: shop(port, tokens[i], product_ids, i, deadline), range(clients)))
+        
+        results = {'latency': [], 'accepted': [], 'failed': 0}
+        for client in per_client:
+            results['latency'] += client['latency']
+            results['accepted'] += client['accepted']
+            results['failed'] += client['failed']
+        
+        # Orders still in the queue at the deadline are waited for, so count over the real span
+        results['rate'] = len(results['latency']) / (time.perf_counter() - began)
+        return results
+    finally:
+        for process in (server, workers):
+            if process:
+                process.terminate()
+                process.wait()
+
+
+def percentiles(seconds):
+    """(p50, p99) in milliseconds"""
+    if len(seconds) < 2:
+        return (seconds[0] * 1000,) * 2 if seconds else (0.0, 0.0)
+    cuts = statistics.quantiles(seconds, n=100)
+    return cuts[49] * 1000, cuts[98] * 1000
+
+
+if __name__ == "__main__":
+    """
+    Queued vs synchronous checkout benchmark.
+    
+    Runs the Flask app once with CHECKOUT_MODE=sync and once with
+    CHECKOUT_MODE=queued (plus checkout_worker.py), seeding a scratch
+    database each time. `--clients` concurrent clients register and then
+    place 3-item orders back to back for `--duration` seconds; queued
+    orders are polled until placed. Reports orders placed per second and
+    p50/p99 latency from request to placed order (and to the 202 for
+    queued). Needs a MongoDB server; the scratch database is dropped and
+    rebuilt, so never point --uri at real data.
+    
+    Usage:
+        python checkout_benchmark.py
+        python checkout_benchmark.py --uri mongodb://localhost:27017/checkout_scratch --clients 64 --processes 4
+    """
+    parser = argparse.ArgumentParser(description='Queued vs synchronous checkout benchmark')
+    parser.add_argument('--uri', default=SCRATCH_URI)
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=15)
+    parser.add_argument('--products', type=int, default=20)
+    parser.add_argument('--processes', type=int, default=2)
+    args = parser.parse_args()
+    
+    print(f'{args.clients} concurrent clients, 3-item orders over {args.products} products, {args.duration:g}s each')
+    for port, mode in ((5110, 'sync'), (5111, 'queued')):
+        results = run(mode, port, args.uri, args.clients, args.duration, args.products, args.processes)
+        p50, p99 = percentiles(results['latency'])
+        line = f"  {mode:<6}: {results['rate']:.0f} orders/s, placed p50 {p50:.0f} ms / p99 {p99:.0f} ms"
+        if mode == 'queued':
+            a50, a99 = percentiles(results['accepted'])
+            line += f", accepted p50 {a50:.0f} ms / p99 {a99:.0f} ms ({args.processes} workers)"
+        print(f"{line}, {results['failed']} failed")
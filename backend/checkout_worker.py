@@ -0,0 +1,35 @@
+import argparse
+from multiprocessing import Process
+from mongoengine import connect
+from config import Config
+
+
+def work(batch_size):
+    """Entry point of one worker process"""
+    # Each process needs its own MongoDB connection
+    connect(host=Config.MONGODB_URI)
+    
+    from services.checkout import run_worker
+    run_worker(batch_size=batch_size)
+
+
+if __name__ == "__main__":
+    """
+    Drains the queued checkout collection when CHECKOUT_MODE=queued.
+    
+    Usage:
+        python checkout_worker.py                 -> 2 processes
+        python checkout_worker.py --processes 4 --batch-size 100
+    """
+    parser = argparse.ArgumentParser(description='Process queued checkouts')
+    parser.add_argument('--processes', type=int, default=2)
+    parser.add_argument('--batch-size', type=int, default=Config.CHECKOUT_BATCH_SIZE)
+    args = parser.parse_args()
+    
+    workers = [Process(target=work, args=(args.batch_size,)) for _ in range(args.processes)]
+    for p in workers:
+        p.start()
+    print(f'✓ Started {len(workers)} checkout workers')
+    
+    for p in workers:
+        p.join()
@@ -10,9 +10,171 @@ class Config:
     # JWT
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'dev-jwt-secret-key')
     JWT_ACCESS_TOKEN_EXPIRES = 86400  # 24 hours
+    # Token checks below are read by Flask-JWT-Extended and, through
+    # services.tokens, by the async API, so both accept the same tokens.
+    # Values are Flask-JWT-Extended's defaults.
+    JWT_ALGORITHM = os.getenv('JWT_ALGORITHM', 'HS256')
+    JWT_DECODE_ALGORITHMS = None  # None: JWT_ALGORITHM only
+    JWT_PRIVATE_KEY = os.getenv('JWT_PRIVATE_KEY')  # RS*/ES*/PS* algorithms only
+    JWT_PUBLIC_KEY = os.getenv('JWT_PUBLIC_KEY')
+    JWT_DECODE_LEEWAY = int(os.getenv('JWT_DECODE_LEEWAY', 0))  # seconds
+    JWT_DECODE_AUDIENCE = None
+    JWT_DECODE_ISSUER = None
+    JWT_IDENTITY_CLAIM = 'sub'
+    JWT_TOKEN_LOCATION = os.getenv('JWT_TOKEN_LOCATION', 'headers').split(',')  # headers, query_string, cookies
+    JWT_HEADER_NAME = 'Authorization'
+    JWT_HEADER_TYPE = 'Bearer'
+    JWT_QUERY_STRING_NAME = 'jwt'
+    JWT_ACCESS_COOKIE_NAME = 'access_token_cookie'
+    JWT_COOKIE_CSRF_PROTECT = True
+    JWT_CSRF_METHODS = ['POST', 'PUT', 'PATCH', 'DELETE']
+    JWT_ACCESS_CSRF_HEADER_NAME = 'X-CSRF-TOKEN'
     
     # Flask
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret-key')
     
     # CORS
     CORS_ORIGINS = os.getenv('CORS_ORIGINS', 'http://localhost:5173').split(',')
+    
+    # Hot SKU stock sharding
+    STOCK_SHARDS = int(os.getenv('STOCK_SHARDS', 8))
+    STOCK_REBALANCE_INTERVAL = int(os.getenv('STOCK_REBALANCE_INTERVAL', 30))  # seconds, 0 disables
+    
+    # Checkout - 'sync' places orders in the request, 'queued' answers 202
+    # and leaves the work to checkout_worker.py processes
+    CHECKOUT_MODE = os.getenv('CHECKOUT_MODE', 'sync')
+    CHECKOUT_BATCH_SIZE = int(os.getenv('CHECKOUT_BATCH_SIZE', 50))
+    CHECKOUT_POLL_INTERVAL = float(os.getenv('CHECKOUT_POLL_INTERVAL', 0.2))  # seconds
+    CHECKOUT_CLAIM_TIMEOUT = int(os.getenv('CHECKOUT_CLAIM_TIMEOUT', 60))  # seconds
+    
+    # Product change events (SSE) - 'local' for a single process, 'mongo'
+    # to share events between workers through a capped collection
+    PRODUCT_EVENTS_BACKEND = os.getenv('PRODUCT_EVENTS_BACKEND', 'local')
+    PRODUCT_EVENTS_QUEUE_SIZE = int(os.getenv('PRODUCT_EVENTS_QUEUE_SIZE', 100))
+    PRODUCT_EVENTS_HEARTBEAT = int(os.getenv('PRODUCT_EVENTS_HEARTBEAT', 15))  # seconds
+    PRODUCT_EVENTS_CAPPED_BYTES = int(os.getenv('PRODUCT_EVENTS_CAPPED_BYTES', 16 * 1024 * 1024))
+    PRODUCT_EVENTS_MAX_IDS = int(os.getenv('PRODUCT_EVENTS_MAX_IDS', 200))
+    
+    # Multi-get
+    PRODUCTS_BATCH_MAX = int(os.getenv('PRODUCTS_BATCH_MAX', 100))
+    
+    # Bootstrap
+    BOOTSTRAP_WORKERS = int(os.getenv('BOOTSTRAP_WORKERS', 8))
+    BOOTSTRAP_TIMEOUT = float(os.getenv('BOOTSTRAP_TIMEOUT', 5))  # seconds per section
+    
+    # Async (ASGI + motor) read path
+    ASYNC_MONGO_POOL_SIZE = int(os.getenv('ASYNC_MONGO_POOL_SIZE', 100))
+    
+    # "Customers also bought"
+    RELATED_TOP_K = int(os.getenv('RELATED_TOP_K', 10))  # served per product
+    RELATED_CANDIDATES = int(os.getenv('RELATED_CANDIDATES', 50))  # stored per product
+    RELATED_CHUNK_ORDERS = int(os.getenv('RELATED_CHUNK_ORDERS', 200000))
+    
+    # Demand forecast / reorder report
+    FORECAST_HISTORY_DAYS = int(os.getenv('FORECAST_HISTORY_DAYS', 90))
+    FORECAST_SHORT_WINDOW = int(os.getenv('FORECAST_SHORT_WINDOW', 7))  # days
+    FORECAST_LONG_WINDOW = int(os.getenv('FORECAST_LONG_WINDOW', 28))  # days
+    FORECAST_CACHE_TTL = int(os.getenv('FORECAST_CACHE_TTL', 600))  # seconds
+    REORDER_LEAD_DAYS = int(os.getenv('REORDER_LEAD_DAYS', 7))
+    REORDER_SAFETY_DAYS = int(os.getenv('REORDER_SAFETY_DAYS', 3))
+    REORDER_REVIEW_DAYS = int(os.getenv('REORDER_REVIEW_DAYS', 7))
+    
+    # Order archive - orders older than this move to orders_archive_YYYY_MM
+    ORDER_ARCHIVE_AFTER_DAYS = int(os.getenv('ORDER_ARCHIVE_AFTER_DAYS', 365))
+    ORDER_ARCHIVE_BATCH = int(os.getenv('ORDER_ARCHIVE_BATCH', 1000))
+    
+    # Carts untouched for this many days are removed by a TTL index (0 keeps them)
+    CART_TTL_DAYS = int(os.getenv('CART_TTL_DAYS', 30))
+    
+    # Admission control - concurrent requests per route class. `queue` is how
+    # many may wait for a slot and `timeout` how long (seconds) before a 503;
+    # ADMISSION_CHECKOUT_RESERVED of the ADMISSION_CAPACITY slots are kept
+    # for checkout. ADMISSION_CAPACITY=0 disables admission control.
+    ADMISSION_CAPACITY = int(os.getenv('ADMISSION_CAPACITY', 32))
+    ADMISSION_CHECKOUT_RESERVED = int(os.getenv('ADMISSION_CHECKOUT_RESERVED', 8))
+    ADMISSION_RETRY_AFTER = int(os.getenv('ADMISSION_RETRY_AFTER', 1))  # seconds
+    ADMISSION_CLASSES = {
+        'checkout': {'limit': int(os.getenv('ADMISSION_CHECKOUT_LIMIT', 32)), 'queue': 64, 'timeout': 10.0, 'priority': True},
+        'auth': {'limit': int(os.getenv('ADMISSION_AUTH_LIMIT', 4)), 'queue': 16, 'timeout': 2.0},
+        'browse': {'limit': int(os.getenv('ADMISSION_BROWSE_LIMIT', 24)), 'queue': 32, 'timeout': 0.5},
+        'default': {'limit': int(os.getenv('ADMISSION_DEFAULT_LIMIT', 16)), 'queue': 32, 'timeout': 2.0}
+    }
+    
+    # Catalog reads are served stale-while-revalidate: fresh for TTL seconds,
+    # then served stale while one background refresh runs. Entries older
+    # than MAX_STALE are reloaded in the request unless Mongo is down.
+    CATALOG_CACHE_TTL = float(os.getenv('CATALOG_CACHE_TTL', 10))  # seconds
+    CATALOG_CACHE_MAX_STALE = float(os.getenv('CATALOG_CACHE_MAX_STALE', 600))  # seconds
+    CATALOG_CACHE_MAX_ENTRIES = int(os.getenv('CATALOG_CACHE_MAX_ENTRIES', 2000))
+    CATALOG_REFRESH_WORKERS = int(os.getenv('CATALOG_REFRESH_WORKERS', 2))
+    
+    # Listing totals - default ?count= strategy (exact|estimate|none) and
+    # how long counts per filter are cached
+    PRODUCT_COUNT_DEFAULT = os.getenv('PRODUCT_COUNT_DEFAULT', 'estimate')
+    PRODUCT_COUNT_TTL = float(os.getenv('PRODUCT_COUNT_TTL', 30))  # seconds
+    PRODUCT_COUNT_MAX_ENTRIES = int(os.getenv('PRODUCT_COUNT_MAX_ENTRIES', 1000))
+    
+    # Mongo circuit breaker - opens after THRESHOLD consecutive driver errors
+    # and lets a trial call through every RESET seconds
+    MONGO_BREAKER_THRESHOLD = int(os.getenv('MONGO_BREAKER_THRESHOLD', 5))
+    MONGO_BREAKER_RESET = int(os.getenv('MONGO_BREAKER_RESET', 5))  # seconds
+    
+    # Request profiling - off unless a sample rate or token is set. Requests
+    # sending `X-Profile-Token: <PROFILE_TOKEN>` are always profiled.
+    PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', 0))  # 0..1
+    PROFILE_TOKEN = os.getenv('PROFILE_TOKEN')
+    PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+    PROFILE_INTERVAL = float(os.getenv('PROFILE_INTERVAL', 0.001))  # seconds between samples
+    
+    # Startup budgets checked by startup_check.py (milliseconds)
+    STARTUP_IMPORT_BUDGET_MS = float(os.getenv('STARTUP_IMPORT_BUDGET_MS', 800))
+    STARTUP_HEALTHY_BUDGET_MS = float(os.getenv('STARTUP_HEALTHY_BUDGET_MS', 2000))
+    
+    # Logout / token revocation. Each worker keeps revoked JTIs in memory and
+    # polls revoked_tokens every REFRESH seconds; a token revoked on another
+    # worker is honoured here within that delay.
+    REVOCATION_REFRESH_INTERVAL = float(os.getenv('REVOCATION_REFRESH_INTERVAL', 2))  # seconds
+    REVOCATION_FULL_RELOAD = int(os.getenv('REVOCATION_FULL_RELOAD', 3600))  # seconds
+    REVOCATION_BLOOM_CAPACITY = int(os.getenv('REVOCATION_BLOOM_CAPACITY', 1000000))
+    REVOCATION_BLOOM_ERROR_RATE = float(os.getenv('REVOCATION_BLOOM_ERROR_RATE', 0.001))
+    
+    # Idempotency-Key on POST /api/orders - responses are kept for TTL seconds;
+    # a duplicate waits up to WAIT seconds for the attempt in progress
+    IDEMPOTENCY_TTL = int(os.getenv('IDEMPOTENCY_TTL', 86400))  # seconds
+    IDEMPOTENCY_WAIT = float(os.getenv('IDEMPOTENCY_WAIT', 10))  # seconds
+    IDEMPOTENCY_LOCK_TIMEOUT = int(os.getenv('IDEMPOTENCY_LOCK_TIMEOUT', 60))  # seconds
+    IDEMPOTENCY_LRU_SIZE = int(os.getenv('IDEMPOTENCY_LRU_SIZE', 10000))
+    
+    # Rate limiting - token buckets per client. `burst` is the bucket size and
+    # `per_minute` the refill rate; `per` picks the client key ('ip', or
+    # 'user' with the IP as fallback for anonymous requests). The first
+    # policy whose methods/paths/args match a request applies.
+    RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+    RATE_LIMIT_BACKEND = os.getenv('RATE_LIMIT_BACKEND', 'memory')  # 'memory' | 'mongo'
+    RATE_LIMIT_TRUST_FORWARDED = os.getenv('RATE_LIMIT_TRUST_FORWARDED', 'false').lower() == 'true'
+    RATE_LIMIT_MAX_KEYS = int(os.getenv('RATE_LIMIT_MAX_KEYS', 100000))
+    RATE_LIMIT_IDLE_SECONDS = int(os.getenv('RATE_LIMIT_IDLE_SECONDS', 600))
+    RATE_LIMITS = {
+        'auth': {'methods': ['POST'], 'paths': ['/api/auth/login', '/api/auth/register'],
+                 'per': 'ip', 'burst': 10, 'per_minute': 10},
+        'checkout': {'methods': ['POST'], 'paths': ['/api/orders'], 'per': 'user', 'burst': 10, 'per_minute': 10},
+        'search': {'methods': ['GET'], 'paths': ['/api/products'], 'args': ['search'],
+                   'per': 'user', 'burst': 30, 'per_minute': 60},
+        'default': {'per': 'user', 'burst': 120, 'per_minute': 600}
+    }
+    
+    # Promotions - seconds between checks for changed promotion rules
+    PROMOTIONS_CACHE_TTL = float(os.getenv('PROMOTIONS_CACHE_TTL', 5))
+    
+    # Product image proxy (/api/images) - resized variants (longest edge in
+    # px) kept in a size-bounded on-disk LRU
+    IMAGE_CACHE_DIR = os.getenv('IMAGE_CACHE_DIR', 'image_cache')
+    IMAGE_CACHE_MAX_BYTES = int(os.getenv('IMAGE_CACHE_MAX_MB', 512)) * 1024 * 1024
+    IMAGE_VARIANTS = {'thumb': 160, 'card': 400, 'full': 1200}
+    IMAGE_QUALITY = int(os.getenv('IMAGE_QUALITY', 80))
+    IMAGE_FETCH_TIMEOUT = float(os.getenv('IMAGE_FETCH_TIMEOUT', 10))  # seconds
+    IMAGE_MAX_SOURCE_BYTES = int(os.getenv('IMAGE_MAX_SOURCE_MB', 20)) * 1024 * 1024
+    # Browsers reuse images for MAX_AGE seconds, then revalidate with the ETag
+    # in the background for up to STALE seconds
+    IMAGE_MAX_AGE = int(os.getenv('IMAGE_MAX_AGE', 86400))
+    IMAGE_STALE = int(os.getenv('IMAGE_STALE', 2592000))
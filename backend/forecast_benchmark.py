@@ -0,0 +1,77 @@
+import argparse
+import statistics
+import sys
+import time
+import numpy as np
+from services.forecast import sales_matrix, forecast
+
+
+def synthetic(products, days, density, rng):
+    """
+    Aggregation output as arrays: one (product code, day offset, units)
+    entry for `density` of the products x days cells, and stock levels
+    with about 5% of products sold out.
+    """
+    cells = int(products * days * density)
+    codes = rng.integers(0, products, cells)
+    offsets = rng.integers(0, days, cells)
+    units = rng.integers(1, 10, cells).astype(np.float32)
+    stock = np.where(rng.random(products) < 0.05, 0, rng.integers(1, 500, products)).astype(np.float64)
+    return codes, offsets, units, stock
+
+
+def timings(codes, offsets, units, stock, products, days, repeat):
+    """Seconds per stage (matrix, forecast, ranking) for `repeat` runs"""
+    results = {'matrix': [], 'forecast': [], 'ranking': []}
+    for _ in range(repeat):
+        start = time.perf_counter()
+        sales = sales_matrix(codes, offsets, units, products, days)
+        built = time.perf_counter()
+        metrics = forecast(sales, stock)
+        forecasted = time.perf_counter()
+        np.argsort(metrics['days_of_cover'], kind='stable')
+        ranked = time.perf_counter()
+        results['matrix'].append(built - start)
+        results['forecast'].append(forecasted - built)
+        results['ranking'].append(ranked - forecasted)
+    return results
+
+
+if __name__ == "__main__":
+    """
+    Reorder forecast benchmark.
+    
+    Times the array stages of services.forecast.build_report on synthetic
+    data: scattering sales into the products x days matrix, forecast(),
+    and ranking by days of cover. The default shape is 100k SKUs x 365
+    days, with sales on 20% of the cells. Reading the aggregation from
+    MongoDB is not included. Exits with status 1 when the median total is
+    above `--budget-s`. Runs in memory; no MongoDB server is needed.
+    
+    Usage:
+        python forecast_benchmark.py
+        python forecast_benchmark.py --products 100000 --days 365 --density 0.2 --budget-s 5
+    """
+    parser = argparse.ArgumentParser(description='Reorder forecast benchmark')
+    parser.add_argument('--products', type=int, default=100_000)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--density', type=float, default=0.2)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--budget-s', type=float, default=5.0)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    
+    codes, offsets, units, stock = synthetic(args.products, args.days, args.density,
+                                             np.random.default_rng(args.seed))
+    results = timings(codes, offsets, units, stock, args.products, args.days, args.repeat)
+    
+    print(f'{args.products:,} SKUs x {args.days} days, {len(codes):,} sales entries, {args.repeat} runs')
+    for stage, seconds in results.items():
+        print(f'  {stage:<9} median {statistics.median(seconds):.3f}s')
+    total = statistics.median(map(sum, zip(*results.values())))
+    print(f'  total     median {total:.3f}s')
+    
+    if total > args.budget_s:
+        print(f'✗ Forecast takes more than {args.budget_s:g}s')
+        sys.exit(1)
+    print(f'✓ Forecast is within {args.budget_s:g}s')
@@ -2,5 +2,19 @@
 from .product import Product
 from .order import Order
 from .cart import Cart
+from .stock_shard import StockShard
+from .checkout_intent import CheckoutIntent
+from .sales_rollup import DailySales, ProductSales, CategorySales
+from .related_products import RelatedProducts
+from .job_checkpoint import JobCheckpoint
+from .order_archive_index import OrderArchiveIndex
+from .product_version import ProductVersion
+from .revoked_token import RevokedToken
+from .idempotency_record import IdempotencyRecord
+from .promotion import Promotion
 
-__all__ = ['User', 'Product', 'Order', 'Cart']
+__all__ = ['User', 'Product', 'Order', 'Cart', 'StockShard', 'CheckoutIntent',
+           'DailySales', 'ProductSales', 'CategorySales',
+           'RelatedProducts', 'JobCheckpoint', 'OrderArchiveIndex',
+           'ProductVersion', 'RevokedToken', 'IdempotencyRecord',
+           'Promotion']
@@ -1,18 +1,29 @@
 from mongoengine import Document, ReferenceField, ListField, EmbeddedDocument, EmbeddedDocumentField, StringField, IntField, DateTimeField, DictField
 from datetime import datetime
 from .user import User
+from .product_version import ProductVersion
+from config import Config
 
 class CartItem(EmbeddedDocument):
     product_id = StringField(required=True)
     quantity = IntField(required=True, min_value=1)
     # Product snapshot - stored when item is added to cart
     product_snapshot = DictField(required=False, default=dict)
-    # Structure: {
-    #   'name': str,
-    #   'price': float,
-    #   'image_url': str,
-    #   'category': str (optional)
-    # }
+    # Structure: {'v': int} - the ProductVersion the customer saw.
+    # Carts written before versioning hold the full legacy snapshot
+    # {'name', 'price', 'image_url', 'category'} until their next read.
+    
+    @staticmethod
+    def snapshot_of(product):
+        """Compact snapshot of a product's current version"""
+        ProductVersion.record(product)
+        return {'v': product.version}
+    
+    @staticmethod
+    def snapshots_of(products):
+        """snapshot_of() for several products, recording their versions with one write"""
+        ProductVersion.record_many(products)
+        return [{'v': product.version} for product in products]
 
 class Cart(Document):
     user = ReferenceField(User, required=True, unique=True)
@@ -21,17 +32,74 @@ class Cart(Document):
     
     meta = {
         'collection': 'carts',
-        'indexes': ['user']
+        'indexes': ['user'] + ([
+            # Abandoned carts expire CART_TTL_DAYS after their last change
+            {'fields': ['updated_at'], 'expireAfterSeconds': Config.CART_TTL_DAYS * 86400}
+        ] if Config.CART_TTL_DAYS > 0 else [])
     }
     
+    @classmethod
+    def _get_collection(cls):
+        """MongoEngine's collection; on first use in a process the TTL index is first brought in line with CART_TTL_DAYS"""
+        if cls._collection is None:
+            cls.reconcile_ttl(cls._get_db()[cls._get_collection_name()], Config.CART_TTL_DAYS)
+        return super()._get_collection()
+    
+    @staticmethod
+    def reconcile_ttl(collection, days):
+        """
+        Make an existing updated_at index match a changed CART_TTL_DAYS.
+        
+        Building it again with another expireAfterSeconds would raise
+        IndexOptionsConflict, so the TTL is changed in place with collMod.
+        With days = 0 the TTL index is dropped and carts stop expiring. A
+        plain (non-TTL) updated_at index is dropped for ensure_indexes to
+        rebuild.
+        """
+        seconds = days * 86400
+        for index in list(collection.list_indexes()):
+            if dict(index['key']) != {'updated_at': 1}:
+                continue
+            ttl = index.get('expireAfterSeconds')
+            if days > 0 and ttl is not None:
+                if ttl != seconds:
+                    collection.database.command({
+                        'collMod': collection.name,
+                        'index': {'keyPattern': {'updated_at': 1}, 'expireAfterSeconds': seconds}
+                    })
+            elif days > 0 or ttl is not None:
+                # A plain index where the TTL one belongs, or expiry turned off
+                collection.drop_index(index['name'])
+    
+    def resolve_snapshots(self):
+        """
+        Full snapshot dict per item, in item order.
+        
+        Compact snapshots are resolved with one ProductVersion query for the
+        whole cart; legacy full snapshots are returned as stored.
+        """
+        refs = [(item.product_id, item.product_snapshot['v'])
+                for item in self.items if 'v' in (item.product_snapshot or {})]
+        versions = ProductVersion.lookup(refs)
+        
+        snapshots = []
+        for item in self.items:
+            snapshot = item.product_snapshot or {}
+            if 'v' in snapshot:
+                version = versions.get((item.product_id, snapshot['v']))
+                snapshot = version.to_snapshot() if version else {}
+            snapshots.append(snapshot)
+        return snapshots
+    
     def to_dict(self):
-        """Convert to dictionary"""
+        """Convert to dictionary, with full snapshots resolved (one query)"""
         return {
-            'user_id': str(self.user.id),
+            # Read the stored reference; self.user would load the User document
+            'user_id': str(getattr(self._data['user'], 'id', self._data['user'])),
             'items': [{
                 'product_id': item.product_id,
                 'quantity': item.quantity,
-                'product_snapshot': item.product_snapshot or {}
-            } for item in self.items],
+                'product_snapshot': snapshot
+            } for item, snapshot in zip(self.items, self.resolve_snapshots())],
             'updated_at': self.updated_at.isoformat()
         }
\ No newline at end of file
@@ -0,0 +1,35 @@
+from mongoengine import Document, ReferenceField, ListField, EmbeddedDocument, EmbeddedDocumentField, StringField, IntField, DateTimeField
+from datetime import datetime
+from .user import User
+
+class CheckoutItem(EmbeddedDocument):
+    product_id = StringField(required=True)
+    quantity = IntField(required=True, min_value=1)
+
+class CheckoutIntent(Document):
+    """
+    A queued checkout waiting to be turned into an Order.
+    
+    The intent's id is reused as the id of the resulting Order, so clients
+    can poll GET /api/orders/<id> with the id they got back from the 202.
+    """
+    user = ReferenceField(User, required=True)
+    items = ListField(EmbeddedDocumentField(CheckoutItem), required=True)
+    status = StringField(default='pending', choices=['pending', 'processing', 'completed', 'failed'])
+    error = StringField()
+    created_at = DateTimeField(default=datetime.utcnow)
+    claimed_at = DateTimeField()
+    
+    meta = {
+        'collection': 'checkout_queue',
+        'indexes': [('status', 'created_at')]
+    }
+    
+    def to_dict(self):
+        """Convert to dictionary"""
+        return {
+            'id': str(self.id),
+            'status': self.status,
+            'error': self.error,
+            'created_at': self.created_at.isoformat()
+        }
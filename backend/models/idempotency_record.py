@@ -0,0 +1,26 @@
+from mongoengine import Document, StringField, IntField, DictField, DateTimeField
+from datetime import datetime
+
+class IdempotencyRecord(Document):
+    """
+    The outcome of a request sent with an Idempotency-Key.
+    
+    Created as 'in_progress' when the first attempt starts, so other
+    workers can see it is being handled, and completed with the response
+    that retries get back. Removed by a TTL index after IDEMPOTENCY_TTL.
+    """
+    key = StringField(required=True)  # '<user id>:<Idempotency-Key>'
+    fingerprint = StringField(required=True)  # hash of the request body
+    status = StringField(default='in_progress', choices=['in_progress', 'completed'])
+    response_status = IntField()
+    response_body = DictField()
+    locked_at = DateTimeField(default=datetime.utcnow)
+    expires_at = DateTimeField(required=True)
+    
+    meta = {
+        'collection': 'idempotency_keys',
+        'indexes': [
+            {'fields': ['key'], 'unique': True},
+            {'fields': ['expires_at'], 'expireAfterSeconds': 0}
+        ]
+    }
@@ -0,0 +1,20 @@
+from mongoengine import Document, StringField, DateTimeField
+
+class JobCheckpoint(Document):
+    """High-water mark of a background job, e.g. the last order it processed"""
+    name = StringField(required=True)
+    value = DateTimeField()
+    
+    meta = {
+        'collection': 'job_checkpoints',
+        'indexes': [{'fields': ['name'], 'unique': True}]
+    }
+    
+    @classmethod
+    def get(cls, name):
+        checkpoint = cls.objects(name=name).first()
+        return checkpoint.value if checkpoint else None
+    
+    @classmethod
+    def set(cls, name, value):
+        cls.objects(name=name).update_one(set__value=value, upsert=True)
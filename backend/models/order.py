@@ -7,30 +7,40 @@ class OrderItem(EmbeddedDocument):
     product_name = StringField(required=True)
     quantity = IntField(required=True, min_value=1)
     price = FloatField(required=True, min_value=0)
+    # Promotion discount on the whole line (see services.pricing)
+    discount = FloatField(default=0, min_value=0)
 
 class Order(Document):
     user = ReferenceField(User, required=True)
     items = ListField(EmbeddedDocumentField(OrderItem), required=True)
+    subtotal = FloatField(min_value=0)
+    discount = FloatField(default=0, min_value=0)
     total = FloatField(required=True, min_value=0)
     status = StringField(default='completed', choices=['completed', 'cancelled'])
     created_at = DateTimeField(default=datetime.utcnow)
     
     meta = {
         'collection': 'orders',
-        'ordering': ['-created_at']
+        'ordering': ['-created_at'],
+        'indexes': [('user', '-created_at'), 'created_at']
     }
     
     def to_dict(self):
         """Convert to dictionary"""
         return {
             'id': str(self.id),
-            'user_id': str(self.user.id),
+            # Read the stored reference; self.user would load the User document
+            'user_id': str(getattr(self._data['user'], 'id', self._data['user'])),
             'items': [{
                 'product_id': item.product_id,
                 'product_name': item.product_name,
                 'quantity': item.quantity,
-                'price': item.price
+                'price': item.price,
+                'discount': item.discount
             } for item in self.items],
+            # Orders placed before promotions have no subtotal
+            'subtotal': self.subtotal if self.subtotal is not None else self.total,
+            'discount': self.discount,
             'total': self.total,
             'status': self.status,
             'created_at': self.created_at.isoformat()
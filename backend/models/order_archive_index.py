@@ -0,0 +1,16 @@
+from mongoengine import Document, ObjectIdField, ListField, StringField
+
+class OrderArchiveIndex(Document):
+    """
+    Which monthly archive collections hold a user's orders.
+    
+    Lets get_orders read only the archive months a user actually has
+    orders in instead of probing every orders_archive_YYYY_MM collection.
+    """
+    user = ObjectIdField(required=True)
+    months = ListField(StringField())  # 'YYYY_MM', newest first after sorting
+    
+    meta = {
+        'collection': 'archived_order_months',
+        'indexes': [{'fields': ['user'], 'unique': True}]
+    }
@@ -1,4 +1,32 @@
-﻿from mongoengine import Document, StringField, FloatField, IntField
+﻿from mongoengine import Document, StringField, FloatField, IntField, BooleanField
+import re
+from .stock_shard import StockShard
+
+# Listing sorts; the trailing id keeps pagination stable between equal keys
+LISTING_SORTS = {
+    None: ('id',),
+    'price': ('price', 'id'),
+    '-price': ('-price', '-id'),
+    'name': ('name', 'id')
+}
+
+
+def listing_index(category, in_stock, sort):
+    """
+    Fields of the index serving a listing: the equality filters used,
+    then the sort keys, then the remaining filterable fields. Price bounds
+    and the name search on those trailing fields are checked on index
+    keys, so only matching products are fetched; putting them ahead of
+    the sort keys would need an in-memory sort.
+    """
+    keys = [f.lstrip('-') for f in LISTING_SORTS[sort]]
+    return ((['category'] if category else []) + (['in_stock'] if in_stock else []) + keys
+            + [f for f in ('price', 'name') if f not in keys])
+
+
+# One index per (equality filters, sort) pair; '-price' walks the price index backwards
+LISTING_INDEXES = [tuple(listing_index(category, in_stock, sort))
+                   for category in (False, True) for in_stock in (False, True) for sort in (None, 'price', 'name')]
 
 class Product(Document):
     name = StringField(required=True, max_length=200)
@@ -7,8 +35,84 @@ class Product(Document):
     category = StringField(required=True, max_length=100)
     image_url = StringField()
     stock = IntField(required=True, min_value=0, default=0)
+    # Hot SKU mode - stock lives in StockShard documents instead of `stock`
+    hot_sku = BooleanField(default=False)
+    # stock > 0 or hot_sku, stored so in-stock listings can use an index;
+    # kept current by clean() and services.stock
+    in_stock = BooleanField(default=False)
+    # Bumped whenever a field shown in carts changes (see ProductVersion)
+    version = IntField(default=1)
+    
+    meta = {
+        'collection': 'products',
+        # See listing_index
+        'indexes': LISTING_INDEXES
+    }
+    
+    @classmethod
+    def _get_collection(cls):
+        """MongoEngine's collection; on first use in a process, products saved before in_stock existed get it"""
+        first = cls._collection is None
+        collection = super()._get_collection()
+        if first:
+            cls.backfill_in_stock(collection)
+        return collection
+    
+    @staticmethod
+    def backfill_in_stock(collection):
+        """Set in_stock on products that lack it; a no-op once every product has it"""
+        missing = {'in_stock': {'$exists': False}}
+        collection.update_many({**missing, '$or': [{'stock': {'$gt': 0}}, {'hot_sku': True}]},
+                               {'$set': {'in_stock': True}})
+        collection.update_many(missing, {'$set': {'in_stock': False}})
+    
+    def clean(self):
+        self.in_stock = bool(self.hot_sku or self.stock > 0)
+    
+    @staticmethod
+    def listing(category=None, search=None, min_price=None, max_price=None, in_stock=False, sort=None):
+        """
+        Raw filter, sort and index hint for a product listing.
+        
+        Returns (query, sort, hint) as pymongo key lists, shared by the
+        Flask and async listings. The hint pins the listing_index for the
+        filters and sort: category and in_stock are equality bounds, the
+        index is walked in sort order, and price bounds and the name search
+        are checked on index keys, so no combination scans the collection,
+        sorts in memory or fetches products it does not return.
+        Hot SKUs count as in stock; their stock lives in StockShard.
+        """
+        query = {}
+        if category:
+            query['category'] = category
+        if search:
+            # Same semantics as MongoEngine's name__icontains
+            query['name'] = {'$regex': re.escape(search), '$options': 'i'}
+        if min_price is not None or max_price is not None:
+            query['price'] = {}
+            if min_price is not None:
+                query['price']['$gte'] = min_price
+            if max_price is not None:
+                query['price']['$lte'] = max_price
+        if in_stock:
+            query['in_stock'] = True
+        
+        keys = [('_id' if f.lstrip('-') == 'id' else f.lstrip('-'), -1 if f.startswith('-') else 1)
+                for f in LISTING_SORTS[sort]]
+        hint = [('_id' if f == 'id' else f, 1) for f in listing_index(category, in_stock, sort)]
+        return query, keys, hint
+    
+    def available_stock(self):
+        """Current stock, summed across shards for hot SKUs"""
+        if self.hot_sku:
+            return StockShard.total_for(self.id)
+        return self.stock
     
-    meta = {'collection': 'products'}
+    @classmethod
+    def available_stocks(cls, products):
+        """available_stock() of several products by id string, with at most one shard query"""
+        shards = StockShard.totals_for([p.id for p in products if p.hot_sku])
+        return {str(p.id): shards.get(str(p.id), 0) if p.hot_sku else p.stock for p in products}
     
     def to_dict(self):
         """Convert to dictionary"""
@@ -19,5 +123,5 @@ class Product(Document):
             'price': self.price,
             'category': self.category,
             'image_url': self.image_url,
-            'stock': self.stock
+            'stock': self.available_stock()
         }
@@ -0,0 +1,67 @@
+from mongoengine import Document, StringField, FloatField, IntField
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+class ProductVersion(Document):
+    """
+    The customer-visible fields of a product at one version.
+    
+    Cart items reference a version number instead of copying these strings
+    into every cart. Versions are kept after a product is deleted so carts
+    can still show what was in them.
+    """
+    product_id = StringField(required=True)
+    version = IntField(required=True)
+    name = StringField()
+    price = FloatField()
+    image_url = StringField()
+    category = StringField()
+    
+    meta = {
+        'collection': 'product_versions',
+        'indexes': [{'fields': ['product_id', 'version'], 'unique': True}]
+    }
+    
+    @classmethod
+    def record(cls, product):
+        """Store the product's current version if it is not stored yet"""
+        cls.objects(product_id=str(product.id), version=product.version).update_one(
+            set_on_insert__name=product.name,
+            set_on_insert__price=product.price,
+            set_on_insert__image_url=product.image_url,
+            set_on_insert__category=product.category,
+            upsert=True
+        )
+    
+    @classmethod
+    def record_many(cls, products):
+        """record() for several products with one bulk write"""
+        requests = [UpdateOne(
+            {'product_id': str(p.id), 'version': p.version},
+            {'$setOnInsert': {'name': p.name, 'price': p.price, 'image_url': p.image_url, 'category': p.category}},
+            upsert=True
+        ) for p in {str(p.id): p for p in products}.values()]
+        if not requests:
+            return
+        try:
+            cls._get_collection().bulk_write(requests, ordered=False)
+        except BulkWriteError as e:
+            # A concurrent upsert inserted the same version first
+            if any(err['code'] != 11000 for err in e.details['writeErrors']):
+                raise
+    
+    @classmethod
+    def lookup(cls, refs):
+        """Fetch several (product_id, version) pairs with one query"""
+        if not refs:
+            return {}
+        query = [{'product_id': product_id, 'version': version} for product_id, version in set(refs)]
+        return {(v.product_id, v.version): v for v in cls.objects(__raw__={'$or': query})}
+    
+    def to_snapshot(self):
+        return {
+            'name': self.name,
+            'price': self.price,
+            'image_url': self.image_url,
+            'category': self.category
+        }
@@ -0,0 +1,50 @@
+from mongoengine import Document, StringField, FloatField, IntField, ListField, BooleanField, DateTimeField
+from mongoengine.errors import ValidationError
+from datetime import datetime
+
+class Promotion(Document):
+    """
+    A discount rule, evaluated by services.pricing.
+    
+    'percentage' takes `percent` off the line; 'multi_buy' charges `pay`
+    units for every `buy` (3 for 2: buy=3, pay=2). A promotion applies to
+    the listed `product_ids` and `categories`, or to everything when both
+    are empty. Each cart line gets the single best promotion.
+    """
+    name = StringField(required=True, max_length=200)
+    kind = StringField(required=True, choices=['percentage', 'multi_buy'])
+    percent = FloatField(min_value=0, max_value=100, default=0)
+    buy = IntField(min_value=1, default=1)
+    pay = IntField(min_value=0, default=1)
+    product_ids = ListField(StringField(), default=list)
+    categories = ListField(StringField(), default=list)
+    active = BooleanField(default=True)
+    starts_at = DateTimeField()
+    ends_at = DateTimeField()
+    updated_at = DateTimeField(default=datetime.utcnow)
+    
+    meta = {
+        'collection': 'promotions',
+        'indexes': ['-updated_at']
+    }
+    
+    def clean(self):
+        if self.kind == 'multi_buy' and not self.pay < self.buy:
+            raise ValidationError('multi_buy needs pay < buy')
+    
+    def to_dict(self):
+        """Convert to dictionary"""
+        return {
+            'id': str(self.id),
+            'name': self.name,
+            'kind': self.kind,
+            'percent': self.percent,
+            'buy': self.buy,
+            'pay': self.pay,
+            'product_ids': self.product_ids,
+            'categories': self.categories,
+            'active': self.active,
+            'starts_at': self.starts_at.isoformat() if self.starts_at else None,
+            'ends_at': self.ends_at.isoformat() if self.ends_at else None,
+            'updated_at': self.updated_at.isoformat()
+        }
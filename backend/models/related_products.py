@@ -0,0 +1,28 @@
+from mongoengine import Document, StringField, ListField, IntField, DateTimeField
+from datetime import datetime
+
+class RelatedProducts(Document):
+    """
+    Top co-purchased products for one product ("customers also bought").
+    
+    `related` and `counts` are parallel lists sorted by count, descending.
+    More candidates than are served are kept so incremental updates can
+    promote a neighbor that was just below the cut.
+    """
+    product_id = StringField(required=True)
+    related = ListField(StringField())
+    counts = ListField(IntField())
+    updated_at = DateTimeField(default=datetime.utcnow)
+    
+    meta = {
+        'collection': 'related_products',
+        'indexes': [{'fields': ['product_id'], 'unique': True}]
+    }
+    
+    def to_dict(self, limit=None):
+        """Convert to dictionary"""
+        pairs = list(zip(self.related, self.counts))[:limit]
+        return {
+            'product_id': self.product_id,
+            'related': [{'product_id': p, 'count': c} for p, c in pairs]
+        }
@@ -0,0 +1,23 @@
+from mongoengine import Document, StringField, DateTimeField
+from datetime import datetime
+
+class RevokedToken(Document):
+    """
+    A logged-out access token, by JTI.
+    
+    Documents are removed by a TTL index once the token would have expired
+    anyway. Workers poll this collection by `revoked_at` to keep their
+    in-memory denylist current.
+    """
+    jti = StringField(required=True)
+    expires_at = DateTimeField(required=True)
+    revoked_at = DateTimeField(default=datetime.utcnow)
+    
+    meta = {
+        'collection': 'revoked_tokens',
+        'indexes': [
+            {'fields': ['jti'], 'unique': True},
+            'revoked_at',
+            {'fields': ['expires_at'], 'expireAfterSeconds': 0}
+        ]
+    }
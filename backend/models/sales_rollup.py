@@ -0,0 +1,71 @@
+from mongoengine import Document, StringField, FloatField, IntField
+
+# Rollups maintained by services.analytics - one $inc per order, so the
+# admin analytics endpoints never have to scan the orders collection.
+
+class DailySales(Document):
+    day = StringField(required=True)  # YYYY-MM-DD (UTC)
+    revenue = FloatField(default=0)
+    orders = IntField(default=0)
+    units = IntField(default=0)
+    
+    meta = {
+        'collection': 'sales_daily',
+        'indexes': [{'fields': ['day'], 'unique': True}]
+    }
+    
+    def to_dict(self):
+        """Convert to dictionary"""
+        return {
+            'day': self.day,
+            'revenue': round(self.revenue, 2),
+            'orders': self.orders,
+            'units': self.units
+        }
+
+class ProductSales(Document):
+    product_id = StringField(required=True)
+    product_name = StringField()
+    category = StringField()
+    revenue = FloatField(default=0)
+    orders = IntField(default=0)
+    units = IntField(default=0)
+    
+    meta = {
+        'collection': 'sales_products',
+        'indexes': [
+            {'fields': ['product_id'], 'unique': True},
+            '-units',
+            '-revenue',
+            ('category', '-units')
+        ]
+    }
+    
+    def to_dict(self):
+        """Convert to dictionary"""
+        return {
+            'product_id': self.product_id,
+            'product_name': self.product_name,
+            'category': self.category,
+            'revenue': round(self.revenue, 2),
+            'orders': self.orders,
+            'units': self.units
+        }
+
+class CategorySales(Document):
+    category = StringField(required=True)
+    revenue = FloatField(default=0)
+    units = IntField(default=0)
+    
+    meta = {
+        'collection': 'sales_categories',
+        'indexes': [{'fields': ['category'], 'unique': True}]
+    }
+    
+    def to_dict(self):
+        """Convert to dictionary"""
+        return {
+            'category': self.category,
+            'revenue': round(self.revenue, 2),
+            'units': self.units
+        }
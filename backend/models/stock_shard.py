@@ -0,0 +1,42 @@
+from mongoengine import Document, StringField, IntField, ListField, DictField
+
+class StockShard(Document):
+    """
+    One sub-counter of a hot product's stock.
+    
+    When a product is flagged as a hot SKU its stock is split across
+    several shard documents so concurrent checkouts update different
+    documents instead of serializing on the product's write lock.
+    """
+    product_id = StringField(required=True)
+    shard = IntField(required=True, min_value=0)
+    stock = IntField(required=True, min_value=0, default=0)
+    # Rebalancer moves out of this shard not yet credited: {id, to, amount, at}
+    pending = ListField(DictField())
+    # Ids of the latest moves credited to this shard
+    applied = ListField(StringField())
+    
+    meta = {
+        'collection': 'stock_shards',
+        'indexes': [
+            {'fields': ['product_id', 'shard'], 'unique': True}
+        ]
+    }
+    
+    @classmethod
+    def total_for(cls, product_id):
+        """Sum stock across all shards of a product"""
+        result = list(cls.objects(product_id=str(product_id)).aggregate([
+            {'$group': {'_id': None, 'stock': {'$sum': '$stock'}}}
+        ]))
+        return result[0]['stock'] if result else 0
+    
+    @classmethod
+    def totals_for(cls, product_ids):
+        """Sum stock across shards for several products with one aggregation: {product_id: stock}"""
+        product_ids = [str(product_id) for product_id in product_ids]
+        if not product_ids:
+            return {}
+        return {row['_id']: row['stock'] for row in cls.objects(product_id__in=product_ids).aggregate([
+            {'$group': {'_id': '$product_id', 'stock': {'$sum': '$stock'}}}
+        ])}
@@ -0,0 +1,92 @@
+import argparse
+import random
+import statistics
+import sys
+import time
+from bson import ObjectId
+from models.promotion import Promotion
+from services import pricing
+
+
+def synthetic_rules(count, products, categories, rng):
+    """`count` active promotions over the given vocabulary, mixing kinds, scopes and windows"""
+    promotions = []
+    for index in range(count):
+        kind = rng.choice(['percentage', 'multi_buy'])
+        buy = rng.randint(2, 5)
+        scope = rng.random()
+        promotions.append(Promotion(
+            id=ObjectId(),
+            name=f'Rule {index}',
+            kind=kind,
+            percent=rng.randint(1, 50) if kind == 'percentage' else 0,
+            buy=buy if kind == 'multi_buy' else 1,
+            pay=buy - 1 if kind == 'multi_buy' else 1,
+            product_ids=rng.sample(products, rng.randint(1, 5)) if scope < 0.7 else [],
+            categories=rng.sample(categories, 1) if 0.6 < scope < 0.98 else []
+        ))
+    return promotions
+
+
+def synthetic_cart(count, products, categories, rng):
+    return [{
+        'product_id': rng.choice(products),
+        'category': rng.choice(categories),
+        'price': rng.randint(50, 2000) / 100,
+        'quantity': rng.randint(1, 6)
+    } for _ in range(count)]
+
+
+def timings(lines, compiled, repeat):
+    """Milliseconds per pricing.price call, `repeat` calls"""
+    pricing.price(lines, compiled=compiled)
+    results = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        pricing.price(lines, compiled=compiled)
+        results.append((time.perf_counter() - start) * 1000)
+    return results
+
+
+if __name__ == "__main__":
+    """
+    Pricing engine benchmark.
+    
+    Compiles `--rules` synthetic active promotions (product, category and
+    catalog-wide scopes) and times services.pricing.price on a `--lines`
+    cart, the hot path of every cart read and checkout. Exits with status
+    1 when the median is above `--budget-ms`. Runs in memory; no MongoDB
+    server is needed.
+    
+    Usage:
+        python pricing_benchmark.py
+        python pricing_benchmark.py --lines 200 --rules 1000 --repeat 2000 --budget-ms 1
+    """
+    parser = argparse.ArgumentParser(description='Pricing engine benchmark')
+    parser.add_argument('--lines', type=int, default=200)
+    parser.add_argument('--rules', type=int, default=1000)
+    parser.add_argument('--products', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=1000)
+    parser.add_argument('--budget-ms', type=float, default=1.0)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    
+    rng = random.Random(args.seed)
+    products = [str(ObjectId()) for _ in range(args.products)]
+    categories = [f'Category {i}' for i in range(40)]
+    
+    start = time.perf_counter()
+    compiled = pricing.CompiledRules(synthetic_rules(args.rules, products, categories, rng))
+    compile_ms = (time.perf_counter() - start) * 1000
+    lines = synthetic_cart(args.lines, products, categories, rng)
+    
+    results = timings(lines, compiled, args.repeat)
+    median = statistics.median(results)
+    p99 = statistics.quantiles(results, n=100)[98]
+    print(f'{args.lines} lines x {args.rules} rules, {args.repeat} calls (compile: {compile_ms:.1f} ms)')
+    print(f'median {median:.3f} ms   p99 {p99:.3f} ms   budget {args.budget_ms:g} ms')
+    
+    if median > args.budget_ms:
+        print(f'✗ Median pricing time is above {args.budget_ms:g} ms')
+        sys.exit(1)
+    print(f'✓ Median pricing time is within {args.budget_ms:g} ms')
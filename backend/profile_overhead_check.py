@@ -0,0 +1,115 @@
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+import timeit
+from app import create_app
+from config import Config
+
+TOKEN = 'overhead-check'
+
+# Hook lists on a Flask app, and the hooks _init_profiling adds to them
+HOOK_LISTS = ('before_request_funcs', 'after_request_funcs', 'teardown_request_funcs')
+PROFILING_HOOKS = {'start_profile', 'stop_profile'}
+
+
+def hook_sets(app):
+    """The app's request hooks with and without the profiling ones: (off, armed)"""
+    armed = {name: {key: list(funcs) for key, funcs in getattr(app, name).items()} for name in HOOK_LISTS}
+    off = {name: {key: [f for f in funcs if f.__name__ not in PROFILING_HOOKS] for key, funcs in lists.items()}
+           for name, lists in armed.items()}
+    return off, armed
+
+
+def per_request_us(requests, rounds, profile_dir):
+    """
+    ({setup: median over `rounds` of the mean time of one GET /api/health,
+    in µs}, µs spent in the profiling hooks per unsampled request).
+    
+    One app is built with profiling armed (PROFILE_TOKEN set); 'off' is the
+    same app with the profiling hooks taken out, as create_app leaves it
+    when profiling is not configured. Rounds alternate between the setups,
+    so drift (CPU frequency, other load) affects them all alike.
+    """
+    # services.profiling reads the global Config
+    Config.PROFILE_SAMPLE_RATE = 0
+    Config.PROFILE_TOKEN = TOKEN
+    Config.PROFILE_DIR = profile_dir
+    
+    class Armed(Config):
+        RATE_LIMIT_ENABLED = False
+        ADMISSION_CAPACITY = 0
+        STOCK_REBALANCE_INTERVAL = 0
+        REVOCATION_REFRESH_INTERVAL = 0
+    
+    app = create_app(Armed)
+    client = app.test_client()
+    off, armed = hook_sets(app)
+    setups = [('off', off, {}), ('armed', armed, {}), ('profiled', armed, {'X-Profile-Token': TOKEN})]
+    
+    timings = {name: [] for name, _, _ in setups}
+    for round in range(rounds + 1):
+        for name, hooks, headers in setups:
+            for hook_list, funcs in hooks.items():
+                getattr(app, hook_list).update(funcs)
+            started = time.perf_counter()
+            for _ in range(requests):
+                client.get('/api/health', headers=headers)
+            # The first round only warms up
+            if round:
+                timings[name].append((time.perf_counter() - started) / requests * 1e6)
+    results = {name: statistics.median(values) for name, values in timings.items()}
+    return results, hook_us(app, requests * 10)
+
+
+def hook_us(app, calls):
+    """
+    µs one unsampled request spends in the profiling hooks, timed directly
+    inside a request context. End-to-end timings of /api/health vary more
+    than this between rounds, so the budget is checked against this figure.
+    """
+    hooks = [(f, ()) for f in app.before_request_funcs.get(None, []) if f.__name__ in PROFILING_HOOKS]
+    hooks += [(f, (None,)) for f in app.teardown_request_funcs.get(None, []) if f.__name__ in PROFILING_HOOKS]
+    
+    def unsampled_request():
+        for hook, args in hooks:
+            hook(*args)
+    
+    with app.test_request_context('/api/health'):
+        return min(timeit.repeat(unsampled_request, number=calls, repeat=5)) / calls * 1e6
+
+
+if __name__ == "__main__":
+    """
+    Profiling overhead check.
+    
+    Times GET /api/health (the cheapest route, so the relative overhead is
+    the largest it can be) through the Flask test client with profiling
+    off (no hooks installed), armed (PROFILE_TOKEN set, request not
+    sampled) and sampling every request, then times the profiling hooks
+    of an unsampled request on their own. Exits with status 1 when the
+    hooks take more than --budget-us per request. MongoDB is not needed.
+    
+    Usage:
+        python profile_overhead_check.py
+        python profile_overhead_check.py --requests 5000 --rounds 15 --budget-us 5
+    """
+    parser = argparse.ArgumentParser(description='Profiling overhead check')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--rounds', type=int, default=9)
+    parser.add_argument('--budget-us', type=float, default=5)
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as profile_dir:
+        results, hooks = per_request_us(args.requests, args.rounds, profile_dir)
+    
+    off = results['off']
+    for name, us in results.items():
+        print(f'  {name:<9} {us:8.1f} µs/request  ({us - off:+.1f} µs, {us / off - 1:+.1%})')
+    print(f'  hooks of an unsampled request: {hooks:.2f} µs')
+    
+    if hooks > args.budget_us:
+        print(f'✗ Profiling hooks cost more than {args.budget_us:g} µs per unsampled request')
+        sys.exit(1)
+    print(f'✓ Unsampled requests pay at most {args.budget_us:g} µs for profiling')
@@ -0,0 +1,80 @@
+import argparse
+import itertools
+import sys
+from mongoengine import connect
+from models.product import Product, LISTING_SORTS
+from config import Config
+
+# Stages that mean MongoDB read more than the index or sorted in memory
+FORBIDDEN = {'COLLSCAN', 'SORT'}
+
+
+def stages(plan):
+    """All stage names in an explain() plan tree (classic and SBE formats)"""
+    plan = plan.get('queryPlan', plan)
+    found = [plan['stage']] if 'stage' in plan else []
+    for child in [plan.get('inputStage')] + plan.get('inputStages', []):
+        if child:
+            found += stages(child)
+    return found
+
+
+def listing_combinations():
+    """Every combination of product listing parameters, as list_products kwargs"""
+    for category, search, min_price, max_price, in_stock, sort in itertools.product(
+        [None, 'Fruits'], [None, 'apple'], [None, 1.0], [None, 10.0], [False, True], list(LISTING_SORTS)
+    ):
+        yield {'category': category, 'search': search, 'min_price': min_price,
+               'max_price': max_price, 'in_stock': in_stock, 'sort': sort}
+
+
+def listing_plan(collection, params):
+    """(stage names of the winning plan, documents examined, documents returned) for one listing"""
+    query, keys, hint = Product.listing(**params)
+    explain = collection.find(query).sort(keys).hint(hint).limit(20).explain()
+    stats = explain['executionStats']
+    return stages(explain['queryPlanner']['winningPlan']), stats['totalDocsExamined'], stats['nReturned']
+
+
+def check_listings(collection):
+    """(params, stages, examined, returned) for every listing that sorts in memory, scans or over-fetches"""
+    failures = []
+    for params in listing_combinations():
+        plan, examined, returned = listing_plan(collection, params)
+        if FORBIDDEN & set(plan) or examined > returned:
+            failures.append((params, plan, examined, returned))
+    return failures
+
+
+if __name__ == "__main__":
+    """
+    Query plan check for CI.
+    
+    Runs explain() for every combination of product listing filters and
+    sorts (see Product.listing) and exits with status 1 when any winning
+    plan contains a COLLSCAN or an in-memory SORT, or fetches more
+    products than it returns. Needs a MongoDB server with products - on
+    an empty collection only the stage check means anything. The same
+    check runs under pytest as tests/test_query_plans.py, on seeded data.
+    
+    Usage:
+        python query_plan_check.py
+        python query_plan_check.py --uri mongodb://localhost:27017/plan_check
+    """
+    parser = argparse.ArgumentParser(description='Product listing query plan check')
+    parser.add_argument('--uri', default=Config.MONGODB_URI)
+    args = parser.parse_args()
+    
+    connect(host=args.uri)
+    Product.ensure_indexes()
+    
+    failures = check_listings(Product._get_collection())
+    total = len(list(listing_combinations()))
+    for params, plan, examined, returned in failures:
+        shown = {k: v for k, v in params.items() if v}
+        print(f'  {shown or "(no filters)"}: {" <- ".join(plan)}, {examined} examined for {returned} returned')
+    
+    if failures:
+        print(f'✗ {len(failures)} of {total} listing queries scan, sort in memory or fetch unneeded products')
+        sys.exit(1)
+    print(f'✓ All {total} listing queries are served by an index in order, fetching only what they return')
@@ -0,0 +1,125 @@
+import argparse
+import sys
+import timeit
+from datetime import datetime
+from flask_jwt_extended import create_access_token
+from mongoengine import disconnect
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+from app import create_app
+from config import Config
+from services import ratelimit, revocation
+
+SCRATCH_URI = 'mongodb://localhost:27017/supermarket_ratelimit_check'
+COLLECTION = 'rate_limit_overhead_check'
+PATH = '/api/products?search=milk'
+
+
+def reachable(uri):
+    client = MongoClient(uri, serverSelectionTimeoutMS=1000)
+    try:
+        client.admin.command('ping')
+        return True
+    except PyMongoError:
+        return False
+    finally:
+        client.close()
+
+
+def hooks_us(app, headers, calls):
+    """
+    µs one request spends in the rate limiting hooks (limit_rate and
+    rate_limit_headers), timed directly inside a request context, best of
+    5 runs of `calls` requests.
+    """
+    before = next(f for f in app.before_request_funcs[None] if f.__name__ == 'limit_rate')
+    after = next(f for f in app.after_request_funcs[None] if f.__name__ == 'rate_limit_headers')
+    response = app.response_class()
+    
+    def limited_request():
+        before()
+        after(response)
+    
+    with app.test_request_context(PATH, headers=headers, environ_base={'REMOTE_ADDR': '10.0.0.1'}):
+        return min(timeit.repeat(limited_request, number=calls, repeat=5)) / calls * 1e6
+
+
+def run(uri, calls, mongo_calls):
+    """
+    {backend: {client: µs}} for anonymous and signed-in requests. The
+    Mongo backend is left out when `uri` does not answer.
+    """
+    class Limited(Config):
+        MONGODB_URI = uri
+        RATE_LIMIT_ENABLED = True
+        ADMISSION_CAPACITY = 0
+        STOCK_REBALANCE_INTERVAL = 0
+        REVOCATION_REFRESH_INTERVAL = 0
+    
+    # Buckets that never run dry, so every request takes the allowed path
+    Config.RATE_LIMITS = {name: dict(policy, burst=10 ** 12, per_minute=10 ** 12)
+                          for name, policy in Config.RATE_LIMITS.items()}
+    
+    # Importing app registered Config.MONGODB_URI; the buckets go to `uri`
+    disconnect()
+    app = create_app(Limited)
+    # Signed-in requests check the denylist; treat it as loaded (and
+    # empty) so the check never waits on MongoDB for it
+    revocation.denylist._since = datetime.utcnow()
+    with app.app_context():
+        token = create_access_token(identity='0' * 24)
+    clients = {'anonymous': {}, 'signed in': {'Authorization': f'Bearer {token}'}}
+    
+    backends = {'memory': (ratelimit.MemoryBackend(Config.RATE_LIMIT_MAX_KEYS), calls)}
+    if reachable(uri):
+        backends['mongo'] = (ratelimit.MongoBackend(COLLECTION), mongo_calls)
+    
+    results = {}
+    try:
+        for name, (backend, count) in backends.items():
+            ratelimit.backend = backend
+            results[name] = {client: hooks_us(app, headers, count) for client, headers in clients.items()}
+    finally:
+        if 'mongo' in backends:
+            backends['mongo'][0].collection.drop()
+    return results
+
+
+if __name__ == "__main__":
+    """
+    Rate limiting overhead check.
+    
+    Times the rate limiting hooks of one request (policy match, optional
+    JWT check, bucket take, headers) for an anonymous and a signed-in
+    client, with the in-memory backend and, when --uri answers, the
+    MongoDB backend (one findOneAndUpdate per request, in a scratch
+    collection that is dropped afterwards). Exits with status 1 when a
+    backend exceeds its budget. Only the Mongo backend needs a server.
+    
+    Usage:
+        python ratelimit_overhead_check.py
+        python ratelimit_overhead_check.py --uri mongodb://localhost:27017/ratelimit_scratch --budget-us 300 --mongo-budget-us 3000
+    """
+    parser = argparse.ArgumentParser(description='Rate limiting overhead check')
+    parser.add_argument('--uri', default=SCRATCH_URI)
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--mongo-requests', type=int, default=2000)
+    parser.add_argument('--budget-us', type=float, default=300)
+    parser.add_argument('--mongo-budget-us', type=float, default=3000)
+    args = parser.parse_args()
+    
+    results = run(args.uri, args.requests, args.mongo_requests)
+    budgets = {'memory': args.budget_us, 'mongo': args.mongo_budget_us}
+    
+    failed = False
+    for backend, clients in results.items():
+        print(f"  {backend:<7} " + ', '.join(f'{client} {us:.1f} µs' for client, us in clients.items())
+              + f'  (budget {budgets[backend]:g} µs)')
+        failed |= max(clients.values()) > budgets[backend]
+    if 'mongo' not in results:
+        print(f'  mongo   skipped: no MongoDB server at {args.uri}')
+    
+    if failed:
+        print('✗ Rate limiting costs more than its budget per request')
+        sys.exit(1)
+    print('✓ Rate limiting stays within budget per request')
@@ -0,0 +1,113 @@
+import argparse
+import random
+import resource
+import sys
+import time
+from datetime import datetime, timedelta
+from itertools import accumulate
+from multiprocessing import Process, Queue
+from bson import ObjectId
+from mongoengine import connect, disconnect
+from mongoengine.connection import get_db
+from models.order import Order
+from models.product import Product
+from services import analytics, recommendations
+
+SCRATCH_URI = 'mongodb://localhost:27017/supermarket_rebuild_benchmark'
+
+
+def seed(uri, orders, products, seed_value=0):
+    """
+    Empty the scratch database and insert `products` products and `orders`
+    completed orders of 1-8 lines over the past year. Popularity is Zipf-like
+    (a few products are in far more baskets), like a real catalog.
+    """
+    connect(host=uri)
+    db = get_db()
+    db.client.drop_database(db.name)
+    rng = random.Random(seed_value)
+    
+    catalog = [{'_id': ObjectId(), 'name': f'Product {i}', 'price': round(rng.uniform(0.5, 20), 2),
+                'category': f'Category {i % 40}', 'stock': 100} for i in range(products)]
+    Product._get_collection().insert_many(catalog)
+    cumulative = list(accumulate(1 / (rank + 1) for rank in range(products)))
+    
+    collection = Order._get_collection()
+    user = ObjectId()
+    now = datetime.utcnow()
+    batch = []
+    for _ in range(orders):
+        lines = rng.choices(catalog, cum_weights=cumulative, k=rng.randint(1, 8))
+        items = [{'product_id': str(p['_id']), 'product_name': p['name'], 'quantity': rng.randint(1, 3),
+                  'price': p['price'], 'discount': 0} for p in lines]
+        total = round(sum(item['price'] * item['quantity'] for item in items), 2)
+        batch.append({'user': user, 'items': items, 'subtotal': total, 'discount': 0, 'total': total,
+                      'status': 'completed', 'created_at': now - timedelta(seconds=rng.randint(0, 365 * 86400))})
+        if len(batch) == 10000:
+            collection.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        collection.insert_many(batch, ordered=False)
+    # The jobs run in forked processes, which must not inherit this client
+    disconnect()
+
+
+def measure(uri, job, results):
+    """Child process: run one rebuild, report (seconds, peak RSS in MB, RSS before it in MB)"""
+    connect(host=uri)
+    # Load the models and NumPy before the baseline
+    Order._get_collection()
+    before = peak_rss_mb()
+    start = time.perf_counter()
+    {'recommendations': recommendations.build, 'analytics': analytics.backfill}[job]()
+    results.put((time.perf_counter() - start, peak_rss_mb(), before))
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def run(uri, job):
+    """Time `job` in a fresh process, so its peak RSS is its own"""
+    results = Queue()
+    process = Process(target=measure, args=(uri, job, results))
+    process.start()
+    outcome = results.get()
+    process.join()
+    return outcome
+
+
+if __name__ == "__main__":
+    """
+    Rebuild benchmark for the order-history batch jobs.
+    
+    Seeds `--orders` completed orders (default 1M) into a scratch database,
+    then times the full "customers also bought" build
+    (services/recommendations.py) and the sales rollup backfill
+    (services/analytics.py), each in its own process. Reports wall time
+    and the job's peak resident memory. The rollup backfill runs inside
+    MongoDB, so its client memory stays flat. Needs a MongoDB server; the
+    scratch database is dropped and rebuilt, so never point --uri at real
+    data. --skip-seed reuses the orders of a previous run.
+    
+    Usage:
+        python rebuild_benchmark.py
+        python rebuild_benchmark.py --uri mongodb://localhost:27017/rebuild_scratch --orders 1000000 --products 5000
+    """
+    parser = argparse.ArgumentParser(description='Order-history rebuild benchmark')
+    parser.add_argument('--uri', default=SCRATCH_URI)
+    parser.add_argument('--orders', type=int, default=1_000_000)
+    parser.add_argument('--products', type=int, default=5000)
+    parser.add_argument('--skip-seed', action='store_true')
+    args = parser.parse_args()
+    
+    if not args.skip_seed:
+        start = time.perf_counter()
+        seed(args.uri, args.orders, args.products)
+        print(f'Seeded {args.orders:,} orders over {args.products:,} products in {time.perf_counter() - start:.0f}s')
+    
+    for job in ('recommendations', 'analytics'):
+        seconds, peak, before = run(args.uri, job)
+        print(f'  {job:<15} {seconds:7.1f}s   peak RSS {peak:6.0f} MB ({peak - before:+.0f} MB for the job)')
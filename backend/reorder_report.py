@@ -0,0 +1,30 @@
+import argparse
+import csv
+import sys
+from mongoengine import connect
+from config import Config
+from services.forecast import build_report
+
+if __name__ == "__main__":
+    """
+    Prints the low-stock reorder report as CSV.
+    
+    Usage:
+        python reorder_report.py               -> products to reorder
+        python reorder_report.py --all > report.csv
+    """
+    parser = argparse.ArgumentParser(description='Low-stock reorder report')
+    parser.add_argument('--all', action='store_true', help='Include products that need no reorder')
+    parser.add_argument('--days', type=int, default=Config.FORECAST_HISTORY_DAYS, help='Days of sales history')
+    args = parser.parse_args()
+    
+    connect(host=Config.MONGODB_URI)
+    
+    report = build_report(days=args.days)
+    rows = report['products'] if args.all else [p for p in report['products'] if p['reorder']]
+    
+    fields = ['product_id', 'name', 'category', 'stock', 'avg_daily_short', 'avg_daily_long',
+              'forecast_daily', 'days_of_cover', 'reorder', 'suggested_quantity']
+    writer = csv.DictWriter(sys.stdout, fieldnames=fields)
+    writer.writeheader()
+    writer.writerows(rows)
@@ -2,5 +2,9 @@
 from .products import products_bp
 from .orders import orders_bp
 from .cart import cart_bp
+from .bootstrap import bootstrap_bp
+from .analytics import analytics_bp
+from .promotions import promotions_bp
+from .images import images_bp
 
-__all__ = ['auth_bp', 'products_bp', 'orders_bp', 'cart_bp']
+__all__ = ['auth_bp', 'products_bp', 'orders_bp', 'cart_bp', 'bootstrap_bp', 'analytics_bp', 'promotions_bp', 'images_bp']
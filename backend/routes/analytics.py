@@ -0,0 +1,154 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt
+from models.sales_rollup import DailySales, ProductSales, CategorySales
+
+analytics_bp = Blueprint('analytics', __name__)
+
+# All endpoints read the rollup collections kept up to date by
+# services.analytics - none of them touch the orders collection.
+
+@analytics_bp.route('/revenue', methods=['GET'])
+@jwt_required()
+def revenue_per_day():
+    """
+    Revenue, orders and units per day.
+    
+    Query Parameters:
+        from (optional): First day, YYYY-MM-DD
+        to (optional): Last day, YYYY-MM-DD
+    """
+    try:
+        # Check if admin
+        claims = get_jwt()
+        if not claims.get('is_admin'):
+            return jsonify({'error': 'Admin access required'}), 403
+        
+        query = {}
+        if request.args.get('from'):
+            query['day__gte'] = request.args['from']
+        if request.args.get('to'):
+            query['day__lte'] = request.args['to']
+        
+        days = DailySales.objects(**query).order_by('day')
+        
+        return jsonify({'days': [d.to_dict() for d in days]}), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@analytics_bp.route('/products', methods=['GET'])
+@jwt_required()
+def sales_per_product():
+    """
+    Units and revenue per product, best sellers first.
+    
+    Query Parameters:
+        sort (optional): 'units' (default) or 'revenue'
+        category (optional): Only products of this category
+        limit (optional): Number of products, default 10
+    """
+    try:
+        # Check if admin
+        claims = get_jwt()
+        if not claims.get('is_admin'):
+            return jsonify({'error': 'Admin access required'}), 403
+        
+        sort = request.args.get('sort', 'units')
+        if sort not in ('units', 'revenue'):
+            return jsonify({'error': "sort must be 'units' or 'revenue'"}), 400
+        limit = int(request.args.get('limit', 10))
+        
+        query = {}
+        if request.args.get('category'):
+            query['category'] = request.args['category']
+        
+        products = ProductSales.objects(**query).order_by(f'-{sort}').limit(limit)
+        
+        return jsonify({'products': [p.to_dict() for p in products]}), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@analytics_bp.route('/categories', methods=['GET'])
+@jwt_required()
+def sales_per_category():
+    try:
+        # Check if admin
+        claims = get_jwt()
+        if not claims.get('is_admin'):
+            return jsonify({'error': 'Admin access required'}), 403
+        
+        categories = CategorySales.objects.order_by('-revenue')
+        return jsonify({'categories': [c.to_dict() for c in categories]}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@analytics_bp.route('/summary', methods=['GET'])
+@jwt_required()
+def summary():
+    """
+    Totals and average basket over a day range (same params as /revenue).
+    """
+    try:
+        # Check if admin
+        claims = get_jwt()
+        if not claims.get('is_admin'):
+            return jsonify({'error': 'Admin access required'}), 403
+        
+        query = {}
+        if request.args.get('from'):
+            query['day__gte'] = request.args['from']
+        if request.args.get('to'):
+            query['day__lte'] = request.args['to']
+        
+        result = list(DailySales.objects(**query).aggregate([
+            {'$group': {
+                '_id': None,
+                'revenue': {'$sum': '$revenue'},
+                'orders': {'$sum': '$orders'},
+                'units': {'$sum': '$units'}
+            }}
+        ]))
+        totals = result[0] if result else {'revenue': 0, 'orders': 0, 'units': 0}
+        orders = totals['orders']
+        
+        return jsonify({
+            'revenue': round(totals['revenue'], 2),
+            'orders': orders,
+            'units': totals['units'],
+            'average_basket': round(totals['revenue'] / orders, 2) if orders else 0,
+            'average_units': round(totals['units'] / orders, 2) if orders else 0
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@analytics_bp.route('/reorder', methods=['GET'])
+@jwt_required()
+def reorder_report():
+    """
+    Demand forecast, days of cover and reorder suggestions per product,
+    most urgent first. Cached until new orders come in.
+    
+    Query Parameters:
+        all (optional): 'true' to include products that need no reorder
+        limit (optional): Number of products, default 100
+    """
+    try:
+        # Check if admin
+        claims = get_jwt()
+        if not claims.get('is_admin'):
+            return jsonify({'error': 'Admin access required'}), 403
+        
+        include_all = request.args.get('all', 'false').lower() == 'true'
+        limit = int(request.args.get('limit', 100))
+        
+        # Imported here so NumPy only loads when the report is asked for
+        from services import forecast
+        report = forecast.reorder_report()
+        products = report['products'] if include_all else [p for p in report['products'] if p['reorder']]
+        
+        return jsonify(dict(report, products=products[:limit], total=len(products))), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -1,7 +1,8 @@
 ﻿from flask import Blueprint, request, jsonify
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
+from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity, get_jwt
 from models.user import User
 from mongoengine.errors import NotUniqueError
+from services import revocation
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -71,7 +72,15 @@ def login():
 @auth_bp.route('/logout', methods=['POST'])
 @jwt_required()
 def logout():
-    return jsonify({'message': 'Logged out successfully'}), 200
+    try:
+        # The token stops working on every worker within REVOCATION_REFRESH_INTERVAL
+        claims = get_jwt()
+        revocation.revoke(claims['jti'], claims['exp'])
+        
+        return jsonify({'message': 'Logged out successfully'}), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
 @auth_bp.route('/me', methods=['GET'])
 @jwt_required()
@@ -0,0 +1,52 @@
+from concurrent.futures import ThreadPoolExecutor
+from flask import Blueprint, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from models.user import User
+from routes.products import cached_listing, cached_categories
+from routes.cart import build_cart
+from config import Config
+
+bootstrap_bp = Blueprint('bootstrap', __name__)
+
+# Shared pool for the independent reads of a bootstrap request
+executor = ThreadPoolExecutor(max_workers=Config.BOOTSTRAP_WORKERS, thread_name_prefix='bootstrap')
+
+@bootstrap_bp.route('/', methods=['GET'])
+@jwt_required(optional=True)
+def bootstrap():
+    """
+    Returns everything the SPA needs for its first paint in one round trip.
+    
+    Combines /api/auth/me, /api/cart, /api/products/categories and the
+    first page of /api/products. The catalog reads run on a thread pool
+    while the user and cart are loaded, through the same catalog cache
+    and circuit breaker as those routes. A failing section comes back as
+    null with its message under `errors`; the rest of the payload is
+    still returned. Anonymous callers get `user` and `cart` as null.
+    """
+    categories = executor.submit(lambda: cached_categories()[0])
+    products = executor.submit(lambda: cached_listing()[0])
+    
+    result = {'user': None, 'cart': None, 'categories': None, 'products': None}
+    errors = {}
+    
+    user_id = get_jwt_identity()
+    if user_id:
+        try:
+            user = User.objects(id=user_id).first()
+            if user:
+                result['user'] = user.to_dict()
+                result['cart'] = build_cart(user)
+            else:
+                errors['user'] = 'User not found'
+        except Exception as e:
+            errors['user'] = str(e)
+    
+    for key, future in (('categories', categories), ('products', products)):
+        try:
+            result[key] = future.result(timeout=Config.BOOTSTRAP_TIMEOUT)
+        except Exception as e:
+            errors[key] = str(e) or 'Timed out'
+    
+    result['errors'] = errors
+    return jsonify(result), 200
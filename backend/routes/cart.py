@@ -1,10 +1,16 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+from mongoengine.errors import SaveConditionError
 from models.cart import Cart, CartItem
 from models.user import User
 from models.product import Product
+from services import pricing
 from datetime import datetime
 
+MERGE_STRATEGIES = ('replace', 'sum')
+
 cart_bp = Blueprint('cart', __name__)
 
 @cart_bp.route('/', methods=['GET'])
@@ -17,112 +23,270 @@ def get_cart():
         if not user:
             return jsonify({'error': 'User not found'}), 404
         
-        # Get or create cart
-        cart = Cart.objects(user=user).first()
-        if not cart:
-            cart = Cart(user=user)
-            cart.save()
-        
-        # Build cart items with product details and sync check
-        items_with_details = []
-        total = 0
-        sync_messages = []
-        needs_save = False
+        return jsonify(build_cart(user)), 200
         
-        for item in cart.items:
-            product = Product.objects(id=item.product_id).first()
-            snapshot = item.product_snapshot or {}
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def build_cart(user):
+    """
+    Build the cart view for a user, refreshing item snapshots.
+    
+    Legacy full snapshots are compared as stored and rewritten in the
+    compact {'v': version} form, so carts migrate lazily as they are read.
+    Shared by GET /api/cart and /api/bootstrap.
+    """
+    # Get or create cart
+    cart = Cart.objects(user=user).first()
+    if not cart:
+        cart = Cart(user=user)
+        cart.save()
+    
+    # One query for every product in the cart, one more for hot SKU stock
+    products = _load_products(item.product_id for item in cart.items)
+    stock = Product.available_stocks(products.values())
+    
+    # Build cart items with product details and sync check
+    items_with_details = []
+    priced_items = []
+    sync_messages = []
+    # (item, product) pairs whose snapshot points at an old version
+    stale = []
+    
+    for item, snapshot in zip(cart.items, cart.resolve_snapshots()):
+        product = products.get(item.product_id)
+        
+        if product:
+            # Product exists - check for changes
+            price_changed = False
+            name_changed = False
             
-            if product:
-                # Product exists - check for changes
-                price_changed = False
-                name_changed = False
-                
-                if snapshot:
-                    # Compare snapshot with current data
-                    if snapshot.get('price') != product.price:
-                        price_changed = True
-                        sync_messages.append({
-                            'type': 'price_changed',
-                            'product_name': product.name,
-                            'old_price': snapshot.get('price'),
-                            'new_price': product.price
-                        })
-                    
-                    if snapshot.get('name') != product.name:
-                        name_changed = True
-                        sync_messages.append({
-                            'type': 'name_changed',
-                            'old_name': snapshot.get('name'),
-                            'new_name': product.name
-                        })
+            if snapshot:
+                # Compare snapshot with current data
+                if snapshot.get('price') != product.price:
+                    price_changed = True
+                    sync_messages.append({
+                        'type': 'price_changed',
+                        'product_name': product.name,
+                        'old_price': snapshot.get('price'),
+                        'new_price': product.price
+                    })
                 
-                # Update snapshot with current data
-                item.product_snapshot = {
-                    'name': product.name,
-                    'price': product.price,
-                    'image_url': product.image_url,
-                    'category': product.category
-                }
-                needs_save = True
-                
-                # Calculate total
-                item_total = product.price * item.quantity
-                total += item_total
-                
-                # Check stock availability
-                has_stock_issue = item.quantity > product.stock
-                
-                items_with_details.append({
-                    'product_id': str(product.id),
-                    'product_name': product.name,
-                    'price': product.price,
-                    'quantity': item.quantity,
-                    'stock': product.stock,
-                    'image_url': product.image_url,
-                    'category': product.category,
-                    'is_available': True,
-                    'has_stock_issue': has_stock_issue,
-                    'price_changed': price_changed,
-                    'name_changed': name_changed
-                })
-            else:
-                # Product deleted - use snapshot if available
-                product_name = snapshot.get('name', 'Unknown Product')
-                
-                sync_messages.append({
-                    'type': 'product_deleted',
-                    'product_name': product_name,
-                    'product_id': item.product_id
-                })
-                
-                items_with_details.append({
-                    'product_id': item.product_id,
-                    'product_name': product_name,
-                    'price': snapshot.get('price', 0),
-                    'quantity': item.quantity,
-                    'stock': 0,
-                    'image_url': snapshot.get('image_url', ''),
-                    'category': snapshot.get('category', ''),
-                    'is_available': False,
-                    'has_stock_issue': False,
-                    'price_changed': False,
-                    'name_changed': False
-                })
-        
-        # Save cart if snapshots were updated
-        if needs_save:
-            cart.save()
+                if snapshot.get('name') != product.name:
+                    name_changed = True
+                    sync_messages.append({
+                        'type': 'name_changed',
+                        'old_name': snapshot.get('name'),
+                        'new_name': product.name
+                    })
+            
+            # Point the snapshot at the current version
+            if item.product_snapshot != {'v': product.version}:
+                stale.append((item, product))
+            
+            # Check stock availability
+            has_stock_issue = item.quantity > stock[item.product_id]
+            
+            items_with_details.append({
+                'product_id': str(product.id),
+                'product_name': product.name,
+                'price': product.price,
+                'quantity': item.quantity,
+                'stock': stock[item.product_id],
+                'image_url': product.image_url,
+                'category': product.category,
+                'is_available': True,
+                'has_stock_issue': has_stock_issue,
+                'price_changed': price_changed,
+                'name_changed': name_changed
+            })
+            priced_items.append(items_with_details[-1])
+        else:
+            # Product deleted - use snapshot if available
+            product_name = snapshot.get('name', 'Unknown Product')
+            
+            sync_messages.append({
+                'type': 'product_deleted',
+                'product_name': product_name,
+                'product_id': item.product_id
+            })
+            
+            items_with_details.append({
+                'product_id': item.product_id,
+                'product_name': product_name,
+                'price': snapshot.get('price', 0),
+                'quantity': item.quantity,
+                'stock': 0,
+                'image_url': snapshot.get('image_url', ''),
+                'category': snapshot.get('category', ''),
+                'is_available': False,
+                'has_stock_issue': False,
+                'price_changed': False,
+                'name_changed': False,
+                'line_total': 0,
+                'discount': 0,
+                'promotion': None
+            })
+    
+    # Price available items in one pass - checkout uses the same engine
+    priced = pricing.price(priced_items)
+    for details, line in zip(priced_items, priced['lines']):
+        details['line_total'] = line['total']
+        details['discount'] = line['discount']
+        details['promotion'] = line['promotion_name']
+    
+    # Save cart if snapshots were updated, unless it changed since it was read
+    if stale:
+        for (item, _), snapshot in zip(stale, CartItem.snapshots_of([product for _, product in stale])):
+            item.product_snapshot = snapshot
+        read_at = cart.updated_at
+        cart.updated_at = datetime.utcnow()
+        try:
+            cart.save(save_condition={'updated_at': read_at})
+        except SaveConditionError:
+            # Another request wrote the cart; snapshots are migrated on a later read
+            pass
+    
+    return {
+        'items': items_with_details,
+        'subtotal': priced['subtotal'],
+        'discount': priced['discount'],
+        'total': priced['total'],
+        'sync_messages': sync_messages
+    }
+
+def _load_products(product_ids):
+    """Products by id string, fetched with one query; unknown ids are left out"""
+    ids = [pid for pid in set(product_ids) if ObjectId.is_valid(pid)]
+    return {str(p.id): p for p in Product.objects(id__in=ids)} if ids else {}
+
+@cart_bp.route('/', methods=['PUT'])
+@jwt_required()
+def sync_cart():
+    """
+    Write a whole cart in one request, e.g. a guest cart after login.
+    
+    Body: {'items': [{'product_id', 'quantity'}], 'strategy': 'replace'|'sum'}.
+    'replace' makes the cart exactly `items`; 'sum' adds the quantities to
+    what is already in the cart. All products are validated with one query
+    and the cart is written with a single update. Unknown or out-of-stock
+    products are dropped and quantities above stock are capped, each
+    reported in `sync_messages`. Responds like GET /api/cart.
+    """
+    try:
+        user_id = get_jwt_identity()
+        user = User.objects(id=user_id).first()
         
-        return jsonify({
-            'items': items_with_details,
-            'total': total,
-            'sync_messages': sync_messages
-        }), 200
+        if not user:
+            return jsonify({'error': 'User not found'}), 404
+        
+        data = request.get_json() or {}
+        items = data.get('items')
+        strategy = data.get('strategy', 'replace')
+        
+        if not isinstance(items, list):
+            return jsonify({'error': 'Missing items'}), 400
+        
+        if strategy not in MERGE_STRATEGIES:
+            return jsonify({'error': f'strategy must be one of: {", ".join(MERGE_STRATEGIES)}'}), 400
+        
+        # Collapse duplicate lines, keeping first-seen order
+        requested = {}
+        for entry in items:
+            if not isinstance(entry, dict) or 'product_id' not in entry or 'quantity' not in entry:
+                return jsonify({'error': 'Each item needs product_id and quantity'}), 400
+            quantity = entry['quantity']
+            if not isinstance(quantity, int) or isinstance(quantity, bool) or quantity < 1:
+                return jsonify({'error': 'Quantity must be at least 1'}), 400
+            product_id = str(entry['product_id'])
+            requested[product_id] = requested.get(product_id, 0) + quantity
+        
+        collection = Cart._get_collection()
+        
+        # 'sum' reads the current cart and only writes if nobody changed it
+        # in between; a concurrent change makes us re-read and try again
+        for _ in range(3):
+            current = collection.find_one({'user': user.id}, {'items': 1, 'updated_at': 1}) \
+                if strategy == 'sum' else None
+            
+            wanted = dict(requested)
+            if current:
+                existing = {}
+                for item in current.get('items', []):
+                    existing[item['product_id']] = item['quantity']
+                for product_id, quantity in requested.items():
+                    existing[product_id] = existing.get(product_id, 0) + quantity
+                wanted = existing
+            
+            products = _load_products(wanted.keys())
+            new_items, sync_messages = _validate_items(wanted, products)
+            
+            query = {'user': user.id}
+            if strategy == 'sum':
+                query['updated_at'] = current.get('updated_at') if current else None
+            
+            try:
+                result = collection.update_one(
+                    query,
+                    {'$set': {'items': new_items, 'updated_at': datetime.utcnow()}},
+                    upsert=strategy == 'replace' or current is None
+                )
+            except DuplicateKeyError:
+                # The cart was created concurrently
+                continue
+            
+            if result.matched_count or result.upserted_id:
+                break
+        else:
+            return jsonify({'error': 'Cart is being modified, please retry'}), 409
+        
+        cart = build_cart(user)
+        cart['sync_messages'] = sync_messages + cart['sync_messages']
+        return jsonify(cart), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def _validate_items(wanted, products):
+    """
+    Raw cart items for `wanted` {product_id: quantity}, plus messages for
+    what was changed. Stock is read and product versions are recorded with
+    one query each, whatever the number of items.
+    """
+    items = []
+    kept = []
+    messages = []
+    stocks = Product.available_stocks(products.values())
+    
+    for product_id, quantity in wanted.items():
+        product = products.get(product_id)
+        stock = stocks.get(product_id, 0)
+        
+        if stock == 0:
+            messages.append({
+                'type': 'product_unavailable',
+                'product_id': product_id,
+                'product_name': product.name if product else 'Unknown Product'
+            })
+            continue
+        
+        if quantity > stock:
+            messages.append({
+                'type': 'quantity_adjusted',
+                'product_name': product.name,
+                'requested': quantity,
+                'quantity': stock
+            })
+            quantity = stock
+        
+        items.append({'product_id': product_id, 'quantity': quantity})
+        kept.append(product)
+    
+    for item, snapshot in zip(items, CartItem.snapshots_of(kept)):
+        item['product_snapshot'] = snapshot
+    
+    return items, messages
+
 @cart_bp.route('/', methods=['POST'])
 @jwt_required()
 def add_to_cart():
@@ -146,8 +310,11 @@ def add_to_cart():
         if not product:
             return jsonify({'error': 'Product not found'}), 404
         
+        # Summed across shards for hot SKUs, so read it once
+        available = product.available_stock()
+        
         # Check if product is out of stock
-        if product.stock == 0:
+        if available == 0:
             return jsonify({
                 'error': f'{product.name} is currently out of stock',
                 'stock': 0
@@ -169,38 +336,28 @@ def add_to_cart():
             # Update quantity
             new_quantity = existing_item.quantity + quantity
             
-            if new_quantity > product.stock:
+            if new_quantity > available:
                 return jsonify({
-                    'error': f'Cannot add more. Only {product.stock} in stock',
-                    'stock': product.stock,
+                    'error': f'Cannot add more. Only {available} in stock',
+                    'stock': available,
                     'current_quantity': existing_item.quantity
                 }), 400
             
             existing_item.quantity = new_quantity
             # Update snapshot with latest data
-            existing_item.product_snapshot = {
-                'name': product.name,
-                'price': product.price,
-                'image_url': product.image_url,
-                'category': product.category
-            }
+            existing_item.product_snapshot = CartItem.snapshot_of(product)
         else:
             # Add new item with snapshot
-            if quantity > product.stock:
+            if quantity > available:
                 return jsonify({
-                    'error': f'Only {product.stock} available in stock',
-                    'stock': product.stock
+                    'error': f'Only {available} available in stock',
+                    'stock': available
                 }), 400
             
             cart.items.append(CartItem(
                 product_id=product_id,
                 quantity=quantity,
-                product_snapshot={
-                    'name': product.name,
-                    'price': product.price,
-                    'image_url': product.image_url,
-                    'category': product.category
-                }
+                product_snapshot=CartItem.snapshot_of(product)
             ))
         
         cart.updated_at = datetime.utcnow()
@@ -259,26 +416,22 @@ def update_cart_item(product_id):
         
         if quantity > current_quantity:
             # User is increasing - validate against stock
-            if product.stock == 0:
+            available = product.available_stock()
+            if available == 0:
                 return jsonify({
                     'error': f'{product.name} is currently out of stock',
                     'stock': 0
                 }), 400
             
-            if quantity > product.stock:
+            if quantity > available:
                 return jsonify({
-                    'error': f'Only {product.stock} available in stock',
-                    'stock': product.stock
+                    'error': f'Only {available} available in stock',
+                    'stock': available
                 }), 400
         
         # Update quantity and snapshot (allow decrease without stock check)
         cart_item.quantity = quantity
-        cart_item.product_snapshot = {
-            'name': product.name,
-            'price': product.price,
-            'image_url': product.image_url,
-            'category': product.category
-        }
+        cart_item.product_snapshot = CartItem.snapshot_of(product)
         cart.updated_at = datetime.utcnow()
         cart.save()
         
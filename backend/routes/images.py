@@ -0,0 +1,54 @@
+from flask import Blueprint, request, jsonify, send_file
+from bson import ObjectId
+from models.product import Product
+from services import images
+from services.images import ImageError, FORMATS
+from config import Config
+
+images_bp = Blueprint('images', __name__)
+
+@images_bp.route('/<product_id>', methods=['GET'])
+def get_image(product_id):
+    """
+    Resized product image, served from the on-disk cache.
+    
+    Query Parameters:
+        size (optional): thumb, card (default) or full
+    
+    WebP is sent to clients that accept it, JPEG otherwise. Responses
+    carry an ETag and may be reused for IMAGE_MAX_AGE seconds.
+    """
+    try:
+        size = request.args.get('size', 'card')
+        if size not in Config.IMAGE_VARIANTS:
+            return jsonify({'error': f"size must be one of {', '.join(Config.IMAGE_VARIANTS)}"}), 400
+        fmt = 'webp' if 'image/webp' in request.headers.get('Accept', '') else 'jpeg'
+        
+        product = Product.objects(id=product_id).only('image_url').first() if ObjectId.is_valid(product_id) else None
+        if not product or not product.image_url:
+            return jsonify({'error': 'Image not found'}), 404
+        
+        # Another worker may evict the file between lookup and send; render it again once
+        for attempt in range(2):
+            try:
+                response = send_file(
+                    images.variant(product.image_url, size, fmt),
+                    mimetype=FORMATS[fmt],
+                    etag=images.etag(product.image_url, size, fmt),
+                    max_age=Config.IMAGE_MAX_AGE,
+                    conditional=True
+                )
+                break
+            except FileNotFoundError:
+                if attempt:
+                    raise
+        
+        response.cache_control.public = True
+        response.cache_control.stale_while_revalidate = Config.IMAGE_STALE
+        response.vary.add('Accept')
+        return response
+    
+    except ImageError as e:
+        return jsonify({'error': e.message}), e.status
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
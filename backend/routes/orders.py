@@ -1,9 +1,10 @@
 ﻿from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models.order import Order, OrderItem
+from bson import ObjectId
 from models.user import User
-from models.product import Product
-from models.cart import Cart
+from models.checkout_intent import CheckoutIntent
+from services import checkout, archive, idempotency
+from config import Config
 
 orders_bp = Blueprint('orders', __name__)
 
@@ -17,11 +18,20 @@ def get_orders():
         if not user:
             return jsonify({'error': 'User not found'}), 404
         
-        orders = Order.objects(user=user).order_by('-created_at')
+        # Optional pagination - without it every order is returned
+        page = request.args.get('page', type=int)
+        per_page = request.args.get('per_page', 20, type=int)
+        if (page is not None and page < 1) or per_page < 1:
+            return jsonify({'error': 'page and per_page must be at least 1'}), 400
         
-        return jsonify({
-            'orders': [o.to_dict() for o in orders]
-        }), 200
+        # Older orders live in monthly archive collections
+        orders = archive.user_orders(user.id, page, per_page)
+        
+        response = {'orders': [o.to_dict() for o in orders]}
+        if page:
+            response.update(page=page, per_page=per_page)
+        
+        return jsonify(response), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -42,54 +52,70 @@ def create_order():
         if 'items' not in data or not data['items']:
             return jsonify({'error': 'Order must contain items'}), 400
         
-        order_items = []
-        total = 0
-        
-        # Process each item
-        for item in data['items']:
-            product = Product.objects(id=item['product_id']).first()
-            
-            if not product:
-                return jsonify({'error': f"Product {item['product_id']} not found"}), 404
-            
-            # Check stock
-            if product.stock < item['quantity']:
-                return jsonify({
-                    'error': f"Insufficient stock for {product.name}. Available: {product.stock}"
-                }), 400
-            
-            # Create order item
-            order_item = OrderItem(
-                product_id=str(product.id),
-                product_name=product.name,
-                quantity=item['quantity'],
-                price=product.price
-            )
-            order_items.append(order_item)
-            total += product.price * item['quantity']
-            
-            # Subtract from stock
-            product.stock -= item['quantity']
-            product.save()
-        
-        # Create order
-        order = Order(
-            user=user,
-            items=order_items,
-            total=total
-        )
-        order.save()
+        # Retries with the same Idempotency-Key get the first response back
+        key = request.headers.get('Idempotency-Key')
+        if not key:
+            body, status = submit_order(user, data['items'])
+            return jsonify(body), status
+        
+        try:
+            body, status, replayed = idempotency.run(user_id, key, data['items'],
+                                                     lambda: submit_order(user, data['items']))
+        except idempotency.IdempotencyError as e:
+            return jsonify({'error': e.message}), e.status
+        
+        response = jsonify(body)
+        if replayed:
+            response.headers['Idempotent-Replayed'] = 'true'
+        return response, status
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def submit_order(user, items):
+    """Place or queue an order; returns (body, status)"""
+    if Config.CHECKOUT_MODE == 'queued':
+        # Cheap shape check only - stock is validated by the workers
+        if not checkout.valid_items(items):
+            return {'error': 'Each item needs a valid product_id and a positive quantity'}, 400
+        
+        intent = checkout.enqueue(user, items)
+        
+        return {
+            'message': 'Order queued',
+            'order_id': str(intent.id),
+            'status': intent.status
+        }, 202
+    
+    try:
+        order = checkout.place_order(user, items)
+    except checkout.CheckoutError as e:
+        return {'error': e.message}, e.status
+    
+    return {
+        'message': 'Order created successfully',
+        'order': order.to_dict()
+    }, 201
 
-        # Clear cart after successful order
-        cart = Cart.objects(user=user).first()
-        if cart:
-            cart.items = []
-            cart.save()
-        
-        return jsonify({
-            'message': 'Order created successfully',
-            'order': order.to_dict()
-        }), 201
+@orders_bp.route('/<order_id>', methods=['GET'])
+@jwt_required()
+def get_order(order_id):
+    try:
+        user_id = get_jwt_identity()
+        
+        order = archive.find_order(order_id, user_id)
+        if order:
+            return jsonify({'status': 'completed', 'order': order.to_dict()}), 200
+        
+        # Not an order (yet) - maybe still in the checkout queue
+        intent = CheckoutIntent.objects(id=order_id, user=user_id).first() if ObjectId.is_valid(order_id) else None
+        if not intent:
+            return jsonify({'error': 'Order not found'}), 404
+        
+        if intent.status == 'failed':
+            return jsonify(intent.to_dict()), 409
+        
+        return jsonify(intent.to_dict()), 202
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -1,9 +1,32 @@
-﻿from flask import Blueprint, request, jsonify
+﻿from flask import Blueprint, request, jsonify, Response, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt
-from models.product import Product
+from bson import ObjectId
+from pymongo.errors import PyMongoError
+from models.product import Product, LISTING_SORTS
+from models.stock_shard import StockShard
+from models.related_products import RelatedProducts
+from services import stock, events, catalog_cache, counts
+from services.catalog_cache import CircuitOpen
+from config import Config
 
 products_bp = Blueprint('products', __name__)
 
+def _cached(key, loader):
+    """
+    Catalog response through the stale-while-revalidate cache.
+    
+    Returns (value, headers); stale values carry Age and a Warning header.
+    """
+    value, age = catalog_cache.get(key, loader)
+    if age is None:
+        return value, {}
+    return value, {'Age': str(int(age)), 'Warning': '110 - "Response is Stale"'}
+
+def _unavailable():
+    response = jsonify({'error': 'Catalog temporarily unavailable, please retry'})
+    response.headers['Retry-After'] = str(Config.MONGO_BREAKER_RESET)
+    return response, 503
+
 @products_bp.route('/', methods=['GET'])
 def get_products():
     try:
@@ -12,47 +35,181 @@ def get_products():
         search = request.args.get('search')
         page = int(request.args.get('page', 1))
         per_page = int(request.args.get('per_page', 20))
+        in_stock = request.args.get('in_stock', '').lower() in ('1', 'true', 'yes')
+        sort = request.args.get('sort') or None
+        count = request.args.get('count') or Config.PRODUCT_COUNT_DEFAULT
         
-        # Build query
-        query = {}
-        if category:
-            query['category'] = category
-        if search:
-            query['name__icontains'] = search
+        if sort not in LISTING_SORTS:
+            return jsonify({'error': 'sort must be one of price, -price, name'}), 400
+        if count not in counts.STRATEGIES:
+            return jsonify({'error': 'count must be one of exact, estimate, none'}), 400
+        try:
+            min_price = float(request.args['min_price']) if request.args.get('min_price') else None
+            max_price = float(request.args['max_price']) if request.args.get('max_price') else None
+        except ValueError:
+            return jsonify({'error': 'min_price and max_price must be numbers'}), 400
         
-        # Get products with pagination
-        products = Product.objects(**query).skip((page - 1) * per_page).limit(per_page)
-        total = Product.objects(**query).count()
-        
-        return jsonify({
-            'products': [p.to_dict() for p in products],
-            'total': total,
-            'page': page,
-            'per_page': per_page,
-            'total_pages': (total + per_page - 1) // per_page
-        }), 200
+        result, headers = cached_listing(category, search, page, per_page, min_price=min_price,
+                                         max_price=max_price, in_stock=in_stock, sort=sort, count=count)
+        return jsonify(result), 200, headers
         
+    except (CircuitOpen, PyMongoError):
+        return _unavailable()
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def cached_listing(category=None, search=None, page=1, per_page=20,
+                   min_price=None, max_price=None, in_stock=False, sort=None, count=None):
+    """list_products through the catalog cache: (result, headers)"""
+    count = count or Config.PRODUCT_COUNT_DEFAULT
+    return _cached(
+        ('products', category, search, min_price, max_price, in_stock, sort, count, page, per_page),
+        lambda: list_products(category, search, page, per_page, min_price=min_price,
+                              max_price=max_price, in_stock=in_stock, sort=sort, count=count)
+    )
+
+def cached_categories():
+    """Distinct categories through the catalog cache: (categories, headers)"""
+    return _cached(('categories',), lambda: Product.objects.distinct('category'))
+
+def list_products(category=None, search=None, page=1, per_page=20,
+                  min_price=None, max_price=None, in_stock=False, sort=None, count=None):
+    """
+    Build one page of the product listing (shared with /api/bootstrap).
+    
+    `count` picks how `total` is found (see services.counts); with
+    'none', total and total_pages are null and one extra product is
+    read to tell whether there is a next page.
+    """
+    # Filter, sort and the index serving both (see Product.listing)
+    query, _, hint = Product.listing(category, search, min_price, max_price, in_stock, sort)
+    products = Product.objects(__raw__=query).order_by(*LISTING_SORTS[sort]).hint(hint)
+    
+    # Get products with pagination
+    total = counts.count(Product._get_collection(), query, count or Config.PRODUCT_COUNT_DEFAULT, hint)
+    products = list(products.skip((page - 1) * per_page).limit(per_page + (total is None)))
+    
+    return {
+        'products': [p.to_dict() for p in products[:per_page]],
+        'total': total,
+        'page': page,
+        'per_page': per_page,
+        'total_pages': (total + per_page - 1) // per_page if total is not None else None,
+        'has_next': page * per_page < total if total is not None else len(products) > per_page
+    }
+
 @products_bp.route('/<product_id>', methods=['GET'])
 def get_product(product_id):
     try:
-        product = Product.objects(id=product_id).first()
+        def load():
+            product = Product.objects(id=product_id).first()
+            return product.to_dict() if product else None
+        
+        product, headers = _cached(('product', product_id), load)
         
         if not product:
             return jsonify({'error': 'Product not found'}), 404
         
-        return jsonify(product.to_dict()), 200
+        return jsonify(product), 200, headers
         
+    except (CircuitOpen, PyMongoError):
+        return _unavailable()
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@products_bp.route('/batch', methods=['GET', 'POST'])
+def get_products_batch():
+    """
+    Looks up several products in one query.
+    
+    Accepts `{"ids": [...]}` as a POST body or `?ids=a,b,c` on GET.
+    Products come back in the order they were asked for; unknown or
+    malformed IDs are listed under `missing`. Answers go through the
+    catalog cache, keyed by the list of ids.
+    """
+    try:
+        if request.method == 'POST':
+            ids = (request.get_json() or {}).get('ids', [])
+        else:
+            ids = [i for i in request.args.get('ids', '').split(',') if i]
+        
+        if not isinstance(ids, list) or not ids:
+            return jsonify({'error': 'Missing ids'}), 400
+        if len(ids) > Config.PRODUCTS_BATCH_MAX:
+            return jsonify({'error': f'At most {Config.PRODUCTS_BATCH_MAX} ids per request'}), 400
+        
+        if not all(isinstance(i, str) for i in ids):
+            return jsonify({'error': 'ids must be strings'}), 400
+        
+        def load():
+            valid = [i for i in ids if ObjectId.is_valid(i)]
+            found = {str(p.id): p for p in Product.objects(id__in=valid)}
+            return {
+                'products': [found[i].to_dict() for i in ids if i in found],
+                'missing': [i for i in ids if i not in found]
+            }
+        
+        result, headers = _cached(('batch',) + tuple(ids), load)
+        return jsonify(result), 200, headers
+        
+    except (CircuitOpen, PyMongoError):
+        return _unavailable()
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@products_bp.route('/events', methods=['GET'])
+def product_events():
+    """
+    Server-sent events for price, stock and deletion changes.
+    
+    Query Parameters:
+        ids (required): Comma-separated product IDs to watch
+    """
+    ids = [i for i in request.args.get('ids', '').split(',') if i]
+    
+    if not ids:
+        return jsonify({'error': 'Missing ids'}), 400
+    if len(ids) > Config.PRODUCT_EVENTS_MAX_IDS:
+        return jsonify({'error': f'At most {Config.PRODUCT_EVENTS_MAX_IDS} ids per stream'}), 400
+    
+    return Response(
+        stream_with_context(events.stream(ids)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@products_bp.route('/<product_id>/related', methods=['GET'])
+def get_related_products(product_id):
+    """
+    "Customers also bought" - products most often ordered together with
+    this one, as IDs with co-purchase counts. Use /api/products/batch to
+    fetch their details.
+    
+    Query Parameters:
+        limit (optional): At most RELATED_TOP_K (default 10)
+    """
+    try:
+        limit = min(int(request.args.get('limit', Config.RELATED_TOP_K)), Config.RELATED_TOP_K)
+        
+        def load():
+            related = RelatedProducts.objects(product_id=product_id).first()
+            return related.to_dict(limit) if related else {'product_id': product_id, 'related': []}
+        
+        related, headers = _cached(('related', product_id, limit), load)
+        return jsonify(related), 200, headers
+        
+    except (CircuitOpen, PyMongoError):
+        return _unavailable()
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @products_bp.route('/categories', methods=['GET'])
 def get_categories():
     try:
-        categories = Product.objects.distinct('category')
-        return jsonify({'categories': categories}), 200
+        categories, headers = cached_categories()
+        return jsonify({'categories': categories}), 200, headers
+    except (CircuitOpen, PyMongoError):
+        return _unavailable()
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -82,6 +239,8 @@ def create_product():
             stock=data['stock']
         )
         product.save()
+        catalog_cache.invalidate()
+        counts.invalidate()
         
         return jsonify({
             'message': 'Product created successfully',
@@ -107,6 +266,10 @@ def update_product(product_id):
         
         data = request.get_json()
         
+        # Fields carts show - a change starts a new ProductVersion
+        shown = ('name', 'price', 'image_url', 'category')
+        before = [getattr(product, f) for f in shown]
+        
         # Update fields
         if 'name' in data:
             product.name = data['name']
@@ -118,10 +281,21 @@ def update_product(product_id):
             product.category = data['category']
         if 'image_url' in data:
             product.image_url = data['image_url']
+        if 'hot_sku' in data:
+            if data['hot_sku']:
+                stock.enable_sharding(product)
+            else:
+                stock.disable_sharding(product)
         if 'stock' in data:
-            product.stock = data['stock']
+            stock.set_stock(product, data['stock'])
+        
+        if [getattr(product, f) for f in shown] != before:
+            product.version += 1
         
         product.save()
+        catalog_cache.invalidate()
+        counts.invalidate()
+        events.publish_product(product)
         
         return jsonify({
             'message': 'Product updated successfully',
@@ -146,6 +320,10 @@ def delete_product(product_id):
             return jsonify({'error': 'Product not found'}), 404
         
         product.delete()
+        StockShard.objects(product_id=product_id).delete()
+        catalog_cache.invalidate()
+        counts.invalidate()
+        events.publish('deleted', product_id)
         
         return jsonify({'message': 'Product deleted successfully'}), 200
         
@@ -0,0 +1,112 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt
+from mongoengine.errors import ValidationError
+from models.promotion import Promotion
+from services import pricing
+from datetime import datetime
+
+promotions_bp = Blueprint('promotions', __name__)
+
+FIELDS = ('name', 'kind', 'percent', 'buy', 'pay', 'product_ids', 'categories', 'active')
+DATES = ('starts_at', 'ends_at')
+
+@promotions_bp.route('/', methods=['GET'])
+@jwt_required()
+def get_promotions():
+    try:
+        claims = get_jwt()
+        if not claims.get('is_admin'):
+            return jsonify({'error': 'Admin access required'}), 403
+        
+        promotions = Promotion.objects.order_by('-updated_at')
+        return jsonify({'promotions': [p.to_dict() for p in promotions]}), 200
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@promotions_bp.route('/', methods=['POST'])
+@jwt_required()
+def create_promotion():
+    try:
+        claims = get_jwt()
+        if not claims.get('is_admin'):
+            return jsonify({'error': 'Admin access required'}), 403
+        
+        data = request.get_json()
+        
+        if not all(k in data for k in ('name', 'kind')):
+            return jsonify({'error': 'Missing required fields'}), 400
+        
+        promotion = Promotion()
+        _apply(promotion, data)
+        promotion.save()
+        pricing.invalidate()
+        
+        return jsonify({
+            'message': 'Promotion created successfully',
+            'promotion': promotion.to_dict()
+        }), 201
+    
+    except (ValidationError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@promotions_bp.route('/<promotion_id>', methods=['PATCH'])
+@jwt_required()
+def update_promotion(promotion_id):
+    try:
+        claims = get_jwt()
+        if not claims.get('is_admin'):
+            return jsonify({'error': 'Admin access required'}), 403
+        
+        promotion = Promotion.objects(id=promotion_id).first()
+        
+        if not promotion:
+            return jsonify({'error': 'Promotion not found'}), 404
+        
+        _apply(promotion, request.get_json())
+        promotion.save()
+        pricing.invalidate()
+        
+        return jsonify({
+            'message': 'Promotion updated successfully',
+            'promotion': promotion.to_dict()
+        }), 200
+    
+    except (ValidationError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@promotions_bp.route('/<promotion_id>', methods=['DELETE'])
+@jwt_required()
+def delete_promotion(promotion_id):
+    try:
+        claims = get_jwt()
+        if not claims.get('is_admin'):
+            return jsonify({'error': 'Admin access required'}), 403
+        
+        promotion = Promotion.objects(id=promotion_id).first()
+        
+        if not promotion:
+            return jsonify({'error': 'Promotion not found'}), 404
+        
+        promotion.delete()
+        pricing.invalidate()
+        
+        return jsonify({'message': 'Promotion deleted successfully'}), 200
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def _apply(promotion, data):
+    """Copy editable fields from a request body; dates are ISO 8601 strings or null"""
+    for field in FIELDS:
+        if field in data:
+            setattr(promotion, field, data[field])
+    for field in DATES:
+        if field in data:
+            setattr(promotion, field, datetime.fromisoformat(data[field]) if data[field] else None)
+    # Bumps the version other workers compare against (see services.pricing)
+    promotion.updated_at = datetime.utcnow()
@@ -0,0 +1,14 @@
+import importlib
+
+# Submodules are imported on first use, so importing one service does not
+# pull in the others (and NumPy) at startup
+__all__ = ['stock', 'checkout', 'events', 'analytics', 'recommendations', 'forecast', 'archive',
+           'admission', 'catalog_cache', 'profiling', 'revocation',
+           'idempotency', 'ratelimit', 'pricing', 'counts',
+           'images', 'tokens']
+
+
+def __getattr__(name):
+    if name in __all__:
+        return importlib.import_module(f'.{name}', __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,114 @@
+import threading
+import time
+from config import Config
+
+
+class Shed(Exception):
+    """Raised when a request is refused instead of queued"""
+    
+    def __init__(self, route_class, reason):
+        super().__init__(f'{route_class}: {reason}')
+        self.route_class = route_class
+        self.reason = reason
+
+
+class AdmissionController:
+    """
+    Bounds how many requests of each route class run at once.
+    
+    Every class has its own concurrency limit, a maximum number of waiting
+    requests and a queue deadline. All classes also share `capacity`
+    slots, of which `reserved` can only be taken by priority classes, and
+    non-priority requests are not admitted while a priority request is
+    waiting. A request that finds its queue full, or is still waiting at
+    its deadline, is shed.
+    """
+    
+    def __init__(self, capacity, reserved, classes):
+        self.capacity = capacity
+        self.reserved = reserved
+        self.classes = classes
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._stats = {name: {
+            'in_flight': 0, 'waiting': 0, 'admitted': 0, 'shed_queue_full': 0, 'shed_timeout': 0
+        } for name in classes}
+    
+    def acquire(self, route_class):
+        """Block until `route_class` may run; raises Shed instead of waiting too long"""
+        policy = self.classes[route_class]
+        stats = self._stats[route_class]
+        
+        with self._cond:
+            if not self._can_run(route_class):
+                if stats['waiting'] >= policy['queue']:
+                    stats['shed_queue_full'] += 1
+                    raise Shed(route_class, 'queue full')
+                
+                stats['waiting'] += 1
+                deadline = time.monotonic() + policy['timeout']
+                try:
+                    while not self._can_run(route_class):
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            stats['shed_timeout'] += 1
+                            raise Shed(route_class, 'queue timeout')
+                        self._cond.wait(remaining)
+                finally:
+                    stats['waiting'] -= 1
+            
+            stats['in_flight'] += 1
+            stats['admitted'] += 1
+            self._in_flight += 1
+    
+    def release(self, route_class):
+        with self._cond:
+            self._stats[route_class]['in_flight'] -= 1
+            self._in_flight -= 1
+            self._cond.notify_all()
+    
+    def metrics(self):
+        with self._cond:
+            return {
+                'capacity': self.capacity,
+                'reserved': self.reserved,
+                'in_flight': self._in_flight,
+                'classes': {name: dict(stats) for name, stats in self._stats.items()}
+            }
+    
+    def _can_run(self, route_class):
+        policy = self.classes[route_class]
+        if self._stats[route_class]['in_flight'] >= policy['limit']:
+            return False
+        
+        if policy.get('priority'):
+            return self._in_flight < self.capacity
+        
+        priority_waiting = any(
+            self._stats[name]['waiting'] for name, p in self.classes.items() if p.get('priority')
+        )
+        return not priority_waiting and self._in_flight < self.capacity - self.reserved
+
+
+def classify(method, path):
+    """
+    Route class of a request, or None for requests that bypass admission.
+    
+    Preflights, health checks and the long-lived SSE stream are never
+    queued; the stream would otherwise hold a slot for its whole life.
+    Product images bypass too: a page loads dozens at once, nearly all
+    sent from the disk cache, and they must not take browse slots from
+    API reads.
+    """
+    if method == 'OPTIONS' or path.startswith(('/api/health', '/api/images')) or path == '/api/products/events':
+        return None
+    if method == 'POST' and path.rstrip('/') == '/api/orders':
+        return 'checkout'
+    if path.rstrip('/') in ('/api/auth/login', '/api/auth/register'):
+        return 'auth'
+    if method in ('GET', 'HEAD'):
+        return 'browse'
+    return 'default'
+
+
+controller = AdmissionController(Config.ADMISSION_CAPACITY, Config.ADMISSION_CHECKOUT_RESERVED, Config.ADMISSION_CLASSES)
@@ -0,0 +1,150 @@
+from collections import defaultdict
+from pymongo import UpdateOne
+from models.order import Order
+from models.product import Product
+from models.sales_rollup import DailySales, ProductSales, CategorySales
+from services import archive
+
+
+def record_order(order):
+    """
+    Fold one new order into the sales rollups.
+    
+    Called right after an order is saved. Each rollup collection gets a
+    single bulk write of upserting $inc operations, so the cost per order
+    is three round trips regardless of how many lines it has.
+    """
+    product_ids = list(set(item.product_id for item in order.items))
+    categories = {str(p.id): p.category for p in Product.objects(id__in=product_ids).only('category')}
+    
+    units = 0
+    by_product = {}
+    by_category = defaultdict(lambda: {'units': 0, 'revenue': 0})
+    
+    for item in order.items:
+        # Net of promotions, so the rollups add up to order totals
+        revenue = item.price * item.quantity - item.discount
+        category = categories.get(item.product_id, 'Uncategorized')
+        units += item.quantity
+        
+        row = by_product.setdefault(item.product_id, {
+            'name': item.product_name, 'category': category, 'units': 0, 'revenue': 0
+        })
+        row['units'] += item.quantity
+        row['revenue'] += revenue
+        
+        by_category[category]['units'] += item.quantity
+        by_category[category]['revenue'] += revenue
+    
+    DailySales._get_collection().update_one(
+        {'day': order.created_at.strftime('%Y-%m-%d')},
+        {'$inc': {'revenue': order.total, 'orders': 1, 'units': units}},
+        upsert=True
+    )
+    
+    ProductSales._get_collection().bulk_write([
+        UpdateOne(
+            {'product_id': product_id},
+            {
+                '$inc': {'units': row['units'], 'revenue': row['revenue'], 'orders': 1},
+                '$set': {'product_name': row['name'], 'category': row['category']}
+            },
+            upsert=True
+        ) for product_id, row in by_product.items()
+    ], ordered=False)
+    
+    CategorySales._get_collection().bulk_write([
+        UpdateOne(
+            {'category': category},
+            {'$inc': {'units': row['units'], 'revenue': row['revenue']}},
+            upsert=True
+        ) for category, row in by_category.items()
+    ], ordered=False)
+
+
+def backfill():
+    """
+    Rebuild all rollups from the full order history.
+    
+    Runs entirely inside MongoDB as aggregation pipelines ending in $merge,
+    so no order documents are loaded into Python. Existing rollup documents
+    are replaced, which makes the job safe to re-run. Orders placed while
+    it runs can be missed, so run it during a quiet period.
+    """
+    orders = Order._get_collection()
+    # Archived orders count too
+    history = [{'$unionWith': archive.ARCHIVE_PREFIX + month} for month in archive.archive_months()]
+    
+    # Make sure the unique keys $merge matches on exist
+    DailySales.ensure_indexes()
+    ProductSales.ensure_indexes()
+    CategorySales.ensure_indexes()
+    
+    orders.aggregate(history + [
+        {'$match': {'status': 'completed'}},
+        {'$group': {
+            '_id': {'$dateToString': {'format': '%Y-%m-%d', 'date': '$created_at'}},
+            'revenue': {'$sum': '$total'},
+            'orders': {'$sum': 1},
+            'units': {'$sum': {'$sum': '$items.quantity'}}
+        }},
+        {'$project': {'_id': 0, 'day': '$_id', 'revenue': 1, 'orders': 1, 'units': 1}},
+        {'$merge': {'into': DailySales._get_collection_name(), 'on': 'day',
+                    'whenMatched': 'replace', 'whenNotMatched': 'insert'}}
+    ], allowDiskUse=True)
+    
+    lines = history + [
+        {'$match': {'status': 'completed'}},
+        {'$unwind': '$items'},
+        {'$lookup': {
+            'from': Product._get_collection_name(),
+            'let': {'pid': '$items.product_id'},
+            'pipeline': [
+                {'$match': {'$expr': {'$eq': ['$_id', {'$toObjectId': '$$pid'}]}}},
+                {'$project': {'category': 1}}
+            ],
+            'as': 'product'
+        }},
+        {'$set': {
+            'category': {'$ifNull': [{'$first': '$product.category'}, 'Uncategorized']},
+            'revenue': {'$subtract': [
+                {'$multiply': ['$items.price', '$items.quantity']},
+                {'$ifNull': ['$items.discount', 0]}
+            ]}
+        }}
+    ]
+    
+    orders.aggregate(lines + [
+        # One row per order and product first, so `orders` counts orders
+        # (as record_order does) even when a product is on several lines
+        {'$group': {
+            '_id': {'order': '$_id', 'product_id': '$items.product_id'},
+            'product_name': {'$last': '$items.product_name'},
+            'category': {'$last': '$category'},
+            'units': {'$sum': '$items.quantity'},
+            'revenue': {'$sum': '$revenue'}
+        }},
+        {'$group': {
+            '_id': '$_id.product_id',
+            'product_name': {'$last': '$product_name'},
+            'category': {'$last': '$category'},
+            'units': {'$sum': '$units'},
+            'revenue': {'$sum': '$revenue'},
+            'orders': {'$sum': 1}
+        }},
+        {'$project': {'_id': 0, 'product_id': '$_id', 'product_name': 1, 'category': 1,
+                      'units': 1, 'revenue': 1, 'orders': 1}},
+        {'$merge': {'into': ProductSales._get_collection_name(), 'on': 'product_id',
+                    'whenMatched': 'replace', 'whenNotMatched': 'insert'}}
+    ], allowDiskUse=True)
+    
+    orders.aggregate(lines + [
+        {'$group': {
+            '_id': '$category',
+            'units': {'$sum': '$items.quantity'},
+            'revenue': {'$sum': '$revenue'}
+        }},
+        {'$project': {'_id': 0, 'category': '$_id', 'units': 1, 'revenue': 1}},
+        {'$merge': {'into': CategorySales._get_collection_name(), 'on': 'category',
+                    'whenMatched': 'replace', 'whenNotMatched': 'insert'}}
+    ], allowDiskUse=True)
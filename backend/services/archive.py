@@ -0,0 +1,142 @@
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo import DESCENDING, UpdateOne
+from pymongo.errors import BulkWriteError
+from mongoengine.connection import get_db
+from models.order import Order
+from models.order_archive_index import OrderArchiveIndex
+from config import Config
+
+ARCHIVE_PREFIX = 'orders_archive_'
+_indexed = set()
+
+
+def archive_collection(month):
+    """Archive collection for a 'YYYY_MM' month, with its user index"""
+    collection = get_db()[ARCHIVE_PREFIX + month]
+    if month not in _indexed:
+        collection.create_index([('user', 1), ('created_at', DESCENDING)])
+        _indexed.add(month)
+    return collection
+
+
+def archive_months():
+    """All archive months, newest first"""
+    names = get_db().list_collection_names()
+    return sorted((n[len(ARCHIVE_PREFIX):] for n in names if n.startswith(ARCHIVE_PREFIX)), reverse=True)
+
+
+def archive_batch(cutoff, batch_size=None):
+    """
+    Move one batch of orders created before `cutoff` to the archive.
+    
+    Orders are copied into their month's collection before they are
+    deleted from `orders`, and inserts ignore duplicates, so a batch that
+    is interrupted half way is simply redone by the next run. Returns the
+    number of orders moved.
+    """
+    batch_size = batch_size or Config.ORDER_ARCHIVE_BATCH
+    orders = Order._get_collection()
+    
+    docs = list(orders.find({'created_at': {'$lt': cutoff}}).sort('created_at', 1).limit(batch_size))
+    if not docs:
+        return 0
+    
+    by_month = {}
+    for doc in docs:
+        by_month.setdefault(doc['created_at'].strftime('%Y_%m'), []).append(doc)
+    
+    user_months = {}
+    for month, month_docs in by_month.items():
+        try:
+            archive_collection(month).insert_many(month_docs, ordered=False)
+        except BulkWriteError as e:
+            # Duplicates are orders a previous, interrupted run already copied
+            if any(err['code'] != 11000 for err in e.details['writeErrors']):
+                raise
+        for doc in month_docs:
+            user_months.setdefault(doc['user'], set()).add(month)
+    
+    OrderArchiveIndex._get_collection().bulk_write([
+        UpdateOne({'user': user}, {'$addToSet': {'months': {'$each': sorted(months)}}}, upsert=True)
+        for user, months in user_months.items()
+    ], ordered=False)
+    
+    orders.delete_many({'_id': {'$in': [doc['_id'] for doc in docs]}})
+    return len(docs)
+
+
+def run(max_age_days=None):
+    """Archive every order older than `max_age_days`, batch by batch"""
+    max_age_days = max_age_days or Config.ORDER_ARCHIVE_AFTER_DAYS
+    cutoff = datetime.utcnow() - timedelta(days=max_age_days)
+    
+    moved = 0
+    while True:
+        count = archive_batch(cutoff)
+        if count == 0:
+            return moved
+        moved += count
+
+
+def user_orders(user_id, page=None, per_page=None):
+    """
+    A user's orders, newest first, across the hot collection and archives.
+    
+    Sources are read newest to oldest and each one is only queried when
+    the requested page reaches into it, so recent pages never touch the
+    archive. Without `page` every order is returned.
+    """
+    user_id = ObjectId(str(user_id))
+    skip = (page - 1) * per_page if page else 0
+    limit = per_page if page else 0
+    
+    sources = [Order._get_collection()]
+    index = OrderArchiveIndex.objects(user=user_id).first()
+    if index:
+        sources += [archive_collection(month) for month in sorted(index.months, reverse=True)]
+    
+    result = []
+    for collection in sources:
+        query = {'user': user_id}
+        if skip:
+            available = collection.count_documents(query)
+            if skip >= available:
+                skip -= available
+                continue
+        
+        cursor = collection.find(query).sort('created_at', DESCENDING).skip(skip)
+        if limit:
+            cursor = cursor.limit(limit - len(result))
+        result += [Order._from_son(doc) for doc in cursor]
+        skip = 0
+        
+        if limit and len(result) >= limit:
+            break
+    
+    return result
+
+
+def find_order(order_id, user_id):
+    """
+    Look an order up by id in the hot collection, then in the archive.
+    
+    The archive month is derived from the ObjectId's timestamp, so at most
+    two archive collections (that month and the next, for orders created
+    right at a month boundary) are queried. Ids that are not ObjectIds
+    find nothing.
+    """
+    if not ObjectId.is_valid(order_id):
+        return None
+    order = Order.objects(id=order_id, user=user_id).first()
+    if order:
+        return order
+    
+    created = ObjectId(order_id).generation_time.replace(tzinfo=None)
+    months = [created.strftime('%Y_%m'), (created.replace(day=1) + timedelta(days=32)).strftime('%Y_%m')]
+    
+    for month in months:
+        doc = get_db()[ARCHIVE_PREFIX + month].find_one({'_id': ObjectId(order_id), 'user': ObjectId(str(user_id))})
+        if doc:
+            return Order._from_son(doc)
+    return None
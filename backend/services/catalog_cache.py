@@ -0,0 +1,207 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pymongo.errors import PyMongoError
+from config import Config
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling MongoDB while the breaker is open"""
+
+
+class CircuitBreaker:
+    """
+    Stops calling MongoDB after repeated driver errors.
+    
+    After `threshold` consecutive PyMongoErrors the breaker opens and calls
+    fail fast with CircuitOpen. Once `reset_timeout` seconds have passed a
+    single trial call is let through (half open); its outcome closes or
+    re-opens the breaker. Errors that are not driver errors (bad ids,
+    validation) do not count.
+    """
+    
+    def __init__(self, threshold, reset_timeout):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = 'closed'
+        self._failures = 0
+        self._opened_at = 0
+        self._trial = False
+        self._stats = {'opened': 0, 'rejected': 0, 'failures': 0}
+    
+    def call(self, fn):
+        with self._lock:
+            if self._state == 'open':
+                if time.monotonic() - self._opened_at < self.reset_timeout or self._trial:
+                    self._stats['rejected'] += 1
+                    raise CircuitOpen('MongoDB circuit breaker is open')
+                self._trial = True
+        
+        try:
+            result = fn()
+        except PyMongoError:
+            self._record(False)
+            raise
+        except Exception:
+            # Not the database's fault; only finish a trial call
+            self._record(None)
+            raise
+        self._record(True)
+        return result
+    
+    def metrics(self):
+        with self._lock:
+            return dict(self._stats, state=self.state, consecutive_failures=self._failures)
+    
+    @property
+    def state(self):
+        if self._state == 'open' and time.monotonic() - self._opened_at >= self.reset_timeout:
+            return 'half_open'
+        return self._state
+    
+    def _record(self, ok):
+        with self._lock:
+            trial, self._trial = self._trial, False
+            if ok:
+                self._state = 'closed'
+                self._failures = 0
+            elif ok is False:
+                self._stats['failures'] += 1
+                self._failures += 1
+                if trial or self._failures >= self.threshold:
+                    if self._state != 'open' or trial:
+                        self._stats['opened'] += 1
+                    self._state = 'open'
+                    self._opened_at = time.monotonic()
+
+
+class StaleCache:
+    """
+    Stale-while-revalidate cache for catalog responses.
+    
+    Entries are fresh for `ttl` seconds. An expired entry is still served
+    (as stale) while one background refresh replaces it, so requests only
+    wait on MongoDB for keys that were never loaded, or whose entry is
+    older than `max_stale`. While the breaker is open any entry is served,
+    however old. Only the `max_entries` most recently used keys are kept.
+    """
+    
+    def __init__(self, breaker, ttl, max_stale, max_entries, workers):
+        self.breaker = breaker
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.max_entries = max_entries
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='catalog-refresh')
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._refreshing = set()
+        self._generation = 0
+        self._stats = {
+            'hits': 0, 'misses': 0, 'stale_served': 0, 'refreshes': 0, 'refresh_errors': 0,
+            'refresh_ms_last': 0.0, 'refresh_ms_max': 0.0, 'refresh_ms_total': 0.0
+        }
+    
+    def get(self, key, loader):
+        """
+        Returns (value, age) where age is None for a fresh value and the
+        entry's age in seconds when a stale one is served.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                self._entries.move_to_end(key)
+                age = now - entry['loaded_at']
+                if age < self.ttl:
+                    self._stats['hits'] += 1
+                    return entry['value'], None
+        
+        if entry and (age < self.max_stale or self.breaker.state != 'closed'):
+            self._refresh_later(key, loader)
+            with self._lock:
+                self._stats['stale_served'] += 1
+            return entry['value'], age
+        
+        with self._lock:
+            self._stats['misses'] += 1
+            generation = self._generation
+        try:
+            value = self.breaker.call(loader)
+        except (CircuitOpen, PyMongoError):
+            if entry:
+                with self._lock:
+                    self._stats['stale_served'] += 1
+                return entry['value'], age
+            raise
+        self._store(key, value, generation)
+        return value, None
+    
+    def invalidate(self):
+        """Drop every entry (after catalog writes)"""
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+    
+    def metrics(self):
+        with self._lock:
+            stats = dict(self._stats, entries=len(self._entries), refreshing=len(self._refreshing))
+        refreshes = stats.pop('refresh_ms_total')
+        stats['refresh_ms_avg'] = round(refreshes / stats['refreshes'], 2) if stats['refreshes'] else 0.0
+        return stats
+    
+    def _refresh_later(self, key, loader):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+            generation = self._generation
+        self._executor.submit(self._refresh, key, loader, generation)
+    
+    def _refresh(self, key, loader, generation):
+        started = time.monotonic()
+        try:
+            value = self.breaker.call(loader)
+        except Exception:
+            with self._lock:
+                self._stats['refresh_errors'] += 1
+            return
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+        
+        elapsed = (time.monotonic() - started) * 1000
+        with self._lock:
+            self._stats['refreshes'] += 1
+            self._stats['refresh_ms_last'] = round(elapsed, 2)
+            self._stats['refresh_ms_max'] = round(max(self._stats['refresh_ms_max'], elapsed), 2)
+            self._stats['refresh_ms_total'] += elapsed
+        self._store(key, value, generation)
+    
+    def _store(self, key, value, generation):
+        with self._lock:
+            # A write invalidated the cache while this value was loading
+            if generation != self._generation:
+                return
+            self._entries[key] = {'value': value, 'loaded_at': time.monotonic()}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+breaker = CircuitBreaker(Config.MONGO_BREAKER_THRESHOLD, Config.MONGO_BREAKER_RESET)
+cache = StaleCache(breaker, Config.CATALOG_CACHE_TTL, Config.CATALOG_CACHE_MAX_STALE,
+                   Config.CATALOG_CACHE_MAX_ENTRIES, Config.CATALOG_REFRESH_WORKERS)
+
+
+def get(key, loader):
+    return cache.get(key, loader)
+
+
+def invalidate():
+    cache.invalidate()
+
+
+def metrics():
+    return {'breaker': breaker.metrics(), 'cache': cache.metrics()}
@@ -0,0 +1,238 @@
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from bson import ObjectId
+from models.order import Order, OrderItem
+from models.product import Product
+from models.cart import Cart
+from models.checkout_intent import CheckoutIntent, CheckoutItem
+from services import stock, events, analytics, pricing
+from config import Config
+
+
+class CheckoutError(Exception):
+    """Order could not be placed - carries the HTTP status to answer with"""
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def valid_items(items):
+    """True when every item has a valid product_id and an int quantity >= 1"""
+    return all(
+        isinstance(item, dict) and ObjectId.is_valid(item.get('product_id'))
+        and isinstance(item.get('quantity'), int) and not isinstance(item['quantity'], bool)
+        and item['quantity'] >= 1
+        for item in items
+    )
+
+
+def place_order(user, items, order_id=None):
+    """
+    Reserve stock, create the order and clear the user's cart.
+    
+    Items are validated before any stock is taken. Stock is then taken
+    item by item with atomic decrements; if any item fails, everything
+    reserved so far is released and CheckoutError is raised. Any other
+    error, including a failed order save, also releases the stock and is
+    re-raised.
+    """
+    if not valid_items(items):
+        raise CheckoutError('Each item needs a valid product_id and a positive quantity')
+    
+    reserved = []
+    try:
+        for item in items:
+            product = Product.objects(id=item['product_id']).first()
+            
+            if not product:
+                raise CheckoutError(f"Product {item['product_id']} not found", 404)
+            
+            # Check and subtract stock in one atomic step
+            if not stock.decrement_stock(product, item['quantity']):
+                raise CheckoutError(f"Insufficient stock for {product.name}. Available: {product.available_stock()}")
+            reserved.append((product, item['quantity']))
+        
+        return _save_order(user, reserved, order_id)
+    except Exception:
+        release(reserved)
+        raise
+
+
+def release(reserved):
+    """Give back stock taken for an order that could not be completed"""
+    for product, quantity in reserved:
+        stock.increment_stock(product, quantity)
+
+
+def enqueue(user, items):
+    """Store a checkout intent for the workers and return it"""
+    intent = CheckoutIntent(
+        user=user,
+        items=[CheckoutItem(product_id=item['product_id'], quantity=item['quantity']) for item in items]
+    )
+    intent.save()
+    return intent
+
+
+def claim_batch(batch_size):
+    """
+    Atomically claim up to `batch_size` pending intents.
+    
+    Intents stuck in 'processing' longer than CHECKOUT_CLAIM_TIMEOUT
+    (a worker died mid-batch) are claimed again.
+    """
+    now = datetime.utcnow()
+    stale = now - timedelta(seconds=Config.CHECKOUT_CLAIM_TIMEOUT)
+    claimed = []
+    
+    for _ in range(batch_size):
+        intent = CheckoutIntent.objects(
+            __raw__={'$or': [
+                {'status': 'pending'},
+                {'status': 'processing', 'claimed_at': {'$lt': stale}}
+            ]}
+        ).order_by('created_at').modify(new=True, set__status='processing', set__claimed_at=now)
+        
+        if not intent:
+            break
+        claimed.append(intent)
+    
+    return claimed
+
+
+def process_batch(intents):
+    """
+    Turn a batch of claimed intents into orders.
+    
+    Stock demand is summed per product across the batch and taken with one
+    conditional decrement per product. Intents touching a product whose
+    grouped decrement failed get their other units released and are then
+    placed one at a time, so they succeed or fail on their own. An intent
+    that raises is marked failed with its stock released; the rest of the
+    batch carries on.
+    """
+    # An intent may already have produced its order before a crash
+    done = set(o.id for o in Order.objects(id__in=[i.id for i in intents]).only('id'))
+    for intent in intents:
+        if intent.id in done:
+            _finish(intent, 'completed')
+    intents = [i for i in intents if i.id not in done]
+    if not intents:
+        return
+    
+    demand = defaultdict(int)
+    for intent in intents:
+        for item in intent.items:
+            demand[item.product_id] += item.quantity
+    
+    products = {str(p.id): p for p in Product.objects(id__in=list(demand.keys()))}
+    
+    # One decrement per product for the whole batch
+    granted = set()
+    for product_id, quantity in demand.items():
+        product = products.get(product_id)
+        if product and stock.decrement_stock(product, quantity):
+            granted.add(product_id)
+    
+    # Intents hand on their stored user reference; no User documents are loaded
+    for intent in intents:
+        items = [{'product_id': item.product_id, 'quantity': item.quantity} for item in intent.items]
+        
+        # One bad intent fails on its own and never aborts the rest of the batch
+        try:
+            if all(item['product_id'] in granted for item in items):
+                lines = [(products[item['product_id']], item['quantity']) for item in items]
+                try:
+                    _save_order(intent._data['user'], lines, intent.id)
+                except Exception:
+                    # Its share of the grouped decrement goes back
+                    release(lines)
+                    raise
+                _finish(intent, 'completed')
+                continue
+            
+            # Hand back this intent's share of grouped stock and retry it alone
+            release([(products[item['product_id']], item['quantity']) for item in items if item['product_id'] in granted])
+            place_order(intent._data['user'], items, intent.id)
+            _finish(intent, 'completed')
+        except CheckoutError as e:
+            _finish(intent, 'failed', e.message)
+        except Exception as e:
+            _finish(intent, 'failed', str(e))
+
+
+def run_worker(batch_size=None, poll_interval=None):
+    """Drain the checkout queue forever"""
+    batch_size = batch_size or Config.CHECKOUT_BATCH_SIZE
+    poll_interval = poll_interval or Config.CHECKOUT_POLL_INTERVAL
+    
+    while True:
+        intents = claim_batch(batch_size)
+        if not intents:
+            time.sleep(poll_interval)
+            continue
+        try:
+            process_batch(intents)
+        except Exception as e:
+            # Claimed intents are picked up again after the claim timeout
+            print(f'Checkout worker error: {e}')
+
+
+def _save_order(user, lines, order_id=None):
+    """
+    Price (product, quantity) lines, persist the order and clear the
+    user's cart. Totals come from services.pricing, like the cart's.
+    
+    Raises only if the order was not saved; the stock taken for `lines`
+    is then the caller's to release.
+    """
+    priced = pricing.price([{
+        'product_id': str(product.id),
+        'category': product.category,
+        'price': product.price,
+        'quantity': quantity
+    } for product, quantity in lines])
+    
+    order_items = [OrderItem(
+        product_id=str(product.id),
+        product_name=product.name,
+        quantity=quantity,
+        price=product.price,
+        discount=line['discount']
+    ) for (product, quantity), line in zip(lines, priced['lines'])]
+    
+    order = Order(
+        user=user,
+        items=order_items,
+        subtotal=priced['subtotal'],
+        discount=priced['discount'],
+        total=priced['total']
+    )
+    if order_id:
+        order.id = order_id
+    order.save()
+    
+    # The order exists from here on - callers release stock only when
+    # this function raises, so nothing below may fail it
+    try:
+        # Clear cart after successful order
+        Cart.objects(user=user).update_one(set__items=[], set__updated_at=datetime.utcnow())
+        events.publish_stock([item.product_id for item in order_items])
+    except Exception as e:
+        print(f'Post-order cleanup failed for order {order.id}: {e}')
+    
+    # Rollups are best effort too
+    try:
+        analytics.record_order(order)
+    except Exception as e:
+        print(f'Sales rollup update failed for order {order.id}: {e}')
+    
+    return order
+
+
+def _finish(intent, status, error=None):
+    intent.status = status
+    intent.error = error
+    intent.save()
@@ -0,0 +1,124 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from config import Config
+
+STRATEGIES = ('exact', 'estimate', 'none')
+
+
+class CountCache:
+    """
+    Listing totals per normalized filter, kept for `ttl` seconds.
+    
+    Catalog writes in this process drop every entry; writes elsewhere
+    (other workers, stock taken at checkout) show up once entries expire.
+    Only the `max_entries` most recently used filters are kept.
+    """
+    
+    def __init__(self, ttl, max_entries):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._generation = 0
+    
+    @property
+    def generation(self):
+        return self._generation
+    
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            total, stored_at = entry
+            if time.monotonic() - stored_at >= self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return total
+    
+    def put(self, key, total, generation):
+        with self._lock:
+            # A write invalidated the cache while this count was running
+            if generation != self._generation:
+                return
+            self._entries[key] = (total, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+
+cache = CountCache(Config.PRODUCT_COUNT_TTL, Config.PRODUCT_COUNT_MAX_ENTRIES)
+
+
+def key(query):
+    """Cache key for a raw filter; equal filters give equal keys whatever their key order"""
+    return json.dumps(query, sort_keys=True, default=str)
+
+
+class Count:
+    """
+    One count of `query` under a strategy, minus the driver call.
+    
+    'none' skips counting. 'estimate' answers unfiltered listings from
+    collection metadata (estimated_document_count) and filtered ones from
+    the cache, counting only on a miss. 'exact' always counts and
+    refreshes the cache. When `known` is False the caller runs fetch() -
+    which returns what the driver returns, so an awaitable with motor -
+    and passes the result to finish().
+    """
+    
+    def __init__(self, query, strategy):
+        self.query = query
+        self.total = None
+        self._method = None
+        # Taken before counting, so a write during the count voids the result
+        self._generation = cache.generation
+        
+        if strategy == 'none':
+            return
+        if strategy == 'estimate':
+            if not query:
+                self._method = 'estimated_document_count'
+                return
+            self.total = cache.get(key(query))
+            if self.total is not None:
+                return
+        self._method = 'count_documents'
+    
+    @property
+    def known(self):
+        """True when no driver call is needed: `total` is cached or None ('none')"""
+        return self._method is None
+    
+    def fetch(self, collection, hint=None):
+        if self._method == 'estimated_document_count':
+            return collection.estimated_document_count()
+        return collection.count_documents(self.query, hint=hint)
+    
+    def finish(self, total):
+        """Record the driver's result (cached for counted filters) and return it"""
+        if self._method == 'count_documents':
+            cache.put(key(self.query), total, self._generation)
+        self.total = total
+        return total
+
+
+def count(collection, query, strategy, hint=None):
+    """Total documents matching `query` under a count strategy (see Count)"""
+    pending = Count(query, strategy)
+    if pending.known:
+        return pending.total
+    return pending.finish(pending.fetch(collection, hint))
+
+
+def invalidate():
+    """Forget cached totals (after catalog writes)"""
+    cache.invalidate()
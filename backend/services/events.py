@@ -0,0 +1,159 @@
+import json
+import queue
+import threading
+import time
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid
+from mongoengine.connection import get_db
+from models.product import Product
+from config import Config
+
+
+class ProductEventBroker:
+    """
+    Fans product change events out to SSE subscribers.
+    
+    Every subscriber gets its own bounded queue and only ever blocks on that
+    queue, never on MongoDB. Publishing is a dictionary lookup plus a
+    non-blocking put per interested subscriber; a subscriber that falls too
+    far behind loses its oldest events rather than slowing the publisher.
+    """
+    
+    def __init__(self, max_queue=Config.PRODUCT_EVENTS_QUEUE_SIZE):
+        self.max_queue = max_queue
+        self.lock = threading.Lock()
+        # product_id -> set of subscriber queues
+        self.subscribers = {}
+    
+    def subscribe(self, product_ids):
+        q = queue.Queue(maxsize=self.max_queue)
+        with self.lock:
+            for product_id in product_ids:
+                self.subscribers.setdefault(product_id, set()).add(q)
+        return q
+    
+    def unsubscribe(self, q, product_ids):
+        with self.lock:
+            for product_id in product_ids:
+                subs = self.subscribers.get(product_id)
+                if subs:
+                    subs.discard(q)
+                    if not subs:
+                        del self.subscribers[product_id]
+    
+    def dispatch(self, event):
+        with self.lock:
+            targets = list(self.subscribers.get(event['product_id'], ()))
+        
+        for q in targets:
+            try:
+                q.put_nowait(event)
+            except queue.Full:
+                # Slow client - drop its oldest event to make room
+                try:
+                    q.get_nowait()
+                    q.put_nowait(event)
+                except (queue.Empty, queue.Full):
+                    pass
+
+
+broker = ProductEventBroker()
+_relay_lock = threading.Lock()
+_relay_started = False
+_collection = None
+
+
+def publish(event_type, product_id, **fields):
+    """
+    Publish a product change event.
+    
+    In 'local' mode the event goes straight to this process's subscribers.
+    In 'mongo' mode it is appended to a capped collection and every app
+    process picks it up through its relay thread, so changes made by one
+    worker reach subscribers connected to any other.
+    """
+    event = {'type': event_type, 'product_id': str(product_id), **fields}
+    
+    if Config.PRODUCT_EVENTS_BACKEND == 'mongo':
+        _events_collection().insert_one(dict(event, ts=time.time()))
+    else:
+        broker.dispatch(event)
+
+
+def publish_stock(product_ids):
+    """Publish the current stock of several products with one query"""
+    product_ids = [str(product_id) for product_id in product_ids]
+    for product in Product.objects(id__in=product_ids).only('stock', 'hot_sku'):
+        publish('stock', product.id, stock=product.available_stock())
+
+
+def publish_product(product):
+    """Publish the fields of an edited product that clients display"""
+    publish('updated', product.id,
+            name=product.name,
+            price=product.price,
+            stock=product.available_stock())
+
+
+def stream(product_ids):
+    """
+    Generator of SSE frames for the given products.
+    
+    Sends a comment line every PRODUCT_EVENTS_HEARTBEAT seconds so proxies
+    keep the connection open and dead clients are noticed.
+    """
+    if Config.PRODUCT_EVENTS_BACKEND == 'mongo':
+        _start_relay()
+    
+    q = broker.subscribe(product_ids)
+    try:
+        yield 'retry: 3000\n\n'
+        while True:
+            try:
+                event = q.get(timeout=Config.PRODUCT_EVENTS_HEARTBEAT)
+            except queue.Empty:
+                yield ': keep-alive\n\n'
+                continue
+            yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+    finally:
+        broker.unsubscribe(q, product_ids)
+
+
+def _events_collection():
+    global _collection
+    if _collection is None:
+        db = get_db()
+        try:
+            db.create_collection('product_events', capped=True, size=Config.PRODUCT_EVENTS_CAPPED_BYTES)
+        except CollectionInvalid:
+            pass
+        _collection = db['product_events']
+    return _collection
+
+
+def _start_relay():
+    """Start the one thread per process that tails the shared event log"""
+    global _relay_started
+    with _relay_lock:
+        if _relay_started:
+            return
+        _relay_started = True
+    
+    threading.Thread(target=_relay, name='product-events-relay', daemon=True).start()
+
+
+def _relay():
+    collection = _events_collection()
+    since = time.time()
+    while True:
+        try:
+            cursor = collection.find({'ts': {'$gt': since}}, cursor_type=CursorType.TAILABLE_AWAIT)
+            while cursor.alive:
+                for doc in cursor:
+                    since = doc['ts']
+                    doc.pop('_id', None)
+                    doc.pop('ts', None)
+                    broker.dispatch(doc)
+        except Exception as e:
+            print(f'Product events relay error: {e}')
+        time.sleep(1)
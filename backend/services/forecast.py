@@ -0,0 +1,157 @@
+import math
+import threading
+import time
+from datetime import datetime, timedelta
+import numpy as np
+from models.order import Order
+from models.product import Product
+from models.stock_shard import StockShard
+from config import Config
+
+_cache_lock = threading.Lock()
+_cache = {'version': None, 'expires': 0, 'report': None}
+
+
+def reorder_report():
+    """
+    Demand forecast and days of cover for every product.
+    
+    Cached per process until new orders arrive or until
+    FORECAST_CACHE_TTL seconds pass, whichever comes first. New orders are
+    detected through the newest order by created_at (one read off the
+    created_at index) rather than a count, which archiving and deletes
+    also change. Queued orders keep the id of their intent, so the _id is
+    part of the version but cannot order it on its own.
+    """
+    newest = Order._get_collection().find_one({}, {'_id': 1, 'created_at': 1}, sort=[('created_at', -1)])
+    version = (newest['created_at'], newest['_id']) if newest else None
+    now = time.monotonic()
+    
+    with _cache_lock:
+        if _cache['version'] == version and _cache['expires'] > now:
+            return _cache['report']
+    
+    report = build_report()
+    
+    with _cache_lock:
+        _cache.update(version=version, expires=now + Config.FORECAST_CACHE_TTL, report=report)
+    return report
+
+
+def build_report(days=None, today=None):
+    """
+    Compute moving averages, days of cover and reorder suggestions.
+    
+    Sales come from a single aggregation grouped by product and day. They
+    are scattered into a products x days matrix, and forecast() then
+    computes every metric for all products at once with array operations.
+    """
+    days = days or Config.FORECAST_HISTORY_DAYS
+    today = (today or datetime.utcnow()).replace(hour=0, minute=0, second=0, microsecond=0)
+    start = today - timedelta(days=days - 1)
+    
+    products = list(Product._get_collection().find({}, {'name': 1, 'category': 1, 'stock': 1, 'hot_sku': 1}))
+    index = {str(p['_id']): i for i, p in enumerate(products)}
+    stock = np.array([p.get('stock', 0) for p in products], dtype=np.float64)
+    
+    # Hot SKUs keep their stock in shards
+    hot = [str(p['_id']) for p in products if p.get('hot_sku')]
+    if hot:
+        for row in StockShard._get_collection().aggregate([
+            {'$match': {'product_id': {'$in': hot}}},
+            {'$group': {'_id': '$product_id', 'stock': {'$sum': '$stock'}}}
+        ]):
+            stock[index[row['_id']]] = row['stock']
+    
+    rows = list(Order._get_collection().aggregate([
+        {'$match': {'status': 'completed', 'created_at': {'$gte': start}}},
+        {'$unwind': '$items'},
+        {'$group': {
+            '_id': {
+                'product_id': '$items.product_id',
+                # Whole days since `start`, so no date parsing happens in Python
+                'day': {'$floor': {'$divide': [{'$subtract': ['$created_at', start]}, 86400000]}}
+            },
+            'units': {'$sum': '$items.quantity'}
+        }}
+    ], allowDiskUse=True))
+    
+    codes = np.fromiter((index.get(r['_id']['product_id'], -1) for r in rows), dtype=np.int64, count=len(rows))
+    offsets = np.fromiter((r['_id']['day'] for r in rows), dtype=np.int64, count=len(rows))
+    units = np.fromiter((r['units'] for r in rows), dtype=np.float32, count=len(rows))
+    
+    metrics = forecast(sales_matrix(codes, offsets, units, len(products), days), stock)
+    days_of_cover = metrics['days_of_cover']
+    
+    # Most urgent first
+    order = np.argsort(days_of_cover, kind='stable')
+    
+    return {
+        'generated_at': datetime.utcnow().isoformat(),
+        'history_days': days,
+        'horizon_days': Config.REORDER_LEAD_DAYS + Config.REORDER_SAFETY_DAYS,
+        'products': [{
+            'product_id': str(products[i]['_id']),
+            'name': products[i].get('name'),
+            'category': products[i].get('category'),
+            'stock': int(stock[i]),
+            'avg_daily_short': round(float(metrics['avg_short'][i]), 2),
+            'avg_daily_long': round(float(metrics['avg_long'][i]), 2),
+            'forecast_daily': round(float(metrics['forecast'][i]), 2),
+            'days_of_cover': None if math.isinf(days_of_cover[i]) else round(float(days_of_cover[i]), 1),
+            'reorder': bool(metrics['reorder'][i]),
+            'suggested_quantity': int(metrics['suggested'][i])
+        } for i in order.tolist()]
+    }
+
+
+def sales_matrix(codes, offsets, units, products, days):
+    """
+    products x days matrix of units sold, from parallel (product code, day
+    offset, units) arrays. Entries with code -1 (deleted products) or a day
+    outside the window are dropped.
+    """
+    sales = np.zeros((products, days), dtype=np.float32)
+    known = (codes >= 0) & (offsets >= 0) & (offsets < days)
+    np.add.at(sales, (codes[known], offsets[known]), units[known])
+    return sales
+
+
+def forecast(sales, stock):
+    """
+    Reorder metrics for a products x days `sales` matrix and a `stock` vector.
+    
+    Returns arrays of one value per product: avg_short, avg_long, forecast,
+    days_of_cover, reorder and suggested. Products that are out of stock
+    are always flagged, with zero days of cover: a stockout hides demand,
+    so no recent sales is not a reason to leave them empty. Their
+    suggestion uses the whole history's daily average when that is higher
+    than the forecast, and is at least one unit.
+    """
+    short = Config.FORECAST_SHORT_WINDOW
+    long = Config.FORECAST_LONG_WINDOW
+    avg_short = sales[:, -short:].sum(axis=1) / short
+    avg_long = sales[:, -long:].sum(axis=1) / long
+    # Weight recent demand more, but keep the long window as a floor so a
+    # quiet week does not hide a steady seller
+    daily = np.maximum(0.6 * avg_short + 0.4 * avg_long, avg_long * 0.5)
+    
+    out_of_stock = stock <= 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        days_of_cover = np.where(out_of_stock, 0, np.where(daily > 0, stock / daily, np.inf))
+    
+    horizon = Config.REORDER_LEAD_DAYS + Config.REORDER_SAFETY_DAYS
+    reorder = out_of_stock | (days_of_cover < horizon)
+    demand = np.where(out_of_stock, np.maximum(daily, sales.sum(axis=1) / sales.shape[1]), daily)
+    target = demand * (horizon + Config.REORDER_REVIEW_DAYS)
+    suggested = np.ceil(np.maximum(target - stock, 0))
+    suggested = np.where(out_of_stock, np.maximum(suggested, 1), np.where(reorder, suggested, 0))
+    
+    return {
+        'avg_short': avg_short,
+        'avg_long': avg_long,
+        'forecast': daily,
+        'days_of_cover': days_of_cover,
+        'reorder': reorder,
+        'suggested': suggested
+    }
@@ -0,0 +1,149 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from mongoengine.errors import NotUniqueError
+from models.idempotency_record import IdempotencyRecord
+from config import Config
+
+
+class IdempotencyError(Exception):
+    """The key cannot be used for this request - carries the HTTP status to answer with"""
+    def __init__(self, message, status):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+_lock = threading.Lock()
+# Completed responses, most recently used last: key -> (fingerprint, status, body)
+_recent = OrderedDict()
+# Attempts running in this worker: key -> Event set when they finish
+_in_flight = {}
+
+
+def fingerprint(payload):
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def run(user_id, key, payload, handler):
+    """
+    Run `handler` at most once per (user, Idempotency-Key).
+    
+    `handler()` returns (body, status). Returns (body, status, replayed).
+    A key seen before returns its stored response without calling the
+    handler - from this worker's LRU when possible, otherwise from
+    MongoDB. A duplicate that arrives while the first attempt is still
+    running waits for it, up to IDEMPOTENCY_WAIT seconds. 5xx responses
+    are not stored, so the request can be retried.
+    """
+    if len(key) > 255:
+        raise IdempotencyError('Idempotency-Key must be at most 255 characters', 400)
+    
+    scoped = f'{user_id}:{key}'
+    digest = fingerprint(payload)
+    deadline = time.monotonic() + Config.IDEMPOTENCY_WAIT
+    
+    while True:
+        stored = _cached(scoped, digest)
+        if stored:
+            return stored + (True,)
+        
+        # Wait for an attempt running in this worker
+        with _lock:
+            event = _in_flight.get(scoped)
+            if event is None:
+                event = _in_flight[scoped] = threading.Event()
+                break
+        if not event.wait(max(0, deadline - time.monotonic())):
+            raise IdempotencyError('A request with this Idempotency-Key is still in progress', 409)
+    
+    try:
+        record = _claim(scoped, digest, deadline)
+        if record is not None:
+            return _remember(scoped, digest, record.response_status, record.response_body) + (True,)
+        
+        try:
+            body, status = handler()
+        except Exception:
+            _abandon(scoped)
+            raise
+        
+        if status >= 500:
+            _abandon(scoped)
+            return body, status, False
+        
+        IdempotencyRecord.objects(key=scoped).update_one(
+            set__status='completed', set__response_status=status, set__response_body=body
+        )
+        _remember(scoped, digest, status, body)
+        return body, status, False
+    
+    finally:
+        with _lock:
+            _in_flight.pop(scoped).set()
+
+
+def _cached(scoped, digest):
+    with _lock:
+        entry = _recent.get(scoped)
+        if entry is None:
+            return None
+        _recent.move_to_end(scoped)
+    stored_digest, status, body = entry
+    if stored_digest != digest:
+        raise IdempotencyError('Idempotency-Key was already used with a different request', 422)
+    return body, status
+
+
+def _remember(scoped, digest, status, body):
+    with _lock:
+        _recent[scoped] = (digest, status, body)
+        _recent.move_to_end(scoped)
+        while len(_recent) > Config.IDEMPOTENCY_LRU_SIZE:
+            _recent.popitem(last=False)
+    return body, status
+
+
+def _claim(scoped, digest, deadline):
+    """
+    Take the key for this attempt. Returns None once it is ours, or the
+    completed record when another attempt already finished it.
+    """
+    while True:
+        now = datetime.utcnow()
+        try:
+            IdempotencyRecord(
+                key=scoped, fingerprint=digest, locked_at=now,
+                expires_at=now + timedelta(seconds=Config.IDEMPOTENCY_TTL)
+            ).save(force_insert=True)
+            return None
+        except NotUniqueError:
+            pass
+        
+        record = IdempotencyRecord.objects(key=scoped).first()
+        if record is None:
+            # Abandoned between our insert and read; try again
+            continue
+        if record.fingerprint != digest:
+            raise IdempotencyError('Idempotency-Key was already used with a different request', 422)
+        if record.status == 'completed':
+            return record
+        
+        # Another worker is on it; take over if it looks dead
+        stale = now - timedelta(seconds=Config.IDEMPOTENCY_LOCK_TIMEOUT)
+        if record.locked_at < stale and IdempotencyRecord.objects(
+            key=scoped, status='in_progress', locked_at=record.locked_at
+        ).update_one(set__locked_at=now):
+            return None
+        
+        if time.monotonic() >= deadline:
+            raise IdempotencyError('A request with this Idempotency-Key is still in progress', 409)
+        time.sleep(0.1)
+
+
+def _abandon(scoped):
+    """Release the key after a failed attempt so a retry runs again"""
+    IdempotencyRecord.objects(key=scoped, status='in_progress').delete()
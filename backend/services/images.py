@@ -0,0 +1,185 @@
+import hashlib
+import io
+import os
+import threading
+import urllib.request
+from collections import OrderedDict
+from config import Config
+
+FORMATS = {'webp': 'image/webp', 'jpeg': 'image/jpeg'}
+
+
+class ImageError(Exception):
+    """The origin image could not be fetched or decoded - carries the HTTP status to answer with"""
+    def __init__(self, message, status=502):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+class DiskLRU:
+    """
+    Size-bounded file cache in one directory.
+    
+    Files are tracked least recently used first; when the total size
+    passes `max_bytes` the oldest are deleted. The order survives
+    restarts through file mtimes, which are bumped on use. Workers
+    sharing the directory each track their own view, so a file may vanish
+    under a reader - callers treat that as a miss.
+    """
+    
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._files = None
+        self._size = 0
+    
+    def path(self, name):
+        return os.path.join(self.directory, name[:2], name)
+    
+    def get(self, name):
+        """Path of a cached file, or None"""
+        self._load()
+        path = self.path(name)
+        if not os.path.exists(path):
+            with self._lock:
+                self._size -= self._files.pop(name, 0)
+            return None
+        with self._lock:
+            if name in self._files:
+                self._files.move_to_end(name)
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return path
+    
+    def put(self, name, data):
+        """Store bytes atomically and evict old files over the size limit"""
+        self._load()
+        path = self.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(temp, 'wb') as f:
+            f.write(data)
+        os.replace(temp, path)
+        
+        with self._lock:
+            self._size += len(data) - self._files.pop(name, 0)
+            self._files[name] = len(data)
+            evicted = []
+            while self._size > self.max_bytes and len(self._files) > 1:
+                old, size = self._files.popitem(last=False)
+                self._size -= size
+                evicted.append(old)
+        for old in evicted:
+            try:
+                os.remove(self.path(old))
+            except OSError:
+                pass
+        return path
+    
+    def stats(self):
+        self._load()
+        with self._lock:
+            return {'files': len(self._files), 'bytes': self._size, 'max_bytes': self.max_bytes}
+    
+    def _load(self):
+        if self._files is not None:
+            return
+        with self._lock:
+            if self._files is not None:
+                return
+            found = []
+            for root, _, names in os.walk(self.directory):
+                for name in names:
+                    if name.endswith('.tmp'):
+                        continue
+                    try:
+                        stat = os.stat(os.path.join(root, name))
+                    except OSError:
+                        continue
+                    found.append((stat.st_mtime, name, stat.st_size))
+            self._files = OrderedDict((name, size) for _, name, size in sorted(found))
+            self._size = sum(self._files.values())
+
+
+cache = DiskLRU(Config.IMAGE_CACHE_DIR, Config.IMAGE_CACHE_MAX_BYTES)
+
+_lock = threading.Lock()
+# Origins being fetched in this worker: url -> Lock held while resizing
+_fetching = {}
+
+
+def etag(url, size, fmt):
+    """Strong validator for one variant; origin images are immutable per URL"""
+    return f'{hashlib.sha256(url.encode()).hexdigest()[:20]}-{size}-{fmt}'
+
+
+def variant(url, size, fmt):
+    """
+    Path of the `size` variant of the image at `url`, encoded as `fmt`.
+    
+    On a miss the origin is fetched once and every variant in every
+    format is written, so later sizes and formats never refetch. Requests
+    for the same origin wait for the fetch already running in this worker.
+    """
+    name = f'{etag(url, size, fmt)}.{fmt}'
+    path = cache.get(name)
+    if path:
+        return path
+    
+    with _lock:
+        lock = _fetching.setdefault(url, threading.Lock())
+    with lock:
+        try:
+            path = cache.get(name)
+            if path:
+                return path
+            rendered = _render(_fetch(url))
+            # The requested variant last, so eviction cannot remove it
+            requested = rendered.pop((size, fmt))
+            for (s, f), data in rendered.items():
+                cache.put(f'{etag(url, s, f)}.{f}', data)
+            return cache.put(name, requested)
+        finally:
+            with _lock:
+                _fetching.pop(url, None)
+
+
+def _fetch(url):
+    if not url.startswith(('http://', 'https://')):
+        raise ImageError('Image URL must be http(s)', 404)
+    request = urllib.request.Request(url, headers={'User-Agent': 'supermarket-image-proxy'})
+    try:
+        with urllib.request.urlopen(request, timeout=Config.IMAGE_FETCH_TIMEOUT) as response:
+            data = response.read(Config.IMAGE_MAX_SOURCE_BYTES + 1)
+    except OSError as e:
+        raise ImageError(f'Could not fetch image: {e}')
+    if len(data) > Config.IMAGE_MAX_SOURCE_BYTES:
+        raise ImageError('Origin image is too large')
+    return data
+
+
+def _render(data):
+    """All variants of an image: {(size, format): bytes}"""
+    # Pillow is only needed once an image is actually resized
+    from PIL import Image, ImageOps, UnidentifiedImageError
+    
+    try:
+        source = Image.open(io.BytesIO(data))
+        source = ImageOps.exif_transpose(source).convert('RGB')
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+        raise ImageError(f'Origin is not a valid image: {e}')
+    
+    rendered = {}
+    for size, edge in Config.IMAGE_VARIANTS.items():
+        image = source.copy()
+        # Never upscale; keep the aspect ratio
+        image.thumbnail((edge, edge), Image.LANCZOS)
+        for fmt in FORMATS:
+            out = io.BytesIO()
+            image.save(out, format=fmt.upper(), quality=Config.IMAGE_QUALITY, optimize=fmt == 'jpeg')
+            rendered[(size, fmt)] = out.getvalue()
+    return rendered
@@ -0,0 +1,164 @@
+import threading
+import time
+from datetime import datetime
+from models.promotion import Promotion
+from config import Config
+
+PERCENTAGE, MULTI_BUY = 0, 1
+
+_cache_lock = threading.Lock()
+_cache = {'version': None, 'checked': 0, 'rules': None}
+
+
+class CompiledRules:
+    """
+    Active promotions as arrays, one entry per rule.
+    
+    Scopes are boolean matrices over the product ids and categories the
+    rules mention, with one extra all-False column that unknown products
+    and categories map to, so matching a cart is pure indexing.
+    """
+    
+    def __init__(self, promotions):
+        import numpy as np
+        
+        self.ids = [str(p.id) for p in promotions]
+        self.names = [p.name for p in promotions]
+        n = len(promotions)
+        
+        self.kind = np.array([MULTI_BUY if p.kind == 'multi_buy' else PERCENTAGE for p in promotions], dtype=np.int8)
+        self.rate = np.array([p.percent / 100 if p.kind == 'percentage' else 0 for p in promotions], dtype=np.float64)
+        # Percentage rules get buy=1, free=0 so the multi-buy formula is inert for them
+        self.buy = np.array([p.buy if p.kind == 'multi_buy' else 1 for p in promotions], dtype=np.int64)
+        self.free = np.array([p.buy - p.pay if p.kind == 'multi_buy' else 0 for p in promotions], dtype=np.int64)
+        
+        # Open-ended windows as +/- infinity (epoch seconds)
+        self.starts = np.array([p.starts_at.timestamp() if p.starts_at else -np.inf for p in promotions])
+        self.ends = np.array([p.ends_at.timestamp() if p.ends_at else np.inf for p in promotions])
+        
+        self.everything = np.array([not p.product_ids and not p.categories for p in promotions], dtype=bool)
+        
+        # Scope matrices are (vocabulary + 1) x rules, so a cart's codes select rows
+        self.products = {pid: i for i, pid in enumerate(sorted({pid for p in promotions for pid in p.product_ids}))}
+        self.categories = {c: i for i, c in enumerate(sorted({c for p in promotions for c in p.categories}))}
+        self.by_product = np.zeros((len(self.products) + 1, n), dtype=bool)
+        self.by_category = np.zeros((len(self.categories) + 1, n), dtype=bool)
+        for r, p in enumerate(promotions):
+            self.by_product[[self.products[pid] for pid in p.product_ids], r] = True
+            self.by_category[[self.categories[c] for c in p.categories], r] = True
+    
+    def __len__(self):
+        return len(self.ids)
+
+
+def rules():
+    """
+    Compiled active promotions, cached per process.
+    
+    At most every PROMOTIONS_CACHE_TTL seconds the promotions version
+    (count and newest updated_at, one indexed query) is compared with the
+    cached one; rules are only recompiled when it changed.
+    """
+    now = time.monotonic()
+    with _cache_lock:
+        if _cache['rules'] is not None and now - _cache['checked'] < Config.PROMOTIONS_CACHE_TTL:
+            return _cache['rules']
+    
+    latest = Promotion.objects.order_by('-updated_at').only('updated_at').first()
+    version = (Promotion.objects.count(), latest.updated_at if latest else None)
+    
+    with _cache_lock:
+        if _cache['version'] == version and _cache['rules'] is not None:
+            _cache['checked'] = now
+            return _cache['rules']
+    
+    compiled = CompiledRules(list(Promotion.objects(active=True)))
+    with _cache_lock:
+        _cache.update(version=version, checked=now, rules=compiled)
+    return compiled
+
+
+def invalidate():
+    """Forget the compiled rules (after promotion writes in this process)"""
+    with _cache_lock:
+        _cache.update(version=None, rules=None)
+
+
+def price(lines, at=None, compiled=None):
+    """
+    Price cart lines against the active promotions.
+    
+    `lines` is a list of dicts with product_id, category, price and
+    quantity. Every line gets the single promotion that saves the most.
+    `compiled` overrides the cached rules() (pricing_benchmark.py).
+    Returns {'lines': [...], 'subtotal', 'discount', 'total'} where each
+    line has subtotal, discount, total, promotion_id and promotion_name.
+    Used for carts and orders alike, so both always agree.
+    """
+    # Imported here, not at module level: checkout and the cart routes load
+    # this module at app startup (see startup_check.py)
+    import numpy as np
+    
+    if compiled is None:
+        compiled = rules()
+    count = len(lines)
+    
+    # Whole cents throughout, so every line and total rounds exactly once
+    cents = np.fromiter((round(line['price'] * 100) for line in lines), dtype=np.int64, count=count)
+    quantities = np.fromiter((line['quantity'] for line in lines), dtype=np.int64, count=count)
+    subtotals = cents * quantities
+    
+    discounts = np.zeros(count, dtype=np.int64)
+    best = np.full(count, -1)
+    
+    if count and len(compiled):
+        unknown_product = len(compiled.products)
+        unknown_category = len(compiled.categories)
+        product_codes = np.fromiter((compiled.products.get(line['product_id'], unknown_product) for line in lines),
+                                    dtype=np.int64, count=count)
+        category_codes = np.fromiter((compiled.categories.get(line['category'], unknown_category) for line in lines),
+                                     dtype=np.int64, count=count)
+        
+        # lines x rules: in its time window and scoped to the line
+        now = (at or datetime.utcnow()).timestamp()
+        live = (compiled.starts <= now) & (now < compiled.ends)
+        applies = (compiled.everything | compiled.by_product[product_codes] | compiled.by_category[category_codes]) & live
+        
+        # Savings only for the (line, rule) pairs that match - a small
+        # fraction of lines x rules - then the best rule per line
+        # (flatnonzero + divmod is several times faster than 2-D nonzero)
+        rows, matched = np.divmod(np.flatnonzero(applies), len(compiled))
+        saving = np.where(
+            compiled.kind[matched] == MULTI_BUY,
+            (quantities[rows] // compiled.buy[matched]) * compiled.free[matched] * cents[rows],
+            np.rint(subtotals[rows] * compiled.rate[matched])
+        ).astype(np.int64)
+        
+        # Best pair per line in one reduceat: pairs come grouped by line,
+        # and the key orders by saving, then by earliest rule on ties
+        if len(rows):
+            n = len(compiled)
+            starts = np.flatnonzero(np.append(True, rows[1:] != rows[:-1]))
+            top = np.maximum.reduceat(saving * n + (n - 1 - matched), starts)
+            lined = rows[starts]
+            discounts[lined] = top // n
+            best[lined] = np.where(top // n > 0, n - 1 - top % n, -1)
+    
+    totals = subtotals - discounts
+    ids = [compiled.ids[r] if r >= 0 else None for r in best.tolist()]
+    names = [compiled.names[r] if r >= 0 else None for r in best.tolist()]
+    
+    return {
+        'lines': [{
+            'subtotal': subtotal / 100,
+            'discount': discount / 100,
+            'total': total / 100,
+            'promotion_id': promotion_id,
+            'promotion_name': name
+        } for subtotal, discount, total, promotion_id, name in zip(
+            subtotals.tolist(), discounts.tolist(), totals.tolist(), ids, names
+        )],
+        'subtotal': int(subtotals.sum()) / 100,
+        'discount': int(discounts.sum()) / 100,
+        'total': int(totals.sum()) / 100
+    }
@@ -0,0 +1,164 @@
+import hmac
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from config import Config
+
+# Checked innermost frame first; the first match decides where a sample's time goes
+CATEGORIES = (
+    ('bcrypt', ('bcrypt',)),
+    ('mongo', ('pymongo', 'bson')),
+    ('hydration', ('mongoengine',)),
+    ('serialization', ('json', 'jsonify', 'to_dict')),
+    ('handler', ('routes', 'services', 'models')),
+)
+
+_BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The sampler thread needs the GIL to take a sample, so while any request
+# is being profiled the interpreter switches threads at the sampling rate.
+# The setting is process-wide: active samplers are counted per interval,
+# and the value found before the first one started is restored after the
+# last one stops.
+_switch_lock = threading.Lock()
+_active = Counter()
+_saved_interval = None
+
+
+def should_profile(token):
+    """True for requests carrying the profile token (X-Profile-Token), or for a random sample"""
+    if token and Config.PROFILE_TOKEN and hmac.compare_digest(token, Config.PROFILE_TOKEN):
+        return True
+    return Config.PROFILE_SAMPLE_RATE > 0 and random.random() < Config.PROFILE_SAMPLE_RATE
+
+
+def active():
+    """True while any request in this process is being sampled (a lock-free read)"""
+    return bool(_active)
+
+
+class Sampler:
+    """
+    Statistical profiler for one thread.
+    
+    A background thread looks at the target thread's current stack every
+    `interval` seconds and counts each distinct stack, so the profiled
+    request runs unmodified (no tracing hooks) and the cost is bounded by
+    the sampling rate.
+    """
+    
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.categories = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profiler', daemon=True)
+        self.started = None
+        self.elapsed = 0
+    
+    def start(self):
+        _hold_switch_interval(self.interval)
+        self.started = time.perf_counter()
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        """Stop sampling; safe to call more than once"""
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._thread.join()
+        self.elapsed = time.perf_counter() - self.started
+        _release_switch_interval(self.interval)
+    
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            
+            stack = []
+            while frame is not None:
+                stack.append(_label(frame))
+                frame = frame.f_back
+            
+            # Collapsed stacks are root first
+            self.stacks[';'.join(reversed(stack))] += 1
+            self.categories[_categorize(stack)] += 1
+    
+    def write(self, directory, method, path, status):
+        """Write <id>.collapsed (flamegraph.pl / speedscope input) and <id>.json; returns the id"""
+        os.makedirs(directory, exist_ok=True)
+        name = '-'.join([
+            time.strftime('%Y%m%dT%H%M%S'),
+            method,
+            path.strip('/').replace('/', '_') or 'root',
+            uuid.uuid4().hex[:6]
+        ])
+        
+        with open(os.path.join(directory, name + '.collapsed'), 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f'{stack} {count}\n')
+        
+        samples = sum(self.categories.values())
+        with open(os.path.join(directory, name + '.json'), 'w') as f:
+            json.dump({
+                'method': method,
+                'path': path,
+                'status': status,
+                'duration_ms': round(self.elapsed * 1000, 2),
+                'interval_ms': self.interval * 1000,
+                'samples': samples,
+                # Estimated from the share of samples in each category
+                'time_ms': {
+                    category: round(self.elapsed * 1000 * count / samples, 2)
+                    for category, count in self.categories.most_common()
+                } if samples else {}
+            }, f, indent=2)
+        
+        return name
+
+
+def start():
+    return Sampler(threading.get_ident(), Config.PROFILE_INTERVAL).start()
+
+
+def _hold_switch_interval(interval):
+    global _saved_interval
+    with _switch_lock:
+        if not _active:
+            _saved_interval = sys.getswitchinterval()
+        _active[interval] += 1
+        sys.setswitchinterval(min(_saved_interval, *_active))
+
+
+def _release_switch_interval(interval):
+    with _switch_lock:
+        _active[interval] -= 1
+        if _active[interval] == 0:
+            del _active[interval]
+        sys.setswitchinterval(min(_saved_interval, *_active) if _active else _saved_interval)
+
+
+def _label(frame):
+    code = frame.f_code
+    filename = code.co_filename
+    if filename.startswith(_BACKEND_DIR):
+        filename = os.path.relpath(filename, _BACKEND_DIR)
+    elif 'site-packages' in filename:
+        filename = filename.split('site-packages' + os.sep, 1)[1]
+    return f'{filename}:{code.co_name}'.replace(' ', '_')
+
+
+def _categorize(stack):
+    for label in stack:
+        for category, markers in CATEGORIES:
+            if any(marker in label for marker in markers):
+                return category
+    return 'framework'
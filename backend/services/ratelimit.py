@@ -0,0 +1,132 @@
+import math
+import threading
+import time
+from datetime import datetime, timedelta
+from pymongo import ReturnDocument
+from config import Config
+
+
+class MemoryBackend:
+    """Token buckets in this process; each worker enforces its own share"""
+    
+    def __init__(self, max_keys):
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._buckets = {}
+    
+    def take(self, key, capacity, rate):
+        """Take one token; returns (allowed, tokens left)"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._prune(now)
+        return allowed, tokens
+    
+    def _prune(self, now):
+        # Buckets idle long enough to be full again carry no state
+        buckets = {
+            key: (tokens, updated) for key, (tokens, updated) in self._buckets.items()
+            if now - updated < Config.RATE_LIMIT_IDLE_SECONDS
+        }
+        if len(buckets) > self.max_keys // 2:
+            # Still crowded: keep the most recently used half
+            recent = sorted(buckets.items(), key=lambda item: item[1][1], reverse=True)
+            buckets = dict(recent[:self.max_keys // 2])
+        self._buckets = buckets
+
+
+class MongoBackend:
+    """
+    Token buckets shared by all workers in one collection.
+    
+    Refill and take happen in a single findOneAndUpdate with an update
+    pipeline, so concurrent requests for a key cannot both spend the last
+    token. Costs one round trip per limited request.
+    """
+    
+    def __init__(self, collection_name):
+        self.collection_name = collection_name
+        self._collection = None
+    
+    @property
+    def collection(self):
+        if self._collection is None:
+            from mongoengine.connection import get_db
+            collection = get_db()[self.collection_name]
+            collection.create_index('expires_at', expireAfterSeconds=0)
+            self._collection = collection
+        return self._collection
+    
+    def take(self, key, capacity, rate):
+        now = datetime.utcnow()
+        elapsed = {'$divide': [{'$subtract': [now, {'$ifNull': ['$updated', now]}]}, 1000]}
+        refilled = {'$min': [capacity, {'$add': [{'$ifNull': ['$tokens', capacity]}, {'$multiply': [elapsed, rate]}]}]}
+        
+        doc = self.collection.find_one_and_update(
+            {'_id': key},
+            [
+                {'$set': {'tokens': refilled, 'updated': now,
+                          'expires_at': now + timedelta(seconds=Config.RATE_LIMIT_IDLE_SECONDS)}},
+                {'$set': {'allowed': {'$gte': ['$tokens', 1]}}},
+                {'$set': {'tokens': {'$cond': ['$allowed', {'$subtract': ['$tokens', 1]}, '$tokens']}}}
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return doc['allowed'], doc['tokens']
+
+
+def client_key(policy, remote_addr, forwarded_for, user_id):
+    """Bucket key: the user for per-user policies (when known), otherwise the IP"""
+    if policy['per'] == 'user' and user_id:
+        return f'user:{user_id}'
+    ip = remote_addr
+    if Config.RATE_LIMIT_TRUST_FORWARDED and forwarded_for:
+        ip = forwarded_for.split(',')[0].strip()
+    return f'ip:{ip}'
+
+
+def match(method, path, args):
+    """Name and settings of the first policy that applies to a request"""
+    path = path.rstrip('/') or '/'
+    for name, policy in Config.RATE_LIMITS.items():
+        if policy.get('methods') and method not in policy['methods']:
+            continue
+        if policy.get('paths') and not any(path.startswith(p) for p in policy['paths']):
+            continue
+        if policy.get('args') and not any(arg in args for arg in policy['args']):
+            continue
+        return name, policy
+    return None, None
+
+
+def check(name, policy, key):
+    """
+    Spend one token from `key`'s bucket for `policy`.
+    
+    Returns (allowed, headers) with X-RateLimit-* headers, plus
+    Retry-After when the request is refused.
+    """
+    capacity = policy['burst']
+    rate = policy['per_minute'] / 60
+    allowed, tokens = backend.take(f'{name}:{key}', capacity, rate)
+    
+    headers = {
+        'X-RateLimit-Limit': str(policy['per_minute']),
+        'X-RateLimit-Remaining': str(int(tokens)),
+        # Seconds until the bucket is full again
+        'X-RateLimit-Reset': str(math.ceil((capacity - tokens) / rate))
+    }
+    if not allowed:
+        headers['Retry-After'] = str(math.ceil((1 - tokens) / rate))
+    return allowed, headers
+
+
+backend = MongoBackend('rate_limits') if Config.RATE_LIMIT_BACKEND == 'mongo' \
+    else MemoryBackend(Config.RATE_LIMIT_MAX_KEYS)
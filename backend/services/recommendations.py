@@ -0,0 +1,192 @@
+from datetime import datetime
+import numpy as np
+from pymongo import ReplaceOne
+from mongoengine.connection import get_db
+from models.order import Order
+from models.related_products import RelatedProducts
+from models.job_checkpoint import JobCheckpoint
+from services import archive
+from config import Config
+
+CHECKPOINT = 'related_products'
+
+
+def build():
+    """
+    Rebuild "customers also bought" for every product from all orders.
+    
+    Orders are streamed into flat NumPy arrays and pair counts are computed
+    chunk by chunk, so peak memory is bounded by RELATED_CHUNK_ORDERS
+    orders' worth of pairs plus the sparse counts accumulated so far.
+    """
+    started = datetime.utcnow()
+    ids, items, offsets, latest = _load_orders()
+    src, dst, counts = _co_occurrence(items, offsets, len(ids))
+    neighbors = _top_k(src, dst, counts, Config.RELATED_CANDIDATES)
+    
+    _write(ids, neighbors)
+    # Products that no longer have any co-purchases
+    RelatedProducts.objects(updated_at__lt=started).delete()
+    # The newest order read, not the start time: orders placed while
+    # loading are already counted and must not be folded in again
+    JobCheckpoint.set(CHECKPOINT, latest)
+
+
+def update():
+    """
+    Fold orders placed since the last run into the stored neighbor lists.
+    
+    Only products that appear in new orders are touched. Their stored
+    candidate counts are merged with the new pair counts and re-ranked;
+    because only RELATED_CANDIDATES neighbors are kept per product, this is
+    an approximation of a full rebuild that stays exact for the top ranks.
+    """
+    since = JobCheckpoint.get(CHECKPOINT)
+    if since is None:
+        return build()
+    
+    ids, items, offsets, latest = _load_orders(since)
+    if not ids:
+        return
+    
+    src, dst, counts = _co_occurrence(items, offsets, len(ids))
+    new_counts = {}
+    for a, b, c in zip(src.tolist(), dst.tolist(), counts.tolist()):
+        new_counts.setdefault(ids[a], {})[ids[b]] = c
+    
+    stored = {r.product_id: r for r in RelatedProducts.objects(product_id__in=list(new_counts.keys()))}
+    requests = []
+    for product_id, fresh in new_counts.items():
+        merged = {}
+        if product_id in stored:
+            merged = dict(zip(stored[product_id].related, stored[product_id].counts))
+        for other, c in fresh.items():
+            merged[other] = merged.get(other, 0) + c
+        
+        ranked = sorted(merged.items(), key=lambda pair: -pair[1])[:Config.RELATED_CANDIDATES]
+        requests.append(_replace(product_id, [p for p, _ in ranked], [c for _, c in ranked]))
+    
+    if requests:
+        RelatedProducts._get_collection().bulk_write(requests, ordered=False)
+    JobCheckpoint.set(CHECKPOINT, latest)
+
+
+def _load_orders(since=None):
+    """
+    Read order lines into CSR form, archived orders included.
+    
+    Returns (ids, items, offsets, latest): `ids[code]` is the product id of
+    integer code `code`, `items[offsets[i]:offsets[i + 1]]` are the distinct
+    product codes of order i, and `latest` is the newest created_at seen.
+    With `since`, archive months before its month are skipped. An order
+    archived while this runs can be read twice.
+    """
+    query = {'status': 'completed'}
+    if since:
+        query['created_at'] = {'$gt': since}
+    
+    months = [m for m in archive.archive_months() if since is None or m >= since.strftime('%Y_%m')]
+    sources = [Order._get_collection()] + [get_db()[archive.ARCHIVE_PREFIX + m] for m in months]
+    
+    codes = {}
+    flat = []
+    offsets = [0]
+    latest = since
+    
+    for collection in sources:
+        cursor = collection.find(query, {'items.product_id': 1, 'created_at': 1}, batch_size=10000)
+        for doc in cursor:
+            seen = set()
+            for item in doc['items']:
+                product_id = item['product_id']
+                if product_id not in seen:
+                    seen.add(product_id)
+                    flat.append(codes.setdefault(product_id, len(codes)))
+            offsets.append(len(flat))
+            if latest is None or doc['created_at'] > latest:
+                latest = doc['created_at']
+    
+    return list(codes), np.asarray(flat, dtype=np.int64), np.asarray(offsets, dtype=np.int64), latest
+
+
+def _co_occurrence(items, offsets, n):
+    """
+    Sparse symmetric co-occurrence counts as (src, dst, count) arrays.
+    
+    Every unordered pair of products within an order is encoded as one
+    int64 key (lo * n + hi) and counted with np.unique; chunks are merged by
+    re-reducing the concatenated keys with np.bincount.
+    """
+    keys = np.empty(0, dtype=np.int64)
+    counts = np.empty(0, dtype=np.int64)
+    chunk = Config.RELATED_CHUNK_ORDERS
+    
+    for start in range(0, len(offsets) - 1, chunk):
+        bounds = offsets[start:start + chunk + 1]
+        chunk_keys = _pair_keys(items, bounds, n)
+        if len(chunk_keys) == 0:
+            continue
+        chunk_keys, chunk_counts = np.unique(chunk_keys, return_counts=True)
+        
+        keys, inverse = np.unique(np.concatenate([keys, chunk_keys]), return_inverse=True)
+        counts = np.bincount(inverse, weights=np.concatenate([counts, chunk_counts])).astype(np.int64)
+    
+    lo, hi = np.divmod(keys, n)
+    return np.concatenate([lo, hi]), np.concatenate([hi, lo]), np.concatenate([counts, counts])
+
+
+def _pair_keys(items, bounds, n):
+    """Keys of all product pairs inside the orders delimited by `bounds`"""
+    sizes = np.diff(bounds)
+    positions = np.arange(bounds[0], bounds[-1])
+    # How many later items each position pairs with inside its own order
+    after = np.repeat(bounds[1:], sizes) - positions - 1
+    
+    total = int(after.sum())
+    if total == 0:
+        return np.empty(0, dtype=np.int64)
+    
+    left = np.repeat(positions, after)
+    group_start = np.repeat(np.cumsum(after) - after, after)
+    right = left + (np.arange(total) - group_start) + 1
+    
+    a = items[left]
+    b = items[right]
+    return np.minimum(a, b) * n + np.maximum(a, b)
+
+
+def _top_k(src, dst, counts, k):
+    """Keep the `k` highest counts per source, as {src: (dst[], counts[])}"""
+    if len(src) == 0:
+        return {}
+    
+    order = np.lexsort((-counts, src))
+    src, dst, counts = src[order], dst[order], counts[order]
+    
+    first = np.r_[0, np.flatnonzero(np.diff(src)) + 1]
+    rank = np.arange(len(src)) - np.repeat(first, np.diff(np.r_[first, len(src)]))
+    keep = rank < k
+    src, dst, counts = src[keep], dst[keep], counts[keep]
+    
+    bounds = np.r_[0, np.flatnonzero(np.diff(src)) + 1, len(src)]
+    return {
+        int(src[start]): (dst[start:end].tolist(), counts[start:end].tolist())
+        for start, end in zip(bounds[:-1], bounds[1:])
+    }
+
+
+def _write(ids, neighbors):
+    requests = [
+        _replace(ids[code], [ids[d] for d in dst], counts)
+        for code, (dst, counts) in neighbors.items()
+    ]
+    for start in range(0, len(requests), 1000):
+        RelatedProducts._get_collection().bulk_write(requests[start:start + 1000], ordered=False)
+
+
+def _replace(product_id, related, counts):
+    return ReplaceOne(
+        {'product_id': product_id},
+        {'product_id': product_id, 'related': related, 'counts': counts, 'updated_at': datetime.utcnow()},
+        upsert=True
+    )
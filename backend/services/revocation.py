@@ -0,0 +1,161 @@
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timedelta
+from mongoengine.errors import NotUniqueError
+from models.revoked_token import RevokedToken
+from config import Config
+
+# Tokens revoked this close to a refresh may not be visible to it yet
+# (clock skew between workers, in-flight writes), so refreshes overlap
+REFRESH_OVERLAP = timedelta(seconds=5)
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over strings.
+    
+    Sized for `capacity` items at `error_rate` false positives; the k bit
+    positions come from one blake2b digest split into two 64-bit hashes
+    (Kirsch-Mitzenmacher double hashing).
+    """
+    
+    def __init__(self, capacity, error_rate):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+    
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+    
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+    
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+
+class Denylist:
+    """
+    This worker's view of the revoked tokens.
+    
+    `is_revoked` only touches memory: a Bloom filter answers "not revoked"
+    for almost every token, and the rare filter hits are confirmed against
+    the exact JTI -> expiry map. `refresh` pulls tokens revoked since the
+    previous refresh; every REVOCATION_FULL_RELOAD seconds the whole state
+    is rebuilt, which also drops tokens that have expired.
+    """
+    
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._lock = threading.Lock()
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._revoked = {}
+        self._since = None
+        self._reloaded_at = 0
+    
+    def is_revoked(self, jti):
+        if self._since is None:
+            self.refresh()
+        return jti in self._bloom and jti in self._revoked
+    
+    def add(self, jti, expires_at):
+        with self._lock:
+            self._revoked[jti] = expires_at
+            if len(self._revoked) > self.capacity:
+                self._rebuild(self._revoked)
+            else:
+                self._bloom.add(jti)
+    
+    def refresh(self):
+        """Fetch newly revoked tokens, or reload everything when a full reload is due"""
+        started = datetime.utcnow()
+        full = self._since is None or time.monotonic() - self._reloaded_at >= Config.REVOCATION_FULL_RELOAD
+        
+        query = RevokedToken.objects(expires_at__gt=started)
+        if not full:
+            query = query.filter(revoked_at__gte=self._since - REFRESH_OVERLAP)
+        rows = {jti: expires_at for jti, expires_at in query.scalar('jti', 'expires_at')}
+        
+        with self._lock:
+            if full:
+                # Keep tokens revoked locally since the query started
+                rows.update({jti: exp for jti, exp in self._revoked.items() if jti not in rows and exp > started})
+                self._rebuild(rows)
+                self._reloaded_at = time.monotonic()
+            else:
+                for jti, expires_at in rows.items():
+                    if jti not in self._revoked:
+                        self._revoked[jti] = expires_at
+                        self._bloom.add(jti)
+                if len(self._revoked) > self.capacity:
+                    self._rebuild(self._revoked)
+            self._since = started
+    
+    def stats(self):
+        with self._lock:
+            return {
+                'revoked': len(self._revoked),
+                'bloom_bytes': len(self._bloom.bits),
+                'bloom_hashes': self._bloom.hashes,
+                'capacity': self.capacity
+            }
+    
+    def _rebuild(self, revoked):
+        # Grow so the filter stays within its false positive rate
+        while len(revoked) > self.capacity:
+            self.capacity *= 2
+        bloom = BloomFilter(self.capacity, self.error_rate)
+        for jti in revoked:
+            bloom.add(jti)
+        self._bloom = bloom
+        self._revoked = dict(revoked)
+
+
+denylist = Denylist(Config.REVOCATION_BLOOM_CAPACITY, Config.REVOCATION_BLOOM_ERROR_RATE)
+
+# One refresher thread per process, shared by the Flask and async apps
+_refresher_lock = threading.Lock()
+_refresher = None
+
+
+def revoke(jti, exp):
+    """Revoke a token by JTI until its `exp` (seconds since the epoch)"""
+    expires_at = datetime.utcfromtimestamp(exp)
+    try:
+        RevokedToken(jti=jti, expires_at=expires_at).save()
+    except NotUniqueError:
+        pass
+    denylist.add(jti, expires_at)
+
+
+def is_revoked(jti):
+    return denylist.is_revoked(jti)
+
+
+def start_refresher(interval):
+    """
+    Refresh the denylist every `interval` seconds in a daemon thread.
+    Starts the thread once per process; later calls return the running one.
+    """
+    global _refresher
+    
+    def loop():
+        while True:
+            time.sleep(interval)
+            try:
+                denylist.refresh()
+            except Exception as e:
+                print(f'Token denylist refresh failed: {e}')
+    
+    with _refresher_lock:
+        if _refresher is None or not _refresher.is_alive():
+            _refresher = threading.Thread(target=loop, name='revocation-refresher', daemon=True)
+            _refresher.start()
+        return _refresher
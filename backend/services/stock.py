@@ -0,0 +1,315 @@
+import random
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from pymongo import ReturnDocument
+from models.product import Product
+from models.stock_shard import StockShard
+from config import Config
+
+# Seconds before the rebalancer completes a transfer another run left pending
+TRANSFER_TIMEOUT = 60
+# Transfer ids remembered per shard, to credit each transfer only once
+APPLIED_HISTORY = 50
+
+# One rebalancer thread per process, however often start_rebalancer is called
+_rebalancer_lock = threading.Lock()
+_rebalancer = None
+
+
+def enable_sharding(product, shards=None):
+    """
+    Switch a product to hot SKU mode.
+    
+    The product's current stock is split as evenly as possible across
+    `shards` StockShard documents, then `Product.stock` is zeroed and the
+    flag set in one update conditional on the stock that was split. If a
+    checkout changed the stock in between, the shards are rewritten from
+    the new value and the switch retried, so no unit is lost or doubled.
+    """
+    if product.hot_sku:
+        return
+    
+    shards = shards or Config.STOCK_SHARDS
+    while True:
+        current = Product.objects(id=product.id).only('stock', 'hot_sku').first()
+        if current is None or current.hot_sku:
+            break
+        # Shards are ignored until the flag is set, so writing them first is safe
+        _write_shards(product.id, current.stock, shards)
+        if Product.objects(id=product.id, hot_sku=False, stock=current.stock).update_one(
+            set__stock=0, set__hot_sku=True, set__in_stock=True
+        ) == 1:
+            break
+    
+    product.reload('stock', 'hot_sku')
+
+
+def disable_sharding(product):
+    """
+    Fold all shards back into `Product.stock` and leave hot SKU mode.
+    
+    The flag is cleared first so new checkouts use `Product.stock`, then
+    every shard is drained with an atomic read-and-zero and its units added
+    to the product. Shards are only deleted once empty with no transfer in
+    flight; anything returned to a shard meanwhile is drained on the next
+    pass.
+    """
+    if not product.hot_sku:
+        return
+    
+    product_id = str(product.id)
+    Product.objects(id=product.id).update_one(set__hot_sku=False)
+    
+    while StockShard.objects(product_id=product_id).count():
+        _settle(product_id)
+        for shard in StockShard.objects(product_id=product_id).only('shard'):
+            drained = StockShard.objects(product_id=product_id, shard=shard.shard).modify(set__stock=0)
+            if drained and drained.stock:
+                Product.objects(id=product.id).update_one(inc__stock=drained.stock, set__in_stock=True)
+        if not StockShard.objects(product_id=product_id, pending__not__size=0).count():
+            StockShard.objects(product_id=product_id, stock=0, pending__size=0).delete()
+    
+    # Hot SKUs counted as in stock whatever their shards held
+    _mark_sold_out(product.id)
+    product.reload('stock', 'hot_sku', 'in_stock')
+
+
+def set_stock(product, stock):
+    """
+    Set a product's stock (admin edits).
+    
+    Hot SKUs are not overwritten: transfers in flight are completed with
+    `_settle`, then the difference from the shards' total is applied with
+    the same conditional `$inc`s checkouts and transfers use, so units
+    sold or moved meanwhile are neither lost nor resurrected. A removal
+    takes whatever the shards still hold, never more.
+    """
+    product_id = str(product.id)
+    if not product.hot_sku or not StockShard.objects(product_id=product_id).count():
+        product.stock = stock
+        return
+    
+    _settle(product_id)
+    shards = list(StockShard.objects(product_id=product_id).only('shard', 'stock', 'pending', 'applied'))
+    # A rebalance may have started a transfer since; its units count until credited
+    credited = {transfer_id for s in shards for transfer_id in s.applied}
+    in_flight = sum(t['amount'] for s in shards for t in s.pending if t['id'] not in credited)
+    delta = stock - sum(s.stock for s in shards) - in_flight
+    
+    if delta > 0:
+        emptiest = min(shards, key=lambda s: s.stock)
+        # The shard may have been drained and deleted since it was read
+        if StockShard.objects(product_id=product_id, shard=emptiest.shard).update_one(inc__stock=delta) != 1:
+            Product.objects(id=product.id).update_one(inc__stock=delta, set__in_stock=True)
+        return
+    
+    remaining = -delta
+    for s in sorted(shards, key=lambda s: -s.stock):
+        # Retry with the shard's current stock if a checkout took from it meanwhile
+        while remaining and s.stock:
+            amount = min(remaining, s.stock)
+            if StockShard.objects(product_id=product_id, shard=s.shard, stock__gte=amount).update_one(
+                __raw__=_take(amount)
+            ) == 1:
+                remaining -= amount
+                break
+            current = StockShard.objects(product_id=product_id, shard=s.shard).only('stock').first()
+            s.stock = current.stock if current else 0
+
+
+def decrement_stock(product, quantity):
+    """
+    Atomically take `quantity` units from a product's stock.
+    
+    Returns True on success and False if there is not enough stock.
+    Regular products use a single conditional update. Hot SKUs first try
+    one random shard and only fall back to draining several shards when
+    no single shard holds enough units.
+    """
+    product_id = str(product.id)
+    shard_count = StockShard.objects(product_id=product_id).count() if product.hot_sku else 0
+    # No shards: a regular product, or one whose shards were just folded back
+    if shard_count == 0:
+        after = Product._get_collection().find_one_and_update(
+            {'_id': product.id, 'stock': {'$gte': quantity}}, _take(quantity),
+            projection={'stock': True}, return_document=ReturnDocument.AFTER
+        )
+        if after is None:
+            return False
+        if after['stock'] == 0:
+            _mark_sold_out(product.id)
+        return True
+    
+    # Fast path - one conditional $inc on a random shard
+    shard = random.randrange(shard_count)
+    if StockShard.objects(product_id=product_id, shard=shard, stock__gte=quantity).update_one(__raw__=_take(quantity)) == 1:
+        return True
+    
+    # Slow path - collect units from whichever shards still have some
+    taken = []
+    remaining = quantity
+    shards = list(StockShard.objects(product_id=product_id, stock__gt=0).only('shard', 'stock'))
+    random.shuffle(shards)
+    
+    for s in shards:
+        amount = min(remaining, s.stock)
+        if StockShard.objects(product_id=product_id, shard=s.shard, stock__gte=amount).update_one(__raw__=_take(amount)) == 1:
+            taken.append((s.shard, amount))
+            remaining -= amount
+        if remaining == 0:
+            return True
+    
+    # Not enough stock - give back what we took
+    for shard, amount in taken:
+        StockShard.objects(product_id=product_id, shard=shard).update_one(inc__stock=amount)
+    return False
+
+
+def increment_stock(product, quantity):
+    """Return `quantity` units to a product's stock"""
+    product_id = str(product.id)
+    shard_count = StockShard.objects(product_id=product_id).count() if product.hot_sku else 0
+    # The shard may have been drained and deleted since it was counted
+    if shard_count and StockShard.objects(product_id=product_id, shard=random.randrange(shard_count)).update_one(
+        inc__stock=quantity
+    ) == 1:
+        return
+    Product.objects(id=product.id).update_one(inc__stock=quantity, set__in_stock=True)
+
+
+def rebalance(product_id):
+    """
+    Even out stock across a hot product's shards.
+    
+    Units are moved from the fullest shards to the emptiest ones with
+    `_transfer`, so concurrent decrements are never lost, a shard never
+    goes negative and a crash mid-move never loses or doubles units.
+    Transfers a previous run left unfinished are completed first.
+    """
+    product_id = str(product_id)
+    _settle(product_id, older_than=TRANSFER_TIMEOUT)
+    
+    shards = list(StockShard.objects(product_id=product_id).only('shard', 'stock'))
+    if len(shards) < 2:
+        return
+    
+    target = sum(s.stock for s in shards) // len(shards)
+    donors = [s for s in shards if s.stock > target]
+    receivers = [s for s in shards if s.stock < target]
+    
+    for receiver in receivers:
+        need = target - receiver.stock
+        for donor in donors:
+            if need == 0:
+                break
+            amount = min(need, donor.stock - target)
+            if amount <= 0:
+                continue
+            if _transfer(product_id, donor.shard, receiver.shard, amount):
+                donor.stock -= amount
+                need -= amount
+
+
+def start_rebalancer(interval):
+    """
+    Rebalance every hot SKU every `interval` seconds on a daemon thread.
+    Starts the thread once per process; later calls return the running one.
+    """
+    global _rebalancer
+    
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                for product in Product.objects(hot_sku=True).only('id'):
+                    rebalance(product.id)
+            except Exception as e:
+                print(f'Stock rebalancer error: {e}')
+    
+    with _rebalancer_lock:
+        if _rebalancer is None or not _rebalancer.is_alive():
+            _rebalancer = threading.Thread(target=run, name='stock-rebalancer', daemon=True)
+            _rebalancer.start()
+        return _rebalancer
+
+
+def _take(quantity):
+    """
+    Raw `$inc` that subtracts `quantity`.
+    
+    `dec__stock` would be validated against IntField(min_value=0) as a
+    negative value, so decrements go through a raw update instead. The
+    accompanying `stock__gte` filter keeps the counter from going negative.
+    """
+    return {'$inc': {'stock': -quantity}}
+
+
+def _mark_sold_out(product_id):
+    """
+    Clear in_stock on a regular product whose stock is 0. Restocking sets
+    the flag in the same update as its $inc, so a restock racing this
+    either runs after it or makes the filter miss.
+    """
+    Product.objects(id=product_id, hot_sku=False, stock=0, in_stock=True).update_one(set__in_stock=False)
+
+
+def _transfer(product_id, source, target, amount):
+    """
+    Move `amount` units between two shards of a product.
+    
+    MongoDB only updates one document atomically, so the move is recorded
+    on the source: one update takes the units and appends a pending entry,
+    the target is credited only if it has not applied that entry yet, and
+    the entry is then removed. `_settle` finishes moves interrupted between
+    the steps. Returns False if the source no longer holds `amount` units.
+    """
+    transfer = {'id': uuid.uuid4().hex, 'to': target, 'amount': amount, 'at': datetime.utcnow()}
+    taken = StockShard.objects(product_id=product_id, shard=source, stock__gte=amount).update_one(__raw__={
+        **_take(amount), '$push': {'pending': transfer}
+    })
+    if taken != 1:
+        return False
+    _complete(product_id, source, transfer)
+    return True
+
+
+def _complete(product_id, source, transfer):
+    """Credit a pending transfer to its target shard (at most once) and clear it from the source"""
+    target = StockShard.objects(product_id=product_id, shard=transfer['to'])
+    credited = target.filter(applied__ne=transfer['id']).update_one(__raw__={
+        '$inc': {'stock': transfer['amount']},
+        '$push': {'applied': {'$each': [transfer['id']], '$slice': -APPLIED_HISTORY}}
+    })
+    
+    pending = StockShard.objects(product_id=product_id, shard=source, pending__id=transfer['id'])
+    pull = {'$pull': {'pending': {'id': transfer['id']}}}
+    if credited == 0 and target.count() == 0:
+        # Target was drained and deleted first - the units go back to the source
+        pending.update_one(__raw__={'$inc': {'stock': transfer['amount']}, **pull})
+    else:
+        pending.update_one(__raw__=pull)
+
+
+def _settle(product_id, older_than=0):
+    """Finish every transfer of a product still pending after `older_than` seconds"""
+    cutoff = datetime.utcnow() - timedelta(seconds=older_than)
+    for shard in StockShard.objects(product_id=product_id, pending__not__size=0).only('shard', 'pending'):
+        for transfer in shard.pending:
+            if transfer['at'] <= cutoff:
+                _complete(product_id, shard.shard, transfer)
+
+
+def _write_shards(product_id, stock, shards):
+    """Spread `stock` over `shards` shard documents"""
+    product_id = str(product_id)
+    base, extra = divmod(stock, shards)
+    
+    StockShard.objects(product_id=product_id, shard__gte=shards).delete()
+    for shard in range(shards):
+        StockShard.objects(product_id=product_id, shard=shard).update_one(
+            set__stock=base + (1 if shard < extra else 0),
+            set__pending=[],
+            upsert=True
+        )
@@ -0,0 +1,81 @@
+import hmac
+import jwt
+from config import Config
+
+# Algorithms that verify with JWT_PUBLIC_KEY instead of JWT_SECRET_KEY
+ASYMMETRIC = ('RS', 'ES', 'PS', 'Ed')
+
+
+def find(headers, query_params, cookies, method):
+    """
+    The encoded access token of a request, looked up the way
+    Flask-JWT-Extended does.
+    
+    Locations are tried in JWT_TOKEN_LOCATION order ('headers',
+    'query_string' and 'cookies'; a JSON body is not read), with the
+    header, parameter and cookie names from Config. Cookie tokens need a
+    matching CSRF header on JWT_CSRF_METHODS when CSRF protection is on.
+    Raises ValueError with Flask-JWT-Extended's message when none is found.
+    """
+    errors = []
+    for location in Config.JWT_TOKEN_LOCATION:
+        if location == 'headers':
+            header = headers.get(Config.JWT_HEADER_NAME)
+            if not header:
+                errors.append(f'Missing {Config.JWT_HEADER_NAME} Header')
+                continue
+            if not Config.JWT_HEADER_TYPE:
+                return header
+            parts = header.split()
+            if len(parts) != 2 or parts[0] != Config.JWT_HEADER_TYPE:
+                raise ValueError(f"Bad {Config.JWT_HEADER_NAME} header. "
+                                 f"Expected '{Config.JWT_HEADER_NAME}: {Config.JWT_HEADER_TYPE} <JWT>'")
+            return parts[1]
+        
+        if location == 'query_string':
+            token = query_params.get(Config.JWT_QUERY_STRING_NAME)
+            if token:
+                return token
+            errors.append(f"Missing '{Config.JWT_QUERY_STRING_NAME}' query paramater")
+        
+        if location == 'cookies':
+            token = cookies.get(Config.JWT_ACCESS_COOKIE_NAME)
+            if token:
+                if Config.JWT_COOKIE_CSRF_PROTECT and method in Config.JWT_CSRF_METHODS:
+                    csrf = headers.get(Config.JWT_ACCESS_CSRF_HEADER_NAME)
+                    claims = decode(token)
+                    if not csrf or not hmac.compare_digest(csrf, claims.get('csrf', '')):
+                        raise ValueError('CSRF double submit tokens do not match')
+                return token
+            errors.append(f'Missing cookie "{Config.JWT_ACCESS_COOKIE_NAME}"')
+    
+    locations = list(Config.JWT_TOKEN_LOCATION)
+    if len(errors) == 1:
+        raise ValueError(errors[0])
+    raise ValueError(f"Missing JWT in {', '.join(locations[:-1])} or {locations[-1]} ({'; '.join(errors)})")
+
+
+def decode(token):
+    """
+    Verified claims of an encoded token.
+    
+    Uses the same keys as Flask-JWT-Extended: JWT_DECODE_ALGORITHMS (or
+    JWT_ALGORITHM), JWT_DECODE_LEEWAY, JWT_DECODE_AUDIENCE and
+    JWT_DECODE_ISSUER, and JWT_PUBLIC_KEY for asymmetric algorithms.
+    Raises ValueError on expired or otherwise invalid tokens.
+    """
+    algorithms = Config.JWT_DECODE_ALGORITHMS or [Config.JWT_ALGORITHM]
+    key = Config.JWT_PUBLIC_KEY if Config.JWT_ALGORITHM.startswith(ASYMMETRIC) else Config.JWT_SECRET_KEY
+    try:
+        return jwt.decode(
+            token, key,
+            algorithms=algorithms,
+            audience=Config.JWT_DECODE_AUDIENCE,
+            issuer=Config.JWT_DECODE_ISSUER,
+            leeway=Config.JWT_DECODE_LEEWAY,
+            options={'verify_aud': Config.JWT_DECODE_AUDIENCE is not None}
+        )
+    except jwt.ExpiredSignatureError:
+        raise ValueError('Token has expired')
+    except jwt.InvalidTokenError:
+        raise ValueError('Signature verification failed')
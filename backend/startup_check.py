@@ -0,0 +1,94 @@
+import argparse
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+from config import Config
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def import_times():
+    """Cumulative import time of `app` and its slowest direct imports, in ms"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import app'],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+    )
+    
+    total = 0
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Top-level (0 indent) and first-level (2 spaces) imports only
+        indent = len(name) - len(name.lstrip()) - 1
+        if name.strip() == 'app' and indent == 0:
+            total = int(cumulative) / 1000
+        elif indent == 2:
+            modules.append((int(cumulative) / 1000, name.strip()))
+    
+    return total, sorted(modules, reverse=True)
+
+
+def time_to_healthy(port, timeout):
+    """Seconds from process start until GET /api/health answers 200"""
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, '-c', f'from app import app; app.run(port={port}, use_reloader=False)'],
+        cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            if server.poll() is not None:
+                raise RuntimeError(f'Server exited with code {server.returncode}')
+            try:
+                with urllib.request.urlopen(f'http://127.0.0.1:{port}/api/health', timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started
+            except OSError:
+                time.sleep(0.02)
+        raise RuntimeError(f'Not healthy after {timeout}s')
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    """
+    Startup budget check for CI.
+    
+    Measures the import time of app.py (python -X importtime) and the time
+    from process start to the first healthy /api/health response, and
+    exits with status 1 when either exceeds its budget. MongoDB does not
+    need to be running.
+    
+    Usage:
+        python startup_check.py
+        python startup_check.py --import-budget 500 --healthy-budget 1500
+    """
+    parser = argparse.ArgumentParser(description='Startup time budget check')
+    parser.add_argument('--import-budget', type=float, default=Config.STARTUP_IMPORT_BUDGET_MS, help='ms')
+    parser.add_argument('--healthy-budget', type=float, default=Config.STARTUP_HEALTHY_BUDGET_MS, help='ms')
+    parser.add_argument('--port', type=int, default=5099)
+    parser.add_argument('--top', type=int, default=10, help='Slowest imports to list')
+    args = parser.parse_args()
+    
+    total, modules = import_times()
+    print(f'Import time: {total:.0f} ms (budget {args.import_budget:.0f} ms)')
+    for ms, name in modules[:args.top]:
+        print(f'  {ms:8.1f} ms  {name}')
+    
+    healthy = time_to_healthy(args.port, timeout=max(args.healthy_budget / 1000 * 5, 10)) * 1000
+    print(f'Time to first healthy /api/health: {healthy:.0f} ms (budget {args.healthy_budget:.0f} ms)')
+    
+    failed = [label for label, value, budget in (
+        ('import time', total, args.import_budget),
+        ('time to healthy', healthy, args.healthy_budget)
+    ) if value > budget]
+    
+    if failed:
+        print(f'✗ Over budget: {", ".join(failed)}')
+        sys.exit(1)
+    print('✓ Startup within budget')
@@ -0,0 +1,86 @@
+import argparse
+import threading
+import time
+from mongoengine import connect
+from models.product import Product
+from models.stock_shard import StockShard
+from services import stock
+from config import Config
+
+SCRATCH_URI = 'mongodb://localhost:27017/supermarket_stock_benchmark'
+
+
+def orders_per_second(product, buyers, duration):
+    """
+    Successful single-unit stock takes per second for one product.
+    
+    `buyers` threads call decrement_stock in a loop for `duration`
+    seconds - the step of every checkout that contends on the SKU.
+    """
+    counts = [0] * buyers
+    start = threading.Barrier(buyers + 1)
+    deadline = [0.0]
+    
+    def buy(i):
+        start.wait()
+        while time.perf_counter() < deadline[0]:
+            if stock.decrement_stock(product, 1):
+                counts[i] += 1
+    
+    threads = [threading.Thread(target=buy, args=(i,)) for i in range(buyers)]
+    for thread in threads:
+        thread.start()
+    deadline[0] = time.perf_counter() + duration
+    start.wait()
+    for thread in threads:
+        thread.join()
+    return sum(counts) / duration
+
+
+def run(buyers, duration, shards):
+    """{mode: orders/sec} for a throwaway product, without and with sharding"""
+    results = {}
+    for mode in ('regular', 'sharded'):
+        product = Product(name=f'Stock benchmark ({mode})', description='Temporary', price=1.0,
+                          category='Benchmark', image_url='https://example.com/benchmark.png',
+                          stock=10 ** 9)
+        product.save()
+        try:
+            if mode == 'sharded':
+                stock.enable_sharding(product, shards)
+            results[mode] = orders_per_second(product, buyers, duration)
+        finally:
+            StockShard.objects(product_id=str(product.id)).delete()
+            product.delete()
+    return results
+
+
+if __name__ == "__main__":
+    """
+    Hot SKU contention benchmark.
+    
+    Creates a temporary product with plenty of stock and measures how many
+    orders per second `--buyers` concurrent threads can take from it,
+    first from Product.stock and then from sharded counters (see
+    services/stock.py). Needs a MongoDB server; by default it writes to
+    a scratch database, never the app's, and the temporary documents are
+    removed afterwards.
+    
+    Usage:
+        python stock_benchmark.py
+        python stock_benchmark.py --uri mongodb://localhost:27017/benchmark --buyers 64 --duration 10
+    """
+    parser = argparse.ArgumentParser(description='Hot SKU stock contention benchmark')
+    parser.add_argument('--uri', default=SCRATCH_URI)
+    parser.add_argument('--buyers', type=int, default=64)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--shards', type=int, default=Config.STOCK_SHARDS)
+    args = parser.parse_args()
+    
+    connect(host=args.uri)
+    
+    results = run(args.buyers, args.duration, args.shards)
+    print(f'{args.buyers} buyers, one SKU, {args.duration:g}s each')
+    print(f'  regular: {results["regular"]:.0f} orders/sec')
+    print(f'  sharded: {results["sharded"]:.0f} orders/sec ({args.shards} shards, '
+          f'{results["sharded"] / results["regular"]:.2f}x)')
@@ -0,0 +1,62 @@
+import os
+import sys
+import mongoengine
+import mongomock
+import pytest
+
+# Settings are read from the environment when config is imported: no rate
+# limits or background threads, and one process-wide mongomock client
+os.environ.setdefault('RATE_LIMIT_ENABLED', 'false')
+os.environ.setdefault('STOCK_REBALANCE_INTERVAL', '0')
+os.environ.setdefault('REVOCATION_REFRESH_INTERVAL', '0')
+os.environ.setdefault('MONGODB_URI', 'mongodb://localhost/supermarket_test')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_connect = mongoengine.connect
+mongoengine.connect = lambda *args, **kwargs: _connect(
+    *args, **kwargs, mongo_client_class=mongomock.MongoClient)
+
+from mongoengine.connection import get_db, get_connection
+from starlette.testclient import TestClient
+from app import create_app
+from models.user import User
+
+
+@pytest.fixture
+def app():
+    app = create_app()
+    yield app
+    db = get_db()
+    db.client.drop_database(db.name)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def login(client):
+    """login(username, admin=False) -> Authorization header for a new user"""
+    def login(username, admin=False):
+        user = User(username=username, email=f'{username}@example.com', is_admin=admin)
+        user.set_password('password')
+        user.save()
+        response = client.post('/api/auth/login', json={'username': username, 'password': 'password'})
+        return {'Authorization': f"Bearer {response.get_json()['access_token']}"}
+    return login
+
+
+@pytest.fixture
+def async_client(app, monkeypatch):
+    """Test client for the ASGI app (async_api), on the same mongomock data as `client`"""
+    import async_api
+    from async_api import db
+    from mongomock_motor import AsyncMongoMockClient
+    
+    motor = AsyncMongoMockClient(mock_mongo_client=get_connection())
+    monkeypatch.setattr(db, 'get_db', lambda: motor[get_db().name])
+    monkeypatch.setattr('async_api.routes.get_db', lambda: motor[get_db().name])
+    with TestClient(async_api.app) as client:
+        yield client
@@ -0,0 +1,27 @@
+import os
+import app as app_module
+from config import Config
+
+
+def test_background_tasks_start_once_per_process(monkeypatch):
+    started = []
+    monkeypatch.setattr('services.stock.start_rebalancer', lambda interval: started.append('rebalancer'))
+    monkeypatch.setattr('services.revocation.start_refresher', lambda interval: started.append('refresher'))
+    monkeypatch.setattr(app_module, '_background_pid', None)
+    
+    class Background(Config):
+        STOCK_REBALANCE_INTERVAL = 30
+        REVOCATION_REFRESH_INTERVAL = 2
+    
+    # Building the app starts nothing; the first request does
+    client = app_module.create_app(Background).test_client()
+    assert started == []
+    client.get('/api/health')
+    client.get('/api/health')
+    assert started == ['rebalancer', 'refresher']
+    
+    # A worker forked after the first request starts its own
+    pid = os.getpid()
+    monkeypatch.setattr(os, 'getpid', lambda: pid + 1)
+    client.get('/api/health')
+    assert started == ['rebalancer', 'refresher'] * 2
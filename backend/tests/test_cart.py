@@ -0,0 +1,71 @@
+import mongomock
+import pytest
+from models.cart import Cart
+from config import Config
+
+TTL = Config.CART_TTL_DAYS * 86400
+
+
+@pytest.fixture
+def carts(app, monkeypatch):
+    """The carts collection before Cart first uses it in this process, with collMod recorded"""
+    monkeypatch.setattr(Cart, '_collection', None)
+    collection = Cart._get_db()[Cart._get_collection_name()]
+    collection.drop()
+    
+    # mongomock has no collMod; apply it the way the server would
+    modified = []
+    command = mongomock.database.Database.command
+    
+    def coll_mod(database, spec, *args, **kwargs):
+        if 'collMod' not in spec:
+            return command(database, spec, *args, **kwargs)
+        modified.append(spec['index']['expireAfterSeconds'])
+        target = database[spec['collMod']]
+        target.drop_index('updated_at_1')
+        target.create_index('updated_at', expireAfterSeconds=spec['index']['expireAfterSeconds'])
+        return {'ok': 1}
+    
+    monkeypatch.setattr(mongomock.database.Database, 'command', coll_mod)
+    collection.modified = modified
+    return collection
+
+
+def ttl_of(collection):
+    return {index['name']: index.get('expireAfterSeconds') for index in collection.list_indexes()}.get('updated_at_1')
+
+
+def test_changed_ttl_is_applied_in_place(carts):
+    carts.create_index('updated_at', expireAfterSeconds=7 * 86400)
+    
+    Cart._get_collection()
+    
+    assert carts.modified == [TTL]
+    assert ttl_of(carts) == TTL
+    assert Cart.objects.count() == 0
+
+
+def test_matching_ttl_is_left_alone(carts):
+    carts.create_index('updated_at', expireAfterSeconds=TTL)
+    
+    Cart._get_collection()
+    
+    assert carts.modified == []
+    assert ttl_of(carts) == TTL
+
+
+def test_plain_index_is_rebuilt_with_the_ttl(carts):
+    carts.create_index('updated_at')
+    
+    Cart._get_collection()
+    
+    assert carts.modified == []
+    assert ttl_of(carts) == TTL
+
+
+def test_ttl_zero_drops_the_ttl_index(carts):
+    carts.create_index('updated_at', expireAfterSeconds=TTL)
+    
+    Cart.reconcile_ttl(carts, 0)
+    
+    assert 'updated_at_1' not in {index['name'] for index in carts.list_indexes()}
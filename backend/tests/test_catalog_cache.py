@@ -0,0 +1,75 @@
+import time
+import pytest
+from models.product import Product
+from services import catalog_cache
+
+
+@pytest.fixture
+def catalog(app):
+    """Two products, with an empty catalog cache and a closed breaker"""
+    catalog_cache.cache.invalidate()
+    products = [Product(name=name, price=1.0, category=category, stock=5)
+                for name, category in (('Milk', 'Dairy'), ('Bread', 'Bakery'))]
+    for product in products:
+        product.save()
+    yield products
+    catalog_cache.cache.invalidate()
+    catalog_cache.breaker._record(True)
+
+
+def open_breaker():
+    breaker = catalog_cache.breaker
+    with breaker._lock:
+        breaker._state = 'open'
+        breaker._opened_at = time.monotonic()
+
+
+def rename_behind_the_cache(product, name):
+    """A write that does not invalidate the cache, as another worker's would not"""
+    Product.objects(id=product.id).update_one(set__name=name)
+
+
+def test_batch_is_cached(client, catalog):
+    milk, bread = catalog
+    ids = {'ids': [str(bread.id), str(milk.id), 'nope']}
+    
+    first = client.post('/api/products/batch', json=ids).get_json()
+    assert [p['name'] for p in first['products']] == ['Bread', 'Milk']
+    assert first['missing'] == ['nope']
+    
+    rename_behind_the_cache(milk, 'Oat milk')
+    assert client.post('/api/products/batch', json=ids).get_json() == first
+    # GET with the same ids shares the entry
+    assert client.get(f"/api/products/batch?ids={','.join(ids['ids'])}").get_json() == first
+
+
+def test_batch_rejects_ids_that_are_not_strings(client, catalog):
+    assert client.post('/api/products/batch', json={'ids': [1, {'a': 2}]}).status_code == 400
+
+
+def test_batch_fails_fast_while_the_breaker_is_open(client, catalog):
+    open_breaker()
+    response = client.post('/api/products/batch', json={'ids': [str(catalog[0].id)]})
+    assert response.status_code == 503
+    assert 'Retry-After' in response.headers
+
+
+def test_bootstrap_shares_the_catalog_cache(client, catalog):
+    listing = client.get('/api/products').get_json()
+    categories = client.get('/api/products/categories').get_json()['categories']
+    
+    rename_behind_the_cache(catalog[0], 'Oat milk')
+    open_breaker()
+    
+    body = client.get('/api/bootstrap').get_json()
+    assert body['products'] == listing
+    assert body['categories'] == categories
+    assert body['errors'] == {}
+
+
+def test_bootstrap_reports_catalog_errors_while_the_breaker_is_open(client, catalog):
+    open_breaker()
+    
+    body = client.get('/api/bootstrap').get_json()
+    assert body['products'] is None and body['categories'] is None
+    assert set(body['errors']) == {'products', 'categories'}
@@ -0,0 +1,77 @@
+import pytest
+from models.order import Order
+from models.product import Product
+from models.user import User
+from services import checkout
+
+
+@pytest.fixture
+def shopper(app):
+    user = User(username='carol', email='carol@example.com')
+    user.set_password('password')
+    user.save()
+    return user
+
+
+@pytest.fixture
+def bread(app):
+    product = Product(name='Bread', price=2.5, category='Bakery', stock=10)
+    product.save()
+    return product
+
+
+def test_place_order_takes_stock(shopper, bread):
+    order = checkout.place_order(shopper, [{'product_id': str(bread.id), 'quantity': 3}])
+    
+    assert Order.objects(id=order.id).count() == 1
+    assert bread.reload().stock == 7
+
+
+def test_place_order_releases_stock_when_the_order_is_not_saved(shopper, bread, monkeypatch):
+    def fail(self, *args, **kwargs):
+        raise RuntimeError('write failed')
+    
+    monkeypatch.setattr(Order, 'save', fail)
+    
+    with pytest.raises(RuntimeError):
+        checkout.place_order(shopper, [{'product_id': str(bread.id), 'quantity': 3}])
+    
+    assert bread.reload().stock == 10
+
+
+# A valid line for bread comes first; BREAD stands for its id
+@pytest.mark.parametrize('bad_item', [
+    {'product_id': 'not-an-id', 'quantity': 1},
+    {'product_id': 'BREAD'},
+    {'product_id': 'BREAD', 'quantity': -5},
+    {'product_id': 'BREAD', 'quantity': True}
+], ids=['invalid-id', 'no-quantity', 'negative-quantity', 'bool-quantity'])
+def test_invalid_items_are_rejected_before_stock_is_taken(client, login, bread, bad_item):
+    headers = login('dave')
+    if bad_item['product_id'] == 'BREAD':
+        bad_item = {**bad_item, 'product_id': str(bread.id)}
+    items = [{'product_id': str(bread.id), 'quantity': 2}, bad_item]
+    
+    response = client.post('/api/orders/', json={'items': items}, headers=headers)
+    
+    assert response.status_code == 400
+    assert bread.reload().stock == 10
+
+
+def test_unexpected_errors_release_stock(shopper, bread, monkeypatch):
+    butter = Product(name='Butter', price=3.0, category='Dairy', stock=4)
+    butter.save()
+    real = checkout.stock.decrement_stock
+    
+    def decrement(product, quantity):
+        if product.id == butter.id:
+            raise RuntimeError('connection reset')
+        return real(product, quantity)
+    
+    monkeypatch.setattr(checkout.stock, 'decrement_stock', decrement)
+    
+    with pytest.raises(RuntimeError):
+        checkout.place_order(shopper, [{'product_id': str(bread.id), 'quantity': 2},
+                                       {'product_id': str(butter.id), 'quantity': 1}])
+    
+    assert bread.reload().stock == 10
@@ -0,0 +1,45 @@
+import mongomock
+import pytest
+from services import counts
+
+
+@pytest.fixture
+def collection():
+    collection = mongomock.MongoClient().db.products
+    collection.insert_many([{'category': 'Bakery' if i % 2 else 'Dairy'} for i in range(10)])
+    counts.invalidate()
+    yield collection
+    counts.invalidate()
+
+
+def test_none_skips_counting(collection):
+    pending = counts.Count({'category': 'Bakery'}, 'none')
+    assert pending.known and pending.total is None
+
+
+def test_estimate_counts_a_filter_once(collection):
+    query = {'category': 'Bakery'}
+    assert counts.count(collection, query, 'estimate') == 5
+    
+    collection.insert_one({'category': 'Bakery'})
+    # Answered from the cache until an invalidation or the TTL
+    assert counts.Count(query, 'estimate').known
+    assert counts.count(collection, query, 'estimate') == 5
+    assert counts.count(collection, query, 'exact') == 6
+
+
+def test_estimate_without_a_filter_uses_collection_metadata(collection):
+    pending = counts.Count({}, 'estimate')
+    assert not pending.known
+    assert pending.finish(pending.fetch(collection)) == 10
+    assert counts.cache.get(counts.key({})) is None
+
+
+def test_count_voided_by_a_write_is_not_cached(collection):
+    query = {'category': 'Dairy'}
+    pending = counts.Count(query, 'estimate')
+    total = pending.fetch(collection)
+    counts.invalidate()
+    
+    assert pending.finish(total) == 5
+    assert not counts.Count(query, 'estimate').known
@@ -0,0 +1,74 @@
+from datetime import datetime, timedelta
+import numpy as np
+from models.order import Order, OrderItem
+from models.product import Product
+from models.user import User
+from services.forecast import build_report, forecast
+
+TODAY = datetime(2026, 6, 30)
+
+
+def metrics_for(sales, stock):
+    """forecast() for one product with the given daily sales (oldest first) and stock"""
+    return {name: values[0] for name, values in forecast(
+        np.array([sales], dtype=np.float32), np.array([stock], dtype=np.float64)).items()}
+
+
+def test_steady_seller_with_cover_is_not_flagged():
+    metrics = metrics_for([2] * 90, 200)
+    assert metrics['forecast'] == 2
+    assert metrics['days_of_cover'] == 100
+    assert not metrics['reorder'] and metrics['suggested'] == 0
+
+
+def test_low_cover_is_flagged_with_a_suggestion():
+    metrics = metrics_for([2] * 90, 10)
+    # 10 + 7 days of demand at 2 a day, less the 10 in stock
+    assert metrics['days_of_cover'] == 5
+    assert metrics['reorder'] and metrics['suggested'] == 24
+
+
+def test_out_of_stock_without_recent_sales_is_flagged():
+    # Sold 1 a day until a stockout 60 days ago, nothing since
+    metrics = metrics_for([1] * 30 + [0] * 60, 0)
+    assert metrics['forecast'] == 0
+    assert metrics['days_of_cover'] == 0
+    assert metrics['reorder']
+    # The stockout hides demand, so the whole history's average is used
+    assert metrics['suggested'] == 6
+
+
+def test_out_of_stock_that_never_sold_gets_one_unit():
+    metrics = metrics_for([0] * 90, 0)
+    assert metrics['reorder'] and metrics['suggested'] == 1
+
+
+def test_products_with_no_sales_and_stock_are_not_flagged():
+    metrics = metrics_for([0] * 90, 5)
+    assert metrics['days_of_cover'] == np.inf
+    assert not metrics['reorder'] and metrics['suggested'] == 0
+
+
+def test_report_lists_sold_out_products_first(app):
+    user = User(username='shopper', email='shopper@example.com')
+    user.set_password('password')
+    user.save()
+    
+    idle = Product(name='Idle', price=1.0, category='Dairy', stock=0)
+    idle.save()
+    busy = Product(name='Busy', price=1.0, category='Dairy', stock=20)
+    busy.save()
+    Product(name='Shelf', price=1.0, category='Dairy', stock=50).save()
+    
+    for day in range(14):
+        Order(user=user, total=3.0, created_at=TODAY - timedelta(days=day, hours=-12), items=[
+            OrderItem(product_id=str(busy.id), product_name='Busy', quantity=3, price=1.0)
+        ]).save()
+    
+    report = build_report(days=28, today=TODAY)
+    rows = {row['name']: row for row in report['products']}
+    
+    assert [row['name'] for row in report['products']] == ['Idle', 'Busy', 'Shelf']
+    assert rows['Idle']['reorder'] and rows['Idle']['days_of_cover'] == 0
+    assert rows['Busy']['reorder'] and rows['Busy']['suggested_quantity'] > 0
+    assert not rows['Shelf']['reorder'] and rows['Shelf']['days_of_cover'] is None
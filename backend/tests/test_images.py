@@ -0,0 +1,133 @@
+import io
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from PIL import Image
+from app import create_app
+from config import Config
+from models.product import Product
+from services import admission, images
+from services.images import DiskLRU, FORMATS
+
+
+def png(width, height):
+    out = io.BytesIO()
+    Image.new('RGB', (width, height), (200, 40, 40)).save(out, format='PNG')
+    return out.getvalue()
+
+
+@pytest.fixture
+def origin():
+    """Local image origin: /photo.png is a 1600x1000 PNG, /broken is not an image"""
+    bodies = {'/photo.png': png(1600, 1000), '/broken': b'not an image'}
+    hits = []
+    
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            hits.append(self.path)
+            body = bodies.get(self.path)
+            if body is None:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def log_message(self, *args):
+            pass
+    
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f'http://127.0.0.1:{server.server_port}'
+    server.hits = hits
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def image_cache(tmp_path, monkeypatch):
+    cache = DiskLRU(str(tmp_path), Config.IMAGE_CACHE_MAX_BYTES)
+    monkeypatch.setattr(images, 'cache', cache)
+    return cache
+
+
+def product_with_image(url):
+    product = Product(name='Tomato', price=1.0, category='Vegetables', image_url=url)
+    product.save()
+    return str(product.id)
+
+
+def test_one_origin_fetch_serves_every_size_and_format(client, origin):
+    product_id = product_with_image(f'{origin.url}/photo.png')
+    
+    for size, edge in Config.IMAGE_VARIANTS.items():
+        for fmt, mimetype in FORMATS.items():
+            accept = 'image/webp,image/*' if fmt == 'webp' else 'image/*'
+            response = client.get(f'/api/images/{product_id}?size={size}', headers={'Accept': accept})
+            assert response.status_code == 200
+            assert response.mimetype == mimetype
+            image = Image.open(io.BytesIO(response.data))
+            assert image.format == fmt.upper()
+            assert max(image.size) == edge
+    
+    assert origin.hits == ['/photo.png']
+
+
+def test_if_none_match_returns_304(client, origin):
+    product_id = product_with_image(f'{origin.url}/photo.png')
+    
+    first = client.get(f'/api/images/{product_id}?size=thumb')
+    assert first.status_code == 200 and first.headers['ETag']
+    
+    again = client.get(f'/api/images/{product_id}?size=thumb', headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304
+    assert again.data == b''
+
+
+@pytest.mark.parametrize('path', ['/broken', '/missing.png'])
+def test_bad_origin_returns_502(client, origin, path):
+    product_id = product_with_image(f'{origin.url}{path}')
+    
+    response = client.get(f'/api/images/{product_id}')
+    assert response.status_code == 502
+    assert 'error' in response.get_json()
+
+
+def test_lru_evicts_least_recently_used_under_the_byte_cap(tmp_path):
+    cache = DiskLRU(str(tmp_path), max_bytes=250)
+    for name in ('a1', 'b1', 'c1'):
+        cache.put(name, b'x' * 100)
+    
+    # 300 bytes > 250: the oldest file went
+    assert cache.get('a1') is None
+    assert cache.stats() == {'files': 2, 'bytes': 200, 'max_bytes': 250}
+    
+    # Reading b1 makes c1 the least recently used
+    assert cache.get('b1')
+    cache.put('d1', b'x' * 100)
+    assert cache.get('c1') is None
+    assert cache.get('b1') and cache.get('d1')
+    assert cache.stats()['bytes'] <= 250
+
+
+def test_images_bypass_admission():
+    assert admission.classify('GET', '/api/images/abc') is None
+    assert admission.classify('GET', '/api/products') == 'browse'
+
+
+def test_images_are_not_rate_limited(app, origin, monkeypatch):
+    class Limited(Config):
+        RATE_LIMIT_ENABLED = True
+        ADMISSION_CAPACITY = 0
+    
+    monkeypatch.setattr(Config, 'RATE_LIMITS', {'tight': {'per': 'ip', 'burst': 1, 'per_minute': 1}})
+    client = create_app(Limited).test_client()
+    product_id = product_with_image(f'{origin.url}/photo.png')
+    
+    for _ in range(3):
+        assert client.get(f'/api/images/{product_id}?size=thumb').status_code == 200
+    assert client.get('/api/products/').status_code == 200
+    assert client.get('/api/products/').status_code == 429
@@ -0,0 +1,37 @@
+from datetime import datetime, timedelta
+import pytest
+from models.order import Order, OrderItem
+from models.user import User
+from services import archive
+
+
+@pytest.fixture
+def history(login):
+    """alice's headers, with 6 orders in `orders` and 6 (over two months) in the archive"""
+    headers = login('alice')
+    user = User.objects.get(username='alice')
+    now = datetime.utcnow()
+    for days in [1, 2, 3, 4, 5, 6, 100, 101, 102, 130, 131, 132]:
+        Order(user=user, items=[OrderItem(product_id='p1', product_name='Bread', quantity=1, price=2.5)],
+              total=2.5, created_at=now - timedelta(days=days)).save()
+    archive.archive_batch(now - timedelta(days=50))
+    return headers
+
+
+def test_both_apps_list_archived_orders_page_by_page(client, async_client, history):
+    everything = client.get('/api/orders/', headers=history).get_json()['orders']
+    assert len(everything) == 12
+    assert async_client.get('/api/orders', headers=history).json()['orders'] == everything
+    
+    for page in (1, 2, 3):
+        query = {'page': page, 'per_page': 5}
+        flask = client.get('/api/orders/', query_string=query, headers=history).get_json()
+        asgi = async_client.get('/api/orders', params=query, headers=history).json()
+        assert flask == asgi
+        assert flask['orders'] == everything[(page - 1) * 5:page * 5]
+
+
+@pytest.mark.parametrize('query', [{'page': 0}, {'page': -1}, {'page': 1, 'per_page': 0}])
+def test_page_below_one_is_rejected(client, async_client, history, query):
+    assert client.get('/api/orders/', query_string=query, headers=history).status_code == 400
+    assert async_client.get('/api/orders', params=query, headers=history).status_code == 400
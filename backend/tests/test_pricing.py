@@ -0,0 +1,112 @@
+import random
+from datetime import datetime, timedelta
+import pytest
+from models.promotion import Promotion
+from services import pricing
+
+AT = datetime(2026, 6, 1, 12, 0, 0)
+PRODUCTS = [f'p{i}' for i in range(12)]
+CATEGORIES = ['Dairy', 'Bakery', 'Produce', 'Frozen']
+
+
+def random_window(rng):
+    """A time window around AT, including both boundaries (live from starts_at, over at ends_at)"""
+    return rng.choice([
+        (None, None),
+        (AT, None),
+        (None, AT),
+        (AT - timedelta(days=1), AT + timedelta(days=1)),
+        (AT + timedelta(seconds=1), None),
+        (None, AT - timedelta(seconds=1)),
+        (AT - timedelta(seconds=1), AT + timedelta(seconds=1))
+    ])
+
+
+def random_promotion(rng, index):
+    kind = rng.choice(['percentage', 'multi_buy'])
+    buy = rng.randint(2, 5)
+    starts_at, ends_at = random_window(rng)
+    scope = rng.random()
+    return Promotion(
+        name=f'Rule {index}',
+        kind=kind,
+        # Few distinct values, so rules often tie on the same line
+        percent=rng.choice([0, 5, 10, 12.5, 33, 50, 100]) if kind == 'percentage' else 0,
+        buy=buy if kind == 'multi_buy' else 1,
+        pay=rng.randint(0, buy - 1) if kind == 'multi_buy' else 1,
+        product_ids=rng.sample(PRODUCTS, rng.randint(1, 3)) if scope < 0.4 else [],
+        categories=rng.sample(CATEGORIES, rng.randint(1, 2)) if 0.3 < scope < 0.8 else [],
+        active=rng.random() > 0.1,
+        starts_at=starts_at,
+        ends_at=ends_at
+    )
+
+
+def random_lines(rng):
+    return [{
+        'product_id': rng.choice(PRODUCTS + ['unknown']),
+        'category': rng.choice(CATEGORIES + ['Unknown']),
+        'price': rng.randint(1, 2000) / 100,
+        'quantity': rng.randint(1, 12)
+    } for _ in range(rng.randint(0, 30))]
+
+
+def reference_price(lines, promotions, at):
+    """Naive per-line, per-rule loop: the highest saving wins, the earliest rule on ties"""
+    priced = []
+    for line in lines:
+        cents = round(line['price'] * 100)
+        subtotal = cents * line['quantity']
+        discount, winner = 0, None
+        for promotion in promotions:
+            if promotion.starts_at and at < promotion.starts_at:
+                continue
+            if promotion.ends_at and at >= promotion.ends_at:
+                continue
+            everything = not promotion.product_ids and not promotion.categories
+            if not (everything or line['product_id'] in promotion.product_ids
+                    or line['category'] in promotion.categories):
+                continue
+            if promotion.kind == 'multi_buy':
+                saving = line['quantity'] // promotion.buy * (promotion.buy - promotion.pay) * cents
+            else:
+                saving = round(subtotal * (promotion.percent / 100))
+            if saving > discount:
+                discount, winner = saving, promotion
+        priced.append({
+            'subtotal': subtotal / 100,
+            'discount': discount / 100,
+            'total': (subtotal - discount) / 100,
+            'promotion_id': str(winner.id) if winner else None,
+            'promotion_name': winner.name if winner else None
+        })
+    return {
+        'lines': priced,
+        'subtotal': sum(round(line['subtotal'] * 100) for line in priced) / 100,
+        'discount': sum(round(line['discount'] * 100) for line in priced) / 100,
+        'total': sum(round(line['total'] * 100) for line in priced) / 100
+    }
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_price_matches_naive_reference(app, seed):
+    rng = random.Random(seed)
+    for index in range(rng.randint(0, 40)):
+        random_promotion(rng, index).save()
+    pricing.invalidate()
+    
+    # Rules in the order rules() compiles them, so ties resolve the same way
+    promotions = list(Promotion.objects(active=True))
+    for _ in range(5):
+        lines = random_lines(rng)
+        assert pricing.price(lines, at=AT) == reference_price(lines, promotions, AT)
+
+
+def test_window_boundaries(app):
+    Promotion(name='Starts now', kind='percentage', percent=10, starts_at=AT).save()
+    Promotion(name='Ended now', kind='percentage', percent=50, ends_at=AT).save()
+    pricing.invalidate()
+    
+    line = {'product_id': 'p0', 'category': 'Dairy', 'price': 2.0, 'quantity': 1}
+    assert pricing.price([line], at=AT)['lines'][0]['promotion_name'] == 'Starts now'
+    assert pricing.price([line], at=AT - timedelta(seconds=1))['lines'][0]['promotion_name'] == 'Ended now'
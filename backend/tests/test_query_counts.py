@@ -0,0 +1,54 @@
+from collections import Counter
+from datetime import datetime, timedelta
+import mongomock
+import pytest
+from models.order import Order, OrderItem
+from models.user import User
+
+# Collection methods that send a query or command to the server
+QUERY_METHODS = ('find', 'find_one', 'find_one_and_update', 'count_documents', 'aggregate',
+                 'insert_one', 'insert_many', 'update_one', 'update_many', 'delete_one', 'delete_many')
+
+
+@pytest.fixture
+def queries(monkeypatch):
+    """Counter of {collection name: queries} sent while the test runs"""
+    counts = Counter()
+    for name in QUERY_METHODS:
+        method = getattr(mongomock.collection.Collection, name)
+        
+        def counted(self, *args, _method=method, **kwargs):
+            counts[self.name] += 1
+            return _method(self, *args, **kwargs)
+        
+        monkeypatch.setattr(mongomock.collection.Collection, name, counted)
+    return counts
+
+
+def place_orders(username, count):
+    user = User.objects.get(username=username)
+    now = datetime.utcnow()
+    for i in range(count):
+        Order(user=user, items=[OrderItem(product_id='p1', product_name='Bread', quantity=1, price=2.5)],
+              total=2.5, created_at=now - timedelta(minutes=i)).save()
+
+
+@pytest.mark.parametrize('page', [None, 1])
+def test_listing_orders_does_not_query_users_per_order(client, login, queries, page):
+    headers = login('alice')
+    url = '/api/orders/' + ('?page=1&per_page=50' if page else '')
+    # The first request also loads the revoked token list
+    client.get(url, headers=headers)
+    
+    counts = {}
+    for total in (1, 25):
+        place_orders('alice', total - Order.objects.count())
+        queries.clear()
+        response = client.get(url, headers=headers)
+        assert response.status_code == 200
+        assert len(response.get_json()['orders']) == total
+        counts[total] = dict(queries)
+    
+    # The route loads the caller once; serializing orders loads no User
+    assert counts[25]['users'] == 1
+    assert counts[25] == counts[1]
@@ -0,0 +1,109 @@
+import os
+import random
+import shutil
+import socket
+import subprocess
+import time
+import pytest
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+from config import Config
+from models.product import Product
+from query_plan_check import FORBIDDEN, listing_combinations, listing_plan
+
+# explain() needs a real server; the rest of the suite runs on mongomock
+DATABASE = 'supermarket_query_plans'
+
+
+def reachable(uri):
+    client = MongoClient(uri, serverSelectionTimeoutMS=1000)
+    try:
+        client.admin.command('ping')
+        return True
+    except PyMongoError:
+        return False
+    finally:
+        client.close()
+
+
+@pytest.fixture(scope='module')
+def mongo_uri(tmp_path_factory):
+    """
+    A real MongoDB server: TEST_MONGODB_URI (CI runs one), else a
+    throwaway mongod started from PATH (or $MONGOD), else MONGODB_URI.
+    Skips the module when none is available.
+    """
+    if os.getenv('TEST_MONGODB_URI'):
+        uri = os.environ['TEST_MONGODB_URI']
+        if not reachable(uri):
+            pytest.fail(f'TEST_MONGODB_URI is set but {uri} does not answer')
+        yield uri
+        return
+    
+    mongod = shutil.which(os.getenv('MONGOD', 'mongod'))
+    if mongod:
+        with socket.socket() as s:
+            s.bind(('127.0.0.1', 0))
+            port = s.getsockname()[1]
+        server = subprocess.Popen([mongod, '--dbpath', str(tmp_path_factory.mktemp('mongod')),
+                                   '--port', str(port), '--bind_ip', '127.0.0.1'],
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        uri = f'mongodb://127.0.0.1:{port}'
+        try:
+            deadline = time.monotonic() + 30
+            while not reachable(uri):
+                if server.poll() is not None or time.monotonic() > deadline:
+                    pytest.fail(f'{mongod} did not start')
+            yield uri
+        finally:
+            server.terminate()
+            server.wait()
+        return
+    
+    if not reachable(Config.MONGODB_URI):
+        pytest.skip('No MongoDB server: set TEST_MONGODB_URI or put mongod on PATH')
+    yield Config.MONGODB_URI
+
+
+@pytest.fixture(scope='module')
+def products(mongo_uri):
+    """A seeded products collection with Product's indexes, in a throwaway database"""
+    client = MongoClient(mongo_uri)
+    client.drop_database(DATABASE)
+    collection = client[DATABASE][Product._get_collection_name()]
+    for spec in Product._meta['index_specs']:
+        options = {key: value for key, value in spec.items() if key != 'fields'}
+        collection.create_index(spec['fields'], **options)
+    
+    # Enough products that a plan fetching unneeded ones shows up in the counts
+    rng = random.Random(7)
+    docs = []
+    for i in range(2000):
+        stock = rng.choice([0, 0, 5, 40])
+        hot_sku = rng.random() < 0.05
+        docs.append({
+            'name': f"{rng.choice(['Apple', 'Pear', 'Bread', 'Milk', 'Crab apple'])} {i}",
+            'price': round(rng.uniform(0.5, 20), 2),
+            'category': rng.choice(['Fruits', 'Bakery', 'Dairy', 'Seafood']),
+            'stock': 0 if hot_sku else stock,
+            'hot_sku': hot_sku,
+            'in_stock': hot_sku or stock > 0
+        })
+    collection.insert_many(docs)
+    
+    yield collection
+    client.drop_database(DATABASE)
+    client.close()
+
+
+def describe(params):
+    return ','.join(f'{key}={value}' for key, value in params.items() if value) or 'no-filters'
+
+
+@pytest.mark.parametrize('params', list(listing_combinations()), ids=describe)
+def test_listing_is_served_by_an_index_in_order(products, params):
+    plan, examined, returned = listing_plan(products, params)
+    
+    assert not FORBIDDEN & set(plan), ' <- '.join(plan)
+    # Filters are checked on index keys: every fetched product is returned
+    assert examined <= returned, f"{examined} examined for {returned} returned: {' <- '.join(plan)}"
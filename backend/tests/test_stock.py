@@ -0,0 +1,90 @@
+from datetime import datetime
+from models.product import Product
+from models.stock_shard import StockShard
+from services import stock
+
+
+def make_product(units, **fields):
+    product = Product(name='Milk', price=1.2, category='Dairy', stock=units, **fields)
+    product.save()
+    return product
+
+
+def in_stock(product):
+    return Product.objects.get(id=product.id).in_stock
+
+
+def test_in_stock_follows_stock(app):
+    product = make_product(2)
+    assert in_stock(product)
+    
+    assert stock.decrement_stock(product, 1)
+    assert in_stock(product)
+    assert stock.decrement_stock(product, 1)
+    assert not in_stock(product)
+    assert not stock.decrement_stock(product, 1)
+    
+    stock.increment_stock(product, 3)
+    assert in_stock(product)
+    assert make_product(0).in_stock is False
+
+
+def test_hot_skus_stay_in_stock_until_folded_back_empty(app):
+    product = make_product(4)
+    stock.enable_sharding(product, 2)
+    assert in_stock(product)
+    
+    assert stock.decrement_stock(product, 4)
+    assert in_stock(product)
+    
+    stock.disable_sharding(product)
+    assert product.stock == 0 and not in_stock(product)
+
+
+def test_products_saved_before_in_stock_are_backfilled(app):
+    collection = Product._get_collection()
+    collection.insert_many([
+        {'name': 'Old', 'price': 1.0, 'category': 'Dairy', 'stock': 3},
+        {'name': 'Old hot', 'price': 1.0, 'category': 'Dairy', 'stock': 0, 'hot_sku': True},
+        {'name': 'Old empty', 'price': 1.0, 'category': 'Dairy', 'stock': 0}
+    ])
+    
+    Product.backfill_in_stock(collection)
+    
+    flags = {doc['name']: doc['in_stock'] for doc in collection.find({}, {'name': 1, 'in_stock': 1})}
+    assert flags == {'Old': True, 'Old hot': True, 'Old empty': False}
+
+
+def shard_stock(product):
+    return sorted(s.stock for s in StockShard.objects(product_id=str(product.id)))
+
+
+def test_set_stock_applies_the_difference_to_hot_sku_shards(app):
+    product = make_product(10)
+    stock.enable_sharding(product, 2)
+    assert stock.decrement_stock(product, 3)
+    before = shard_stock(product)
+    
+    stock.set_stock(product, 12)
+    assert StockShard.total_for(product.id) == 12
+    # Only the emptiest shard was credited
+    assert shard_stock(product) == sorted([before[0] + 5, before[1]])
+    
+    stock.set_stock(product, 1)
+    assert StockShard.total_for(product.id) == 1
+
+
+def test_set_stock_keeps_transfers_in_flight(app):
+    product = make_product(10)
+    stock.enable_sharding(product, 2)
+    product_id = str(product.id)
+    # A rebalance interrupted after taking 3 units from shard 0
+    transfer = {'id': 'interrupted', 'to': 1, 'amount': 3, 'at': datetime.utcnow()}
+    StockShard.objects(product_id=product_id, shard=0).update_one(
+        __raw__={'$inc': {'stock': -3}, '$push': {'pending': transfer}})
+    
+    stock.set_stock(product, 20)
+    
+    assert StockShard.total_for(product.id) == 20
+    assert not StockShard.objects(product_id=product_id, pending__not__size=0).count()
+    assert StockShard.objects.get(product_id=product_id, shard=1).applied == ['interrupted']
@@ -7,6 +7,8 @@ import ConfirmModal from './ConfirmModal';
 import { showToast } from './Toast';
 import { useDebouncedCartUpdate } from '../hooks/useDebouncedCartUpdate';
 
+const API_URL = import.meta.env.VITE_API_URL || 'http://localhost:5000';
+
 export default function Cart() {
   const dispatch = useDispatch<AppDispatch>();
   const { items, total, syncMessages } = useSelector((state: RootState) => state.cart);
@@ -123,7 +125,11 @@ export default function Cart() {
           >
             <Link to={`/product/${item.product_id}`} className="flex-shrink-0">
               <img
-                src={item.image_url || 'https://placehold.co/80x80?text=No+Image'}
+                src={
+                  !item.image_url ? 'https://placehold.co/80x80?text=No+Image'
+                    // Deleted products are gone from the image proxy; use the saved URL
+                    : item.is_available ? `${API_URL}/api/images/${item.product_id}?size=thumb` : item.image_url
+                }
                 alt={item.product_name}
                 className="w-20 h-20 object-cover rounded"
               />
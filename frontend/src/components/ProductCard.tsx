@@ -6,6 +6,8 @@ import { Product } from '../redux/productsSlice';
 import { showToast } from './Toast';
 import { memo } from 'react';
 
+const API_URL = import.meta.env.VITE_API_URL || 'http://localhost:5000';
+
 interface ProductCardProps {
   product: Product;
 }
@@ -65,7 +67,7 @@ function ProductCard({ product }: ProductCardProps) {
       <div className="card group hover:scale-105 transition-transform duration-200 will-change-transform transform-gpu">
         <div className="relative overflow-hidden rounded-lg mb-4 h-48 bg-gray-100 dark:bg-gray-700">
           <img
-            src={product.image_url || 'https://placehold.co/300x300?text=No+Image'}
+            src={product.image_url ? `${API_URL}/api/images/${product.id}?size=card` : 'https://placehold.co/300x300?text=No+Image'}
             alt={product.name}
             className="w-full h-full object-cover"
             loading="lazy"
@@ -132,7 +132,7 @@ export default function ProductDetail() {
       <div className="grid md:grid-cols-2 gap-12">
         <div className="bg-gray-100 dark:bg-gray-800 rounded-xl overflow-hidden">
           <img
-            src={product.image_url || 'https://placehold.co/600x600?text=No+Image'}
+            src={product.image_url ? `${API_URL}/api/images/${product.id}?size=full` : 'https://placehold.co/600x600?text=No+Image'}
             alt={product.name}
             className="w-full h-full object-cover"
           />